@@ -0,0 +1,114 @@
+"""
+Aio
+===
+
+asyncio interface to WfsCamera, the blocking dll calls run on a dedicated executor per sensor.
+"""
+
+import time
+import asyncio
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from .helper import log
+    from .wfs import WfsCamera
+    from .stream import WfsFrame
+except:
+    from helper import log
+    from wfs import WfsCamera
+    from stream import WfsFrame
+
+
+class AsyncWfsCamera(object):
+    """
+    This class provides awaitable versions of the WfsCamera methods.
+    All calls of one sensor run on a single worker thread, so they are serialized and never block the event loop.
+    A cancelled or timed out call stops waiting, but a dll call that already started finishes in the background before the next call runs.
+    """
+
+    def __init__(self, camera):
+        """
+        camera is a WfsCamera (or a WfsSDK which is wrapped in a WfsCamera without default configuration)
+        """
+        if not isinstance(camera, WfsCamera):
+            camera = WfsCamera(camera)
+        self._camera = camera
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="AsyncWfsCamera")
+        self.frames_acquired = 0
+
+    @property
+    def camera(self):
+        return self._camera
+
+    async def run(self, function, *args, timeout=None, **kwargs):
+        """
+        This function runs function(*args, **kwargs) on the worker thread of the sensor, optionally with a timeout in seconds
+        """
+        future = asyncio.get_running_loop().run_in_executor(self._executor, partial(function, *args, **kwargs))
+        if timeout is None:
+            return await future
+        return await asyncio.wait_for(future, timeout)
+
+    async def configure(self, configuration=None, timeout=None):
+        """
+        This function configures the sensor, see WfsCamera.configure()
+        """
+        return await self.run(self._camera.configure, configuration, timeout=timeout)
+
+    async def auto_exposure(self, max_tries=10, timeout=None):
+        """
+        This function adjusts the exposure, see WfsCamera.auto_exposure()
+        """
+        return await self.run(self._camera.auto_exposure, max_tries, timeout=timeout)
+
+    async def acquire_wavefront(self, limit_to_pupil=True, out=None, timeout=None):
+        """
+        This function gets one wavefront from the sensor, see WfsCamera.acquire_wavefront()
+        """
+        return await self.run(self._camera.acquire_wavefront, limit_to_pupil=limit_to_pupil, out=out, timeout=timeout)
+
+    def _acquire_frame(self, limit_to_pupil):
+        wavefront = self._camera.acquire_wavefront(limit_to_pupil=limit_to_pupil)
+        frame = WfsFrame(self.frames_acquired, time.time(), wavefront)
+        self.frames_acquired += 1
+        return frame
+
+    async def frames(self, limit_to_pupil=True, count=None, timeout=None):
+        """
+        This function is an async generator of WfsFrame, count limits the number of frames.
+        The next frame is already acquired while the current one is processed, so configure a wavefront ring of at least 2 buffers
+        or keep the default of newly allocated arrays.
+        """
+        loop = asyncio.get_running_loop()
+        submit = lambda: loop.run_in_executor(self._executor, self._acquire_frame, limit_to_pupil)
+        pending = submit()
+        acquired = 0
+        try:
+            while True:
+                frame = await (pending if timeout is None else asyncio.wait_for(pending, timeout))
+                acquired += 1
+                pending = submit() if count is None or acquired < count else None
+                yield frame
+                if pending is None:
+                    return
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    def __aiter__(self):
+        return self.frames()
+
+    async def close(self):
+        """
+        This function waits for pending calls, closes the sensor and stops the worker thread
+        """
+        await self.run(self._camera.close)
+        self._executor.shutdown(wait=False)
+        log.spam("async camera closed")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
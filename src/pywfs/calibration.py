@@ -0,0 +1,119 @@
+"""
+Calibration
+===========
+
+Persistent cache of calibration data that only depends on the instrument: MLA parameters, XY scales of the spot grid and
+reference spot positions. Entries are stored per instrument serial in a JSON file, so warm starts skip the driver queries.
+"""
+
+import os
+import json
+import threading
+import numpy as np
+
+try:
+    from .helper import log
+except:
+    from helper import log
+
+
+DEFAULT_FILENAME = os.path.join(os.path.expanduser("~"), ".pywfs", "calibration.json")
+
+
+def calibration_key(*parts):
+    """
+    This function joins the parts identifying a calibration entry, e.g. calibration_key("grid", mla_index, cam_resol_index)
+    """
+    return "/".join(str(part) for part in parts)
+
+
+class CalibrationCache(object):
+    """
+    This class holds the calibration entries of all instruments and writes them to filename whenever an entry is added.
+    Values are JSON compatible, NumPy arrays are stored as nested lists.
+    """
+
+    def __init__(self, filename=DEFAULT_FILENAME):
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._data = {}
+        if os.path.exists(filename):
+            try:
+                with open(filename) as f:
+                    self._data = json.load(f)
+                log.spam("calibration cache loaded from %s", filename)
+            except ValueError as e:
+                log.warning("ignoring corrupt calibration cache %s: %s", filename, e)
+
+    def sensor(self, serial):
+        """
+        This function returns the calibration entries of one instrument
+        """
+        if isinstance(serial, bytes):
+            serial = serial.decode()
+        return SensorCalibration(self, serial)
+
+    def get(self, serial, key, default=None):
+        return self._data.get(serial, {}).get(key, default)
+
+    def set(self, serial, key, value):
+        """
+        This function stores an entry and saves the cache
+        """
+        if isinstance(value, np.ndarray):
+            value = value.tolist()
+        with self._lock:
+            self._data.setdefault(serial, {})[key] = value
+            self._save()
+
+    def clear(self, serial=None):
+        """
+        This function removes the entries of one or all instruments
+        """
+        with self._lock:
+            if serial is None:
+                self._data = {}
+            else:
+                self._data.pop(serial, None)
+            self._save()
+
+    def _save(self):
+        # write to a temporary file first, so a crash never leaves a truncated cache behind
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.filename}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(self._data, f)
+        os.replace(temporary, self.filename)
+
+
+class SensorCalibration(object):
+    """
+    This class gives access to the calibration entries of one instrument, arrays are converted once and kept in memory
+    """
+
+    def __init__(self, cache, serial):
+        self._cache = cache
+        self.serial = serial
+        self._arrays = {}
+
+    def get(self, key, default=None):
+        return self._cache.get(self.serial, key, default)
+
+    def get_array(self, key, dtype=np.float32):
+        """
+        This function returns an entry as read-only NumPy array or None
+        """
+        if key not in self._arrays:
+            value = self.get(key)
+            if value is None:
+                return None
+            array = np.array(value, dtype=dtype)
+            array.setflags(write=False)
+            self._arrays[key] = array
+        return self._arrays[key]
+
+    def set(self, key, value):
+        self._arrays.pop(key, None)
+        self._cache.set(self.serial, key, value)
@@ -0,0 +1,142 @@
+"""
+Centroid
+========
+
+Host side centroiding of spotfield images, e.g. to reprocess stored spotfields or to use custom thresholds and windows.
+The pixel windows of all lenslets are computed once per resolution and MLA, all spots of a frame or a stack of frames are then
+evaluated with a few array operations.
+"""
+
+from functools import lru_cache
+import numpy as np
+
+try:
+    from .helper import log
+    from .sdk import WfsError, SPOT_FIELDS
+except:
+    from helper import log
+    from sdk import WfsError, SPOT_FIELDS
+
+
+@lru_cache(maxsize=16)
+def _lenslet_index(resolution, spots, pitch, spot_offset, window):
+    """
+    This function returns the pixel columns (spots X, w) and rows (spots Y, w) of the lenslet windows
+    and the window centers in X and Y in pixels. pitch is the lenslet pitch in pixels.
+    """
+    log.spam("computing lenslet windows for %s spots on %s pixels", spots, resolution)
+    size = max(int(window * pitch), 1)
+    index = []
+    for pixels, count, offset in zip(resolution, spots, spot_offset):
+        # the grid is centered on the sensor and shifted by the calibrated spot offset
+        centers = pixels / 2 + offset + (np.arange(count) - (count - 1) / 2) * pitch
+        start = np.clip(np.round(centers - size / 2).astype(np.intp), 0, pixels - size)
+        pixel = start[:, None] + np.arange(size)
+        for array in (pixel, centers):
+            array.setflags(write=False)
+        index.append((pixel, centers))
+    (columns, center_x), (rows, center_y) = index
+    return columns, rows, center_x, center_y
+
+
+class Centroider(object):
+    """
+    This class calculates centroids, intensities and optionally diameters of all spots of spotfield images (rows, columns)
+    as returned by WfsSDK.get_spotfield_image(). The results are structured arrays like WfsSDK.get_spot_data(),
+    so deviations can be passed on to ZernikeFit.fit_slopes() or ZonalReconstructor.reconstruct().
+    """
+
+    def __init__(self, resolution, spots, cam_pitch, lenslet_pitch, spot_offset=(0, 0), threshold=0.0, dynamic_threshold=None, window=1.0, reference=None):
+        """
+        resolution is the image size [X, Y] and spots the number of lenslets [X, Y]. cam_pitch and lenslet_pitch in um and spot_offset
+        in pixels are the MLA data of WfsSDK.get_mla_info().
+        threshold is subtracted from every pixel (negative values are clipped), dynamic_threshold additionally subtracts this
+        fraction of the maximum of every window. window is the window size relative to the lenslet pitch.
+        reference are the reference positions [X, Y] (spots X, spots Y) in pixels, default are the window centers.
+        """
+        self.resolution = (int(resolution[0]), int(resolution[1]))
+        self.spots = (int(spots[0]), int(spots[1]))
+        self.pitch = float(lenslet_pitch) / float(cam_pitch)
+        self.spot_offset = (float(spot_offset[0]), float(spot_offset[1]))
+        self.threshold = threshold
+        self.dynamic_threshold = dynamic_threshold
+        self.window = float(window)
+        self.reference = reference
+
+    @classmethod
+    def from_sdk(cls, sdk, reference=False, **kwargs):
+        """
+        This function creates a Centroider for the resolution and MLA configured in a WfsSDK.
+        With reference the reference positions of the driver are used (see WfsSDK.get_spot_reference_positions(cached=True)).
+        """
+        if not hasattr(sdk, "spots"):
+            raise WfsError("resolution has to be configured first")
+        resolution = sdk.get_image_size()
+        if resolution is None:
+            raise WfsError(f"unknown camera resolution of {sdk.instrument_name}")
+        name, cam_pitch, lenslet_pitch, offset_x, offset_y = sdk.get_mla_info()[sdk.mla_index.value][:5]
+        if reference:
+            kwargs["reference"] = sdk.get_spot_reference_positions(cached=True)
+        return cls(resolution, [sdk.spots[0].value, sdk.spots[1].value], cam_pitch, lenslet_pitch, [offset_x, offset_y], **kwargs)
+
+    def _index(self):
+        return _lenslet_index(self.resolution, self.spots, self.pitch, self.spot_offset, self.window)
+
+    @property
+    def windows(self):
+        """
+        This function returns the first pixel column of the windows in X and the first pixel row of the windows in Y
+        """
+        columns, rows, center_x, center_y = self._index()
+        return columns[:, 0], rows[:, 0]
+
+    def compute(self, images, diameters=False, cancel_tilt=False, out=None):
+        """
+        This function evaluates one image (rows, columns) or a stack of images (..., rows, columns).
+        It returns the spot data (see SPOT_FIELDS) as structured array (..., spots X, spots Y), written into out if given.
+        Spots without intensity are NaN. diameters are twice the standard deviation of the intensity in X and Y (NaN without
+        diameters). With cancel_tilt the mean deviation is subtracted like WfsSDK.calc_deviations() does.
+        """
+        columns, rows, center_x, center_y = self._index()
+        images = np.asarray(images)
+        if images.shape[-2:] != self.resolution[::-1]:
+            raise WfsError(f"images have to be of shape (..., {self.resolution[1]}, {self.resolution[0]})")
+        # windows of all lenslets (..., spots X, spots Y, w rows, w columns)
+        windows = images[..., rows[None, :, :, None], columns[:, None, None, :]].astype(np.float32)
+        if self.threshold:
+            windows -= self.threshold
+        if self.dynamic_threshold:
+            windows -= self.dynamic_threshold * windows.max(axis=(-2, -1), keepdims=True)
+        np.maximum(windows, 0, out=windows)
+        profile_x = windows.sum(axis=-2)
+        profile_y = windows.sum(axis=-1)
+        intensity = profile_x.sum(axis=-1)
+        shape = intensity.shape
+        if out is None:
+            out = np.empty(shape, dtype=[(field, np.float32) for field in SPOT_FIELDS])
+        elif out.shape != shape or out.dtype.names != tuple(SPOT_FIELDS):
+            raise WfsError(f"out has to be a structured array with the fields SPOT_FIELDS of shape {shape}")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            centroid_x = (profile_x * columns[:, None, :]).sum(axis=-1) / intensity
+            centroid_y = (profile_y * rows[None, :, :]).sum(axis=-1) / intensity
+            if diameters:
+                out["diameter_x"] = 2 * np.sqrt((profile_x * (columns[:, None, :] - centroid_x[..., None]) ** 2).sum(axis=-1) / intensity)
+                out["diameter_y"] = 2 * np.sqrt((profile_y * (rows[None, :, :] - centroid_y[..., None]) ** 2).sum(axis=-1) / intensity)
+            else:
+                out["diameter_x"] = np.nan
+                out["diameter_y"] = np.nan
+        if self.reference is None:
+            reference_x, reference_y = np.broadcast_arrays(center_x[:, None], center_y[None, :])
+        else:
+            reference_x, reference_y = self.reference
+        out["centroid_x"] = centroid_x
+        out["centroid_y"] = centroid_y
+        out["intensity"] = intensity
+        out["reference_x"] = reference_x
+        out["reference_y"] = reference_y
+        out["deviation_x"] = centroid_x - reference_x
+        out["deviation_y"] = centroid_y - reference_y
+        if cancel_tilt:
+            out["deviation_x"] -= np.nanmean(out["deviation_x"], axis=(-2, -1), keepdims=True)
+            out["deviation_y"] -= np.nanmean(out["deviation_y"], axis=(-2, -1), keepdims=True)
+        return out
@@ -0,0 +1,156 @@
+"""
+Change
+======
+
+Change detecting acquisition for monitoring. Every frame is compared with the last emitted frame and only passed on if
+the wavefront moved by more than a threshold or the heartbeat is due, so quiet periods produce (almost) no downstream load.
+"""
+
+import time
+from collections import namedtuple
+import numpy as np
+
+try:
+    from .helper import log
+    from .sdk import WfsError
+except:
+    from helper import log
+    from sdk import WfsError
+
+
+# one emitted wavefront, index counts all checked frames, reason is first, change or heartbeat
+WfsChangeEvent = namedtuple("WfsChangeEvent", ["index", "timestamp", "wavefront", "metric", "reason", "suppressed"])
+
+
+class WfsChangeDetector(object):
+    """
+    This class emits only the wavefronts (spots X, spots Y) that differ from the last emitted one by at least threshold in um.
+    The metrics ignore the piston and are evaluated on the lenslets that are finite in both frames:
+        rms: RMS of the difference
+        pv: PV of the difference
+        zernike: RMS of the difference of the low order Zernike coefficients of fit (a ZernikeFit), e.g. tilt and defocus with
+            order 2, which is insensitive to noise of single lenslets
+    A frame is emitted anyway if no frame has been emitted for heartbeat seconds (None disables the heartbeat).
+    With a camera the frames are acquired by events(), without camera they are passed to check().
+    """
+
+    METRICS = ("rms", "pv", "zernike")
+
+    def __init__(self, camera=None, threshold=0.01, metric="rms", heartbeat=10.0, fit=None, limit_to_pupil=True):
+        if metric not in WfsChangeDetector.METRICS:
+            raise WfsError(f"unknown metric {metric}, use one of {WfsChangeDetector.METRICS}")
+        if metric == "zernike" and fit is None:
+            raise WfsError("metric zernike requires a ZernikeFit")
+        self._camera = camera
+        self.threshold = threshold
+        self.metric = metric
+        self.heartbeat = heartbeat
+        self.fit = fit
+        self.limit_to_pupil = limit_to_pupil
+        self._reference = None
+        self._difference = None
+        self._buffer = None
+        self._emitted_at = None
+        self._suppressed = 0
+        self.checked = 0
+        self.changes = 0
+        self.heartbeats = 0
+        self.suppressed = 0
+
+    @property
+    def counters(self):
+        """
+        This function returns the checked, emitted and suppressed frames and the emitted frames per reason
+        """
+        return {
+            "checked": self.checked,
+            "emitted": self.checked - self.suppressed,
+            "suppressed": self.suppressed,
+            "changes": self.changes,
+            "heartbeats": self.heartbeats
+        }
+
+    def reset(self):
+        """
+        This function forgets the last emitted frame, the next frame is emitted
+        """
+        self._reference = None
+        self._emitted_at = None
+
+    def _distance(self, wavefront):
+        """
+        This function returns the metric between wavefront and the reference and, for zernike, the coefficients of wavefront
+        """
+        if self.metric == "zernike":
+            # the polynomials are orthonormal on the pupil, the coefficient norm is the RMS of the low order difference
+            coefficients = self.fit.fit(wavefront)
+            return float(np.linalg.norm(coefficients[1:] - self._reference[1:])), coefficients
+        np.subtract(wavefront, self._reference, out=self._difference)
+        finite = self._difference[np.isfinite(self._difference)]
+        if not finite.size:
+            return np.inf, None
+        if self.metric == "pv":
+            return float(np.ptp(finite)), None
+        return float(finite.std()), None
+
+    def check(self, wavefront, timestamp=None):
+        """
+        This function compares wavefront with the last emitted frame, a frame of another shape is emitted like the first one.
+        It returns a WfsChangeEvent if the frame has to be emitted, otherwise None and the frame is counted as suppressed.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        if self._difference is not None and np.shape(wavefront) != self._difference.shape:
+            # e.g. a new resolution, the frame can not be compared with the last emitted one
+            log.spam("wavefront shape changed to %s, resetting", np.shape(wavefront))
+            self.reset()
+        index = self.checked
+        self.checked += 1
+        if self._reference is None:
+            reason, metric = "first", np.inf
+            self._difference = np.empty(np.shape(wavefront), dtype=np.float32)
+            coefficients = self.fit.fit(wavefront) if self.metric == "zernike" else None
+        else:
+            metric, coefficients = self._distance(wavefront)
+            if metric >= self.threshold:
+                reason = "change"
+                self.changes += 1
+            elif self.heartbeat is not None and timestamp - self._emitted_at >= self.heartbeat:
+                reason = "heartbeat"
+                self.heartbeats += 1
+            else:
+                self._suppressed += 1
+                self.suppressed += 1
+                return None
+        if self.metric == "zernike":
+            self._reference = coefficients
+        elif self._reference is None:
+            self._reference = np.array(wavefront, dtype=np.float32)
+        else:
+            np.copyto(self._reference, wavefront)
+        self._emitted_at = timestamp
+        event = WfsChangeEvent(index, timestamp, wavefront, metric, reason, self._suppressed)
+        self._suppressed = 0
+        log.spam("emitting frame %d on %s after %d suppressed frames", index, reason, event.suppressed)
+        return event
+
+    def events(self, count=None):
+        """
+        This function acquires wavefronts from the camera and is a generator of the emitted WfsChangeEvent,
+        count limits the number of events. The wavefront of an event is overwritten by the next acquisition, copy it if it has to be kept.
+        """
+        if self._camera is None:
+            raise WfsError("events() requires a camera, pass the frames to check() otherwise")
+        if self._camera.configuration is None:
+            self._camera.configure()
+        spots = self._camera.sdk.spots
+        if self._buffer is None or self._buffer.shape != (spots[0].value, spots[1].value):
+            self._buffer = np.empty([spots[0].value, spots[1].value], dtype=np.float32)
+        emitted = 0
+        while count is None or emitted < count:
+            event = self.check(self._camera.acquire_wavefront(limit_to_pupil=self.limit_to_pupil, out=self._buffer))
+            if event is not None:
+                emitted += 1
+                yield event
+
+    def __iter__(self):
+        return self.events()
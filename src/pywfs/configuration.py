@@ -0,0 +1,157 @@
+"""
+Configuration
+=============
+
+Incremental configuration of a sensor. The state applied to the device is remembered and a new configuration only issues
+the calls for features that changed, in the order the driver requires.
+"""
+
+try:
+    from .helper import log
+    from .sdk import WfsError, WFS_TRIGGER_MODES, camera_resolutions
+except:
+    from helper import log
+    from sdk import WfsError, WFS_TRIGGER_MODES, camera_resolutions
+
+
+# configuration features and the WfsSDK method applying them, in the order they have to be applied
+FEATURES = {
+    "mla": "set_mla",
+    "resolution": "set_resolution",
+    "reference_plane": "set_reference_plane",
+    "pupil": "set_pupil",
+    "trigger_mode": "set_trigger_mode",
+    "exposure_time": "set_exposure_time",
+    "master_gain": "set_master_gain",
+    "wavefront_ring": "set_wavefront_ring",
+    "spotfield_ring": "set_spotfield_ring",
+    "highspeed_mode": "set_highspeed_mode"
+}
+
+# features whose device state is lost when a feature is applied
+DEPENDENTS = {
+    "mla": ["resolution", "reference_plane", "pupil", "highspeed_mode"],
+    "resolution": ["reference_plane", "pupil", "highspeed_mode"],
+    "reference_plane": ["highspeed_mode"],
+    "pupil": ["highspeed_mode"]
+}
+
+# features that are also changed on the device by auto exposure (see WfsCamera.auto_exposure and ExposureController),
+# the applied state is not reliable so they are applied whenever they are part of a configuration
+VOLATILE = ("exposure_time", "master_gain")
+
+
+def _normalize(value):
+    """
+    This function converts tuples to lists recursively, so configurations compare equal independent of the sequence type
+    """
+    if isinstance(value, dict):
+        return {key: _normalize(v) for key, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+class WfsConfiguration(object):
+    """
+    This class keeps track of the configuration applied to a WfsSDK.
+    Features missing in a new configuration keep their device state, unknown features are ignored.
+    Exposure time and master gain (see VOLATILE) are applied with every configuration that contains them.
+    """
+
+    def __init__(self, sdk):
+        self._sdk = sdk
+        self.applied = {}
+        self.calls = 0
+        self._ranges = {}
+
+    def invalidate(self, feature=None):
+        """
+        This function forgets the applied state of one or all features, so they are applied again
+        """
+        if feature is None:
+            self.applied = {}
+        else:
+            self.applied.pop(feature, None)
+
+    def plan(self, configuration, force=False):
+        """
+        This function returns the list of (feature, kwargs) that have to be applied to reach the configuration
+        """
+        configuration = _normalize(configuration)
+        for feature in configuration:
+            if feature not in FEATURES:
+                log.spam("ignoring unknown feature %s", feature)
+        steps = []
+        invalidated = set()
+        for feature in FEATURES:
+            if feature in configuration:
+                kwargs = configuration[feature]
+            elif feature in invalidated and feature in self.applied:
+                # reapply the previous state that is lost on the device
+                kwargs = self.applied[feature]
+            else:
+                continue
+            if force or feature in invalidated or feature in VOLATILE or self.applied.get(feature) != kwargs:
+                steps.append((feature, kwargs))
+                invalidated.update(DEPENDENTS.get(feature, []))
+        return steps
+
+    def apply(self, configuration, force=False):
+        """
+        This function validates the changed features and applies them, it returns the results of the WfsSDK calls by feature
+        """
+        steps = self.plan(configuration, force)
+        for feature, kwargs in steps:
+            self.validate(feature, kwargs)
+        results = {}
+        for feature, kwargs in steps:
+            log.spam("applying %s: %s", feature, kwargs)
+            # forget the state first, a failing call leaves the device in an unknown state
+            self.applied.pop(feature, None)
+            results[feature] = getattr(self._sdk, FEATURES[feature])(**kwargs)
+            self.applied[feature] = kwargs
+            self.calls += 1
+        return results
+
+    def _range(self, name):
+        """
+        This function queries a range of the device once and caches it
+        """
+        if name not in self._ranges:
+            if name == "mla_count":
+                self._ranges[name] = self._sdk.get_mla_count()
+            elif name == "resolutions":
+                if self._sdk.instrument_name is None:
+                    self._sdk.get_instrument_info()
+                resolutions = camera_resolutions(self._sdk.instrument_name)
+                self._ranges[name] = None if resolutions is None else len(resolutions)
+            elif name == "exposure_time":
+                self._ranges[name] = self._sdk.get_exposure_time_range()[:2]
+            elif name == "master_gain":
+                self._ranges[name] = self._sdk.get_master_gain_range()
+        return self._ranges[name]
+
+    def validate(self, feature, kwargs):
+        """
+        This function raises a WfsError if the values of a feature are out of range
+        """
+        if feature == "mla":
+            mla_index = kwargs.get("mla_index", 0)
+            if not 0 <= mla_index < self._range("mla_count"):
+                raise WfsError(f"mla_index {mla_index} out of range")
+        elif feature == "resolution":
+            count = self._range("resolutions")
+            if count is not None and not 0 <= kwargs["cam_resol_index"] < count:
+                raise WfsError(f"cam_resol_index {kwargs['cam_resol_index']} out of range")
+        elif feature == "pupil":
+            if min(kwargs.get("diameter", [3, 3])) <= 0:
+                raise WfsError("pupil diameter has to be positive")
+        elif feature == "trigger_mode":
+            trigger_mode = kwargs.get("trigger_mode", "off")
+            if trigger_mode not in WFS_TRIGGER_MODES and trigger_mode not in WFS_TRIGGER_MODES.values():
+                raise WfsError(f"unknown trigger mode {trigger_mode}")
+        elif feature in ("exposure_time", "master_gain"):
+            minimum, maximum = self._range(feature)
+            if not minimum <= kwargs[feature] <= maximum:
+                raise WfsError(f"{feature} {kwargs[feature]} out of range [{minimum}, {maximum}]")
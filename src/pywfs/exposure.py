@@ -0,0 +1,100 @@
+"""
+Exposure
+========
+
+Closed loop exposure control, auto exposure is only used to converge and afterwards images are taken with fixed settings.
+"""
+
+try:
+    from .helper import log
+    from .sdk import WfsError, WfsStatus
+except:
+    from helper import log
+    from sdk import WfsError, WfsStatus
+
+
+# status bits that indicate a bad exposure
+EXPOSURE_FAULTS = WfsStatus.PTH | WfsStatus.PTL | WfsStatus.HAL
+
+
+class ExposureController(object):
+    """
+    This class locks exposure time and gain found by auto exposure and takes fast fixed exposure images.
+    It re-converges when one of EXPOSURE_FAULTS is raised or the maximal pixel value drifts by more than intensity_tolerance (relative).
+    """
+
+    def __init__(self, sdk, max_tries=10, intensity_tolerance=None, check_interval=1):
+        """
+        intensity_tolerance None disables the intensity check, which is done every check_interval images (0 disables it as well)
+        """
+        if check_interval < 0:
+            raise WfsError("check_interval has to be at least 0")
+        self._sdk = sdk
+        self.max_tries = max_tries
+        self.intensity_tolerance = intensity_tolerance
+        self.check_interval = check_interval
+        self.locked = False
+        self.exposure_time = None
+        self.master_gain = None
+        self.reference_intensity = None
+        self.images = 0
+        self.convergences = 0
+
+    def converge(self):
+        """
+        This function runs auto exposure until the exposure faults are cleared and locks the resulting settings.
+        The last auto exposed image stays in the driver buffer.
+        """
+        for c in range(self.max_tries):
+            self._sdk.take_spot_field_image_auto_expos()
+            status = self._sdk.get_status()
+            if not status & EXPOSURE_FAULTS:
+                break
+        else:
+            self.locked = False
+            raise WfsError("auto adjusting parameters not successful")
+        self.exposure_time = self._sdk.set_exposure_time(self._sdk.exposure_time_act.value)
+        self.master_gain = self._sdk.set_master_gain(self._sdk.master_gain_act.value)
+        self.reference_intensity = self._sdk.calc_image_min_max()[1] if self.intensity_tolerance is not None else None
+        self.locked = True
+        self.convergences += 1
+        log.spam("exposure locked after %s runs: %s ms, gain %s", c + 1, self.exposure_time, self.master_gain)
+
+    def unlock(self):
+        """
+        This function forces a new convergence for the next image
+        """
+        self.locked = False
+
+    def _drifted(self):
+        """
+        This function compares the maximal pixel value of the current image with the one at convergence
+        """
+        if self.intensity_tolerance is None or not self.check_interval or self.images % self.check_interval:
+            return False
+        intensity = self._sdk.calc_image_min_max()[1]
+        return abs(intensity - self.reference_intensity) > self.intensity_tolerance * max(self.reference_intensity, 1)
+
+    def check(self, status):
+        """
+        This function counts an image taken with the locked settings elsewhere, e.g. on a hardware trigger.
+        If status has one of EXPOSURE_FAULTS or the intensity drifted the settings are unlocked, converge() has to be called before the next image.
+        """
+        self.images += 1
+        if status & EXPOSURE_FAULTS or self._drifted():
+            log.spam("exposure out of range, unlocking")
+            self.locked = False
+
+    def take_image(self):
+        """
+        This function takes one spotfield image with the locked settings, re-converging if necessary
+        """
+        self.images += 1
+        if not self.locked:
+            self.converge()
+            return
+        self._sdk.take_spot_field_image()
+        status = self._sdk.get_status()
+        if status & EXPOSURE_FAULTS or self._drifted():
+            log.spam("exposure out of range, re-converging")
+            self.converge()
@@ -5,40 +5,51 @@ Helper
 Module for functions that might be useful.
 """
 
-import getpass, logging
-from six import string_types, iteritems
+import logging
+import numpy as np
 
-#TODO this code is copied from qao.io.helper!
 ##############################################################
-# extend logging mechanism
+# package logger, importing pywfs never configures logging.
+# Enable the output in the application, e.g.
+#     logging.basicConfig()
+#     logging.getLogger("pywfs").setLevel(SPAM)
 SPAM = 5
-setattr(logging, 'SPAM', 5)
-logging.addLevelName(levelName='SPAM', level=5)
-
-
-class Logger(logging.Logger):
-    def setLevel(self, level, globally=False):
-        if isinstance(level, string_types):
-            level = level.upper()
-        try:
-            level = int(level)
-        except ValueError:
-            pass
-        logging.Logger.setLevel(self, level)
-        if globally:
-            for name, logger in iteritems(logging.root.manager.loggerDict):
-                if not hasattr(logger, 'setLevel'):
-                    continue
-                logger.setLevel(level)
+logging.addLevelName(SPAM, "SPAM")
 
-    def spam(self, msg, *args, **kwargs):
-        self.log(SPAM, msg, *args, **kwargs)
 
-logging.setLoggerClass(Logger)
-format = "%(asctime)-15s %(name)s {user}: %(message)s".format(user=getpass.getuser())
-logging.basicConfig(format=format)
+class Logger(logging.LoggerAdapter):
+    """
+    This class adds the SPAM level to the package logger.
+    Messages take %-style arguments which are only formatted if the level is enabled, use them on hot paths.
+    """
 
+    def __init__(self, name):
+        logger = logging.getLogger(name)
+        # no output unless the application configures logging
+        logger.addHandler(logging.NullHandler())
+        super().__init__(logger, {})
 
-log = logging.getLogger("Simtools")
-log.setLevel(logging.SPAM)
+    def process(self, msg, kwargs):
+        return msg, kwargs
 
+    def spam(self, msg, *args, **kwargs):
+        if self.logger.isEnabledFor(SPAM):
+            self.logger.log(SPAM, msg, *args, stacklevel=2, **kwargs)
+
+
+log = Logger("pywfs")
+
+
+def describe(values):
+    """
+    This function returns mean, std, p50, p99 and max of values or None without values
+    """
+    if not len(values):
+        return None
+    return {
+        "mean": float(np.mean(values)),
+        "std": float(np.std(values)),
+        "p50": float(np.percentile(values, 50)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(np.max(values))
+    }
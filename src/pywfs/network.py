@@ -0,0 +1,319 @@
+"""
+Network
+=======
+
+Streaming of wavefronts over TCP, e.g. from the Windows machine driving the sensor to analysis software on another host.
+Every frame is a fixed size header (see HEADER) followed by the raw array in C order:
+    magic       4 bytes, b"WFSF"
+    sequence    uint64, frame counter of the server
+    timestamp   float64, time.time() of the acquisition
+    shape       2 x uint32, spots X and spots Y
+    dtype       4 bytes, NumPy dtype string padded with spaces, e.g. b"<f4 "
+    status      uint32, status word (see WfsStatus)
+    size        uint32, payload size in bytes
+All numbers are little endian.
+"""
+
+import time
+import struct
+import socket
+import threading
+from collections import deque, namedtuple
+import numpy as np
+
+try:
+    from .helper import log
+    from .sdk import WfsError
+except:
+    from helper import log
+    from sdk import WfsError
+
+
+MAGIC = b"WFSF"
+HEADER = struct.Struct("<4sQdII4sII")
+
+# one received frame, sequence gaps mark frames dropped for this client
+WfsNetworkFrame = namedtuple("WfsNetworkFrame", ["sequence", "timestamp", "status", "wavefront"])
+
+
+def encode_frame(sequence, timestamp, wavefront, status=0):
+    """
+    This function returns header and payload of a frame as one bytes object
+    """
+    wavefront = np.ascontiguousarray(wavefront)
+    dtype = wavefront.dtype.str.encode().ljust(4)
+    return HEADER.pack(MAGIC, sequence, timestamp, *wavefront.shape, dtype, int(status), wavefront.nbytes) + wavefront.tobytes()
+
+
+def _recv_into(sock, view):
+    """
+    This function receives exactly len(view) bytes into view
+    """
+    received = 0
+    while received < len(view):
+        count = sock.recv_into(view[received:])
+        if not count:
+            raise ConnectionError("connection closed by server")
+        received += count
+
+
+class _Subscriber(object):
+    """
+    This class sends the frames of one client on its own thread, so a slow client never blocks the others
+    """
+
+    def __init__(self, server, connection, address):
+        self._server = server
+        self._connection = connection
+        self.address = address
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self.running = True
+        self.sent = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name=f"WfsServer-{address}", daemon=True)
+        self._thread.start()
+
+    def put(self, data):
+        with self._condition:
+            if len(self._queue) >= self._server.queue_size:
+                self.dropped += 1
+                if self._server.policy == "drop_newest":
+                    return
+                self._queue.popleft()
+            self._queue.append(data)
+            self._condition.notify()
+
+    def _run(self):
+        try:
+            while True:
+                with self._condition:
+                    while self.running and not self._queue:
+                        self._condition.wait()
+                    if not self.running:
+                        break
+                    data = self._queue.popleft()
+                self._connection.sendall(data)
+                self.sent += 1
+        except OSError as e:
+            log.spam("subscriber %s disconnected: %s", self.address, e)
+        finally:
+            self.running = False
+            self._connection.close()
+            self._server._remove(self)
+
+    def close(self):
+        with self._condition:
+            self.running = False
+            self._condition.notify()
+        try:
+            self._connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._thread.join()
+
+
+class WfsServer(object):
+    """
+    This class publishes wavefronts to all connected WfsClient over TCP.
+    With a camera the frames are acquired on a background thread while at least one client is connected,
+    without camera they are passed to publish(). Every frame is encoded once and queued for every client,
+    a client whose queue of queue_size frames is full loses frames according to policy (drop_oldest or drop_newest).
+    """
+
+    POLICIES = ("drop_oldest", "drop_newest")
+
+    def __init__(self, camera=None, host="127.0.0.1", port=0, queue_size=4, policy="drop_oldest", limit_to_pupil=True):
+        """
+        port 0 selects a free port, see address
+        """
+        if policy not in WfsServer.POLICIES:
+            raise WfsError(f"unknown policy {policy}, use one of {WfsServer.POLICIES}")
+        self._camera = camera
+        self.queue_size = queue_size
+        self.policy = policy
+        self.limit_to_pupil = limit_to_pupil
+        self._socket = socket.create_server((host, port))
+        # closing the socket does not interrupt accept() on every platform, check for close() regularly
+        self._socket.settimeout(0.2)
+        self._subscribers = []
+        self._condition = threading.Condition()
+        self._running = False
+        self._threads = []
+        self.sequence = 0
+
+    @property
+    def address(self):
+        return self._socket.getsockname()
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    @property
+    def counters(self):
+        """
+        This function returns the published frames as well as the sent and dropped frames per client address
+        """
+        with self._condition:
+            subscribers = list(self._subscribers)
+        return {
+            "published": self.sequence,
+            "sent": {subscriber.address: subscriber.sent for subscriber in subscribers},
+            "dropped": {subscriber.address: subscriber.dropped for subscriber in subscribers}
+        }
+
+    def start(self):
+        """
+        This function starts accepting clients and, with a camera, the acquisition thread
+        """
+        if self._running:
+            return self
+        self._running = True
+        self._threads = [threading.Thread(target=self._accept, name="WfsServer-accept", daemon=True)]
+        if self._camera is not None:
+            if self._camera.configuration is None:
+                self._camera.configure()
+            self._threads.append(threading.Thread(target=self._acquire, name="WfsServer-acquire", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        log.spam("server listening on %s", self.address)
+        return self
+
+    def _accept(self):
+        while self._running:
+            try:
+                connection, address = self._socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            connection.settimeout(None)
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self._condition:
+                self._subscribers.append(_Subscriber(self, connection, address))
+                self._condition.notify_all()
+            log.spam("subscriber %s connected", address)
+
+    def _remove(self, subscriber):
+        with self._condition:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def _acquire(self):
+        sdk = self._camera.sdk
+        spots = sdk.spots
+        buffer = np.empty([spots[0].value, spots[1].value], dtype=np.float32)
+        try:
+            while self._running:
+                with self._condition:
+                    while self._running and not self._subscribers:
+                        self._condition.wait()
+                if not self._running:
+                    break
+                self._camera.acquire_wavefront(limit_to_pupil=self.limit_to_pupil, out=buffer)
+                self.publish(buffer, sdk.get_status())
+        except Exception:
+            log.exception("server acquisition failed")
+            # no more frames will follow, disconnect the clients so they get a ConnectionError instead of waiting forever
+            with self._condition:
+                self._running = False
+                subscribers = list(self._subscribers)
+            for subscriber in subscribers:
+                subscriber.close()
+
+    def publish(self, wavefront, status=0, timestamp=None):
+        """
+        This function sends a wavefront to all clients and returns its sequence number
+        """
+        with self._condition:
+            sequence = self.sequence
+            self.sequence += 1
+            subscribers = list(self._subscribers)
+        data = encode_frame(sequence, time.time() if timestamp is None else timestamp, wavefront, status)
+        for subscriber in subscribers:
+            subscriber.put(data)
+        return sequence
+
+    def close(self):
+        """
+        This function disconnects all clients and stops the server
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._socket.close()
+        self._threads = []
+        for subscriber in list(self._subscribers):
+            subscriber.close()
+        log.spam("server closed after %s frames", self.sequence)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class WfsClient(object):
+    """
+    This class receives the frames of a WfsServer. The payload is received directly into a preallocated array,
+    either the one passed to receive() or an internal buffer that is overwritten by the next call.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, timeout=None):
+        self._socket = socket.create_connection((host, port), timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._header = bytearray(HEADER.size)
+        self._header_view = memoryview(self._header)
+        self._buffer = None
+        self.received = 0
+        self.dropped = 0
+        self._sequence = None
+
+    def receive(self, out=None):
+        """
+        This function returns the next frame as WfsNetworkFrame, the wavefront is written into out if given
+        """
+        _recv_into(self._socket, self._header_view)
+        magic, sequence, timestamp, nx, ny, dtype, status, size = HEADER.unpack(self._header)
+        if magic != MAGIC:
+            raise WfsError("invalid frame header")
+        dtype = np.dtype(dtype.decode().strip())
+        if out is None:
+            if self._buffer is None or self._buffer.shape != (nx, ny) or self._buffer.dtype != dtype:
+                self._buffer = np.empty((nx, ny), dtype=dtype)
+            out = self._buffer
+        elif out.shape != (nx, ny) or out.dtype != dtype or not out.flags.c_contiguous:
+            raise WfsError(f"out has to be a contiguous {dtype} array of shape {(nx, ny)}")
+        if out.nbytes != size:
+            raise WfsError("payload size does not match the header")
+        _recv_into(self._socket, memoryview(out).cast("B"))
+        if self._sequence is not None:
+            self.dropped += sequence - self._sequence - 1
+        self._sequence = sequence
+        self.received += 1
+        return WfsNetworkFrame(sequence, timestamp, status, out)
+
+    def frames(self, count=None):
+        """
+        This function is a generator of received frames, count limits the number of frames
+        """
+        received = 0
+        while count is None or received < count:
+            yield self.receive()
+            received += 1
+
+    def __iter__(self):
+        return self.frames()
+
+    def close(self):
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
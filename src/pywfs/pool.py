@@ -0,0 +1,131 @@
+"""
+Pool
+====
+
+Several sensors driven together, every session runs on its own worker thread so the sensors are acquired concurrently.
+"""
+
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from .helper import log
+    from .sdk import WfsError, WFS_TRIGGER_MODES, HARDWARE_TRIGGER_MODES
+    from .wfs import WfsCamera
+except:
+    from helper import log
+    from sdk import WfsError, WFS_TRIGGER_MODES, HARDWARE_TRIGGER_MODES
+    from wfs import WfsCamera
+
+
+# one acquisition of all sensors, timestamps are taken on the host after each sensor finished
+WfsBundle = namedtuple("WfsBundle", ["index", "timestamp", "wavefronts", "timestamps"])
+
+
+class WfsPool(object):
+    """
+    This class opens several sensors of a WfsLib and acquires from all of them at once.
+    The total time per bundle is given by the slowest sensor instead of the sum of all sensors.
+    """
+
+    def __init__(self, lib, list_indices=None, configuration={}, trigger_mode=None, serials=None, timeout=1.0, poll_interval=1e-3):
+        """
+        list_indices selects the devices of lib.devices(), by default all devices that are not in use.
+        Alternatively serials selects the devices by their serial numbers independent of the enumeration order.
+        configuration is used for every camera, either one dict or a list with one dict per device.
+        With trigger_mode (see WFS_TRIGGER_MODES) all sensors wait for a common hardware trigger, acquire() arms all of them
+        before waiting up to timeout seconds per sensor (see WfsSDK.wait_for_trigger).
+        """
+        if serials is not None:
+            list_indices = [lib.find_device(serial=serial)[0] for serial in serials]
+        elif list_indices is None:
+            list_indices = [index for index, device in enumerate(lib.devices()) if device.in_use == 0]
+        if not list_indices:
+            raise WfsError("no sensors available")
+        if isinstance(configuration, dict):
+            configuration = [configuration] * len(list_indices)
+        self.list_indices = list(list_indices)
+        self.trigger_mode = None if trigger_mode is None else WFS_TRIGGER_MODES.get(trigger_mode, trigger_mode)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.cameras = []
+        self._executors = []
+        self.bundles = 0
+        try:
+            for list_index, camera_configuration in zip(self.list_indices, configuration):
+                camera_configuration = dict(camera_configuration)
+                if trigger_mode is not None:
+                    camera_configuration["trigger_mode"] = {"trigger_mode": self.trigger_mode}
+                self.cameras.append(WfsCamera(lib.open(list_index=list_index), camera_configuration))
+                self._executors.append(ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"WfsPool-{list_index}"))
+        except Exception:
+            self.close()
+            raise
+        log.spam("pool opened with sensors %s", self.list_indices)
+
+    def __len__(self):
+        return len(self.cameras)
+
+    def map(self, function, *args, **kwargs):
+        """
+        This function calls function(camera, *args, **kwargs) for every camera on its worker thread and returns the results
+        """
+        futures = [executor.submit(function, camera, *args, **kwargs) for camera, executor in zip(self.cameras, self._executors)]
+        return [future.result() for future in futures]
+
+    def configure(self, configuration=None):
+        """
+        This function configures all cameras concurrently, see WfsCamera.configure()
+        """
+        self.map(WfsCamera.configure, configuration)
+
+    def auto_exposure(self, max_tries=10):
+        """
+        This function adjusts the exposure of all cameras concurrently, see WfsCamera.auto_exposure()
+        """
+        self.map(WfsCamera.auto_exposure, max_tries)
+
+    def acquire(self, limit_to_pupil=True):
+        """
+        This function acquires one wavefront from every sensor concurrently and returns them as WfsBundle.
+        With a hardware trigger mode all sensors are armed first, so a single trigger is caught by all of them.
+        """
+        def acquire(camera):
+            wavefront = camera.acquire_wavefront(limit_to_pupil=limit_to_pupil)
+            return wavefront, time.time()
+
+        def triggered(camera):
+            status = camera.sdk.wait_for_trigger(self.timeout, self.poll_interval)
+            wavefront = camera.process_frame(status, limit_to_pupil=limit_to_pupil)
+            return wavefront, time.time()
+
+        timestamp = time.time()
+        if self.trigger_mode in HARDWARE_TRIGGER_MODES:
+            self.map(WfsCamera.arm)
+            results = self.map(triggered)
+        else:
+            results = self.map(acquire)
+        bundle = WfsBundle(self.bundles, timestamp, [result[0] for result in results], [result[1] for result in results])
+        self.bundles += 1
+        return bundle
+
+    def close(self):
+        """
+        This function stops the worker threads and closes all sensors
+        """
+        for executor in self._executors:
+            executor.shutdown(wait=True)
+        for camera in self.cameras:
+            try:
+                camera.close()
+            except Exception as e:
+                log.error("closing camera failed: %s", e)
+        self._executors = []
+        self.cameras = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,215 @@
+"""
+Processing
+==========
+
+Post-processing of wavefronts in a pool of worker processes. Frames are written into a ring of slots in shared memory and only
+the slot index is sent to the workers, so CPU heavy analysis scales across cores without pickling the frames.
+"""
+
+import time
+import queue
+import multiprocessing
+from collections import deque, namedtuple
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+
+try:
+    from .helper import log
+    from .sdk import WfsError, SPOT_FIELDS
+except:
+    from helper import log
+    from sdk import WfsError, SPOT_FIELDS
+
+
+# results of all stages for one frame, in the order the frames were submitted
+WfsResult = namedtuple("WfsResult", ["index", "timestamp", "results"])
+
+# state of a worker process, set by _attach()
+_worker = {}
+
+
+def slot_dtype(spots, spot_data=False):
+    """
+    This function returns the record of one slot: index, timestamp, wavefront and optionally the spot data (see SPOT_FIELDS)
+    """
+    fields = [("index", np.int64), ("timestamp", np.float64), ("wavefront", np.float32, tuple(spots))]
+    if spot_data:
+        fields.append(("spots", [(field, np.float32) for field in SPOT_FIELDS], tuple(spots)))
+    return np.dtype(fields)
+
+
+def _attach(name, dtype, slots, stages):
+    """
+    This function maps the slot ring into a worker process
+    """
+    shm = SharedMemory(name=name)
+    ring = np.ndarray(slots, dtype=dtype, buffer=shm.buf)
+    ring.setflags(write=False)
+    _worker.update(shm=shm, ring=ring, stages=stages)
+
+
+def _process(slot):
+    """
+    This function runs all stages on the frame in slot within a worker process
+    """
+    frame = _worker["ring"][slot]
+    return {name: stage(frame) for name, stage in _worker["stages"]}
+
+
+class WfsPipeline(object):
+    """
+    This class acquires wavefronts from a WfsCamera into a shared memory slot ring and analyses them in worker processes.
+
+    Stages are functions stage(frame) registered with register(), frame is the read-only record of the slot with the fields
+    index, timestamp, wavefront and (with spot_data) spots. Stages have to be picklable, i.e. defined at module level, and must
+    not keep references to the frame, the slot is reused as soon as all stages of the frame returned.
+    The results are returned in frame order, acquisition blocks while all slots are in use.
+    """
+
+    def __init__(self, camera=None, slots=8, workers=None, spot_data=False, limit_to_pupil=True, spots=None):
+        """
+        workers is the number of processes (default os.cpu_count()). Without camera frames are only passed to submit(),
+        spots then gives the wavefront shape (spots X, spots Y).
+        """
+        self._camera = camera
+        self.slots = slots
+        self.workers = workers
+        self.spot_data = spot_data
+        self.limit_to_pupil = limit_to_pupil
+        self.spots = spots
+        self._stages = []
+        self._shm = None
+        self._ring = None
+        self._pool = None
+        self._free = queue.Queue()
+        self._pending = deque()
+        self.submitted = 0
+        self.completed = 0
+
+    @property
+    def running(self):
+        return self._pool is not None
+
+    def register(self, function, name=None):
+        """
+        This function appends an analysis stage, the result of the frame is stored under name (default function.__name__)
+        """
+        if self.running:
+            raise WfsError("stages have to be registered before the pipeline is started")
+        self._stages.append((name or function.__name__, function))
+        return function
+
+    def start(self):
+        """
+        This function allocates the slot ring and starts the worker processes
+        """
+        if self.running:
+            return self
+        if self._camera is not None:
+            if self._camera.configuration is None:
+                self._camera.configure()
+            self.spots = [self._camera.sdk.spots[0].value, self._camera.sdk.spots[1].value]
+        if self.spots is None:
+            raise WfsError("spots have to be given without camera")
+        dtype = slot_dtype(self.spots, self.spot_data)
+        self._shm = SharedMemory(create=True, size=dtype.itemsize * self.slots)
+        self._ring = np.ndarray(self.slots, dtype=dtype, buffer=self._shm.buf)
+        for slot in range(self.slots):
+            self._free.put(slot)
+        self._pool = multiprocessing.Pool(self.workers, initializer=_attach, initargs=(self._shm.name, dtype, self.slots, self._stages))
+        log.spam("pipeline started with %s slots of %s bytes", self.slots, dtype.itemsize)
+        return self
+
+    def _release(self, slot):
+        def release(result):
+            self._free.put(slot)
+        return release
+
+    def submit(self, wavefront=None, timestamp=None):
+        """
+        This function writes a frame into the next free slot and dispatches it to the workers, it returns the frame index.
+        Without wavefront the frame is acquired from the camera directly into the slot.
+        """
+        if not self.running:
+            self.start()
+        slot = self._free.get()
+        index = self.submitted
+        try:
+            if wavefront is None:
+                self._camera.acquire_wavefront(limit_to_pupil=self.limit_to_pupil, out=self._ring["wavefront"][slot])
+                if self.spot_data:
+                    self._camera.sdk.get_spot_data(out=self._ring["spots"][slot])
+            else:
+                self._ring["wavefront"][slot] = wavefront
+            self._ring["index"][slot] = index
+            self._ring["timestamp"][slot] = time.time() if timestamp is None else timestamp
+        except Exception:
+            self._free.put(slot)
+            raise
+        release = self._release(slot)
+        result = self._pool.apply_async(_process, (slot,), callback=release, error_callback=release)
+        self._pending.append((index, float(self._ring["timestamp"][slot]), result))
+        self.submitted += 1
+        return index
+
+    def __len__(self):
+        """
+        This function returns the number of frames whose results have not been returned yet
+        """
+        return len(self._pending)
+
+    def results(self, block=True, timeout=None):
+        """
+        This function is a generator of WfsResult in frame order. With block it waits for all submitted frames,
+        otherwise it stops at the first frame that is not finished. Errors of a stage are raised here.
+        """
+        while self._pending:
+            index, timestamp, result = self._pending[0]
+            if not block and not result.ready():
+                return
+            try:
+                results = result.get(timeout)
+            except multiprocessing.TimeoutError:
+                raise
+            except Exception:
+                # the slot is already released, the failed frame is not returned again
+                self._pending.popleft()
+                raise
+            self._pending.popleft()
+            self.completed += 1
+            yield WfsResult(index, timestamp, results)
+
+    def run(self, count=None):
+        """
+        This function acquires count frames (forever with None) from the camera and yields their WfsResult in frame order
+        """
+        acquired = 0
+        while count is None or acquired < count:
+            self.submit()
+            acquired += 1
+            yield from self.results(block=False)
+        yield from self.results()
+
+    def close(self):
+        """
+        This function stops the workers and releases the shared memory, results not yet returned are lost
+        """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        self._pending.clear()
+        self._free = queue.Queue()
+        if self._shm is not None:
+            self._ring = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+        log.spam("pipeline closed after %s frames", self.completed)
+
+    def __enter__(self):
+        # the workers are started by the first submit(), so stages can still be registered
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,233 @@
+"""
+Recorder
+========
+
+Append-only on-disk recording of wavefront sequences and a lazy, memory-mapped reader.
+
+A recording is a single file: a small header (magic, version, length of a JSON document with the frame layout and
+the sensor metadata) padded to HEADER_ALIGNMENT bytes, followed by fixed-size frame records. Frames are buffered and
+written in chunks, the number of frames follows from the file size, so an interrupted recording stays readable.
+"""
+
+import os
+import json
+import time
+import struct
+import numpy as np
+
+try:
+    from .helper import log
+    from .sdk import WfsError
+except:
+    from helper import log
+    from sdk import WfsError
+
+
+MAGIC = b"PYWFSREC"
+VERSION = 1
+HEADER_ALIGNMENT = 4096
+
+
+def record_dtype(spots, slopes=False):
+    """
+    This function returns the dtype of one frame record, wavefront and slopes are stored in X, Y order
+    """
+    fields = [
+        ("timestamp", np.float64),
+        ("status", np.uint32),
+        ("exposure_time", np.float32),
+        ("master_gain", np.float32),
+        ("wavefront", np.float32, tuple(spots))
+    ]
+    if slopes:
+        fields.append(("slopes", np.float32, (2,) + tuple(spots)))
+    return np.dtype(fields)
+
+
+def sdk_metadata(sdk):
+    """
+    This function collects resolution, MLA, pupil and exposure settings of a configured WfsSDK
+    """
+    def value(name, default=None):
+        attribute = getattr(sdk, name, None)
+        if attribute is None:
+            return default
+        if isinstance(attribute, list):
+            return [a.value for a in attribute]
+        return attribute.value
+    mla_index = value("mla_index", 0)
+    mla = sdk.get_mla_info()[mla_index]
+    return {
+        "instrument_name": sdk.instrument_name,
+        "cam_resol_index": value("cam_resol_index"),
+        "spots": value("spots"),
+        "mla_index": mla_index,
+        "mla": {
+            "name": mla[0].decode(),
+            "cam_pitch": mla[1],
+            "lenslet_pitch": mla[2],
+            "spot_offset": [mla[3], mla[4]],
+            "lenslet_f": mla[5],
+            "grd_corr_0": mla[6],
+            "grd_corr_45": mla[7]
+        },
+        "pupil_center": value("pupil_center"),
+        "pupil_diameter": value("pupil_diameter"),
+        "reference_index": value("reference_index"),
+        "exposure_time": value("exposure_time_act"),
+        "master_gain": value("master_gain_act")
+    }
+
+
+def _read_header(f):
+    """
+    This function reads the header of a recording and returns its JSON document and the offset of the first frame
+    """
+    magic, version, length = struct.unpack("<8sII", f.read(16))
+    if magic != MAGIC:
+        raise WfsError(f"{f.name} is not a wavefront recording")
+    if version != VERSION:
+        raise WfsError(f"unsupported recording version {version}")
+    header = json.loads(f.read(length).decode())
+    return header, -(-(16 + length) // HEADER_ALIGNMENT) * HEADER_ALIGNMENT
+
+
+class WfsRecorder(object):
+    """
+    This class appends frames to a recording, frames are collected in a chunk buffer and written in bulk
+    """
+
+    def __init__(self, filename, spots, slopes=False, chunk_size=64, metadata={}, append=False):
+        """
+        spots is the number of spots [X, Y], with slopes the X and Y deviations of every spot are stored as well.
+        With append an existing recording with the same layout is continued.
+        """
+        self.filename = filename
+        self.dtype = record_dtype(spots, slopes)
+        self.slopes = slopes
+        self._chunk = np.zeros(chunk_size, dtype=self.dtype)
+        self._count = 0
+        if append and os.path.exists(filename):
+            with open(filename, "rb") as f:
+                header, offset = _read_header(f)
+            if header["spots"] != list(spots) or header["slopes"] != slopes:
+                raise WfsError(f"{filename} has a different frame layout")
+            self.metadata = header["metadata"]
+            # drop a partially written frame
+            frames = (os.path.getsize(filename) - offset) // self.dtype.itemsize
+            self._file = open(filename, "r+b")
+            self._file.truncate(offset + frames * self.dtype.itemsize)
+            self._file.seek(0, os.SEEK_END)
+            self.frames = frames
+            log.spam("appending to %s with %s frames", filename, frames)
+        else:
+            self.metadata = dict(metadata)
+            header = json.dumps({"spots": list(spots), "slopes": slopes, "metadata": self.metadata}).encode()
+            self._file = open(filename, "wb")
+            self._file.write(struct.pack("<8sII", MAGIC, VERSION, len(header)) + header)
+            self._file.write(b"\0" * (-(16 + len(header)) % HEADER_ALIGNMENT))
+            self.frames = 0
+            log.spam("recording to %s", filename)
+
+    @classmethod
+    def from_sdk(cls, filename, sdk, slopes=False, chunk_size=64, append=False):
+        """
+        This function creates a recorder for the spot grid of a configured WfsSDK and stores its settings in the header
+        """
+        spots = [sdk.spots[0].value, sdk.spots[1].value]
+        return cls(filename, spots, slopes=slopes, chunk_size=chunk_size, metadata=sdk_metadata(sdk), append=append)
+
+    def __len__(self):
+        return self.frames
+
+    def append(self, wavefront, slopes=None, status=0, timestamp=None, exposure_time=np.nan, master_gain=np.nan):
+        """
+        This function adds one frame, slopes are the X and Y spot deviations if the recorder stores slopes
+        """
+        record = self._chunk[self._count]
+        record["timestamp"] = time.time() if timestamp is None else timestamp
+        record["status"] = status
+        record["exposure_time"] = exposure_time
+        record["master_gain"] = master_gain
+        record["wavefront"] = wavefront
+        if self.slopes:
+            record["slopes"] = slopes
+        self._count += 1
+        self.frames += 1
+        if self._count == len(self._chunk):
+            self.flush()
+
+    def flush(self):
+        """
+        This function writes the buffered frames to disk
+        """
+        if self._count:
+            self._chunk[:self._count].tofile(self._file)
+            self._count = 0
+        self._file.flush()
+
+    def close(self):
+        """
+        This function writes the remaining frames and closes the file
+        """
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+            log.spam("recorded %s frames to %s", self.frames, self.filename)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class WfsRecording(object):
+    """
+    This class opens a recording lazily, frames are memory-mapped and only read when accessed.
+    Indexing and slicing return records with the fields timestamp, status, exposure_time, master_gain, wavefront and optionally slopes.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            header, offset = _read_header(f)
+        self.spots = header["spots"]
+        self.metadata = header["metadata"]
+        self.dtype = record_dtype(self.spots, header["slopes"])
+        frames = (os.path.getsize(filename) - offset) // self.dtype.itemsize
+        if frames:
+            self._frames = np.memmap(filename, dtype=self.dtype, mode="r", offset=offset, shape=(frames,))
+        else:
+            self._frames = np.zeros(0, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __getitem__(self, index):
+        return self._frames[index]
+
+    def __iter__(self):
+        return iter(self._frames)
+
+    def field(self, name):
+        """
+        This function returns a memory-mapped view of one field over all frames, e.g. field("wavefront") has the shape (frames, spots X, spots Y)
+        """
+        return self._frames[name]
+
+    @property
+    def wavefront(self):
+        return self.field("wavefront")
+
+    @property
+    def slopes(self):
+        return self.field("slopes")
+
+    @property
+    def status(self):
+        return self.field("status")
+
+    @property
+    def timestamp(self):
+        return self.field("timestamp")
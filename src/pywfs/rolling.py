@@ -0,0 +1,188 @@
+"""
+Rolling
+=======
+
+Rolling statistics of wavefronts for long-duration stability monitoring. Every frame updates the running mean and variance
+(Welford) and the exponential moving average of every lenslet within the pupil, the PV and RMS of the last frames are kept
+in a ring. The memory is fixed when the first frame arrives and does not grow with the run length.
+"""
+
+import time
+import numpy as np
+
+try:
+    from .helper import log, describe
+    from .sdk import WfsError
+except:
+    from helper import log, describe
+    from sdk import WfsError
+
+
+class WfsStatistics(object):
+    """
+    This class accumulates the statistics of wavefronts (spots X, spots Y) passed to update(), e.g. by WfsCamera
+    (see WfsCamera.set_statistics). Lenslets outside of mask are ignored, NaN lenslets within the mask do not count
+    for that frame. The default mask are the finite lenslets of the first frame, i.e. the pupil of limit_to_pupil=True.
+    """
+
+    def __init__(self, window=1024, alpha=0.1, mask=None):
+        """
+        window is the number of frames kept for the windowed PV and RMS, alpha the weight of a new frame in the moving average
+        """
+        if window < 1:
+            raise WfsError("window has to be at least 1")
+        if not 0 < alpha <= 1:
+            raise WfsError("alpha has to be in (0, 1]")
+        self.window = window
+        self.alpha = alpha
+        self.mask = None if mask is None else np.asarray(mask, dtype=bool)
+        # per frame pv, rms, mean and timestamp
+        self._frames = np.zeros((window, 4), dtype=np.float64)
+        self._values = None
+        self.count = 0
+
+    def _allocate(self, shape):
+        if self.mask is None:
+            raise WfsError("the first frame has no finite lenslets")
+        if self.mask.shape != shape:
+            raise WfsError(f"wavefronts have to be of shape {self.mask.shape}")
+        size = np.count_nonzero(self.mask)
+        log.spam("tracking the statistics of %d lenslets", size)
+        self._values = np.empty(size, dtype=np.float64)
+        self._valid = np.empty(size, dtype=bool)
+        self._delta = np.zeros(size, dtype=np.float64)
+        self._counts = np.zeros(size, dtype=np.int64)
+        self._mean = np.zeros(size, dtype=np.float64)
+        self._m2 = np.zeros(size, dtype=np.float64)
+        self._ema = np.full(size, np.nan, dtype=np.float64)
+
+    def reset(self):
+        """
+        This function discards all frames, the mask is kept
+        """
+        self._values = None
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.window)
+
+    def update(self, wavefront, timestamp=None):
+        """
+        This function adds one wavefront and returns its PV and RMS within the mask in um
+        """
+        wavefront = np.asarray(wavefront)
+        if self._values is None:
+            if self.mask is None and np.isfinite(wavefront).any():
+                self.mask = np.isfinite(wavefront)
+            self._allocate(wavefront.shape)
+        elif wavefront.shape != self.mask.shape:
+            raise WfsError(f"wavefronts have to be of shape {self.mask.shape}")
+        values, valid, delta = self._values, self._valid, self._delta
+        values[:] = wavefront[self.mask]
+        np.isfinite(values, out=valid)
+        # Welford per lenslet, lenslets without value in this frame keep their state
+        self._counts += valid
+        np.subtract(values, self._mean, out=delta, where=valid)
+        np.divide(delta, self._counts, out=delta, where=valid)
+        np.add(self._mean, delta, out=self._mean, where=valid)
+        # (x - mean_old) (x - mean_new) = n (n - 1) (delta / n)^2
+        np.add(self._m2, delta * delta * self._counts * (self._counts - 1), out=self._m2, where=valid)
+        # the moving average starts at the first value of every lenslet
+        first = valid & np.isnan(self._ema)
+        self._ema[first] = values[first]
+        np.add(self._ema, self.alpha * (values - self._ema), out=self._ema, where=valid & ~first)
+        finite = values if valid.all() else values[valid]
+        if finite.size:
+            pv, rms, mean = np.ptp(finite), finite.std(), finite.mean()
+        else:
+            pv = rms = mean = np.nan
+        self._frames[self.count % self.window] = pv, rms, mean, time.time() if timestamp is None else timestamp
+        self.count += 1
+        return pv, rms
+
+    def _expand(self, values):
+        """
+        This function returns values of the lenslets within the mask as array of the wavefront shape, NaN outside
+        """
+        if self.mask is None:
+            return None
+        out = np.full(self.mask.shape, np.nan, dtype=np.float32)
+        if self._values is not None:
+            out[self.mask] = values
+        return out
+
+    @property
+    def mean(self):
+        """
+        This function returns the running mean of every lenslet in um
+        """
+        return self._expand(np.where(self._counts > 0, self._mean, np.nan) if self._values is not None else None)
+
+    @property
+    def variance(self):
+        """
+        This function returns the running (sample) variance of every lenslet in um^2
+        """
+        if self._values is None:
+            return self._expand(None)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self._expand(np.where(self._counts > 1, self._m2 / (self._counts - 1), np.nan))
+
+    @property
+    def std(self):
+        """
+        This function returns the running standard deviation of every lenslet in um
+        """
+        return np.sqrt(self.variance)
+
+    @property
+    def ema(self):
+        """
+        This function returns the exponential moving average of every lenslet in um
+        """
+        return self._expand(self._ema if self._values is not None else None)
+
+    def _window(self, column):
+        if self.count > self.window:
+            return np.roll(self._frames[:, column], -(self.count % self.window), axis=0)
+        return self._frames[:self.count, column].copy()
+
+    @property
+    def pv(self):
+        """
+        This function returns the PV of the frames in the window, oldest first
+        """
+        return self._window(0)
+
+    @property
+    def rms(self):
+        """
+        This function returns the RMS of the frames in the window, oldest first
+        """
+        return self._window(1)
+
+    @property
+    def timestamps(self):
+        """
+        This function returns the timestamps of the frames in the window, oldest first
+        """
+        return self._window(3)
+
+    def summary(self):
+        """
+        This function returns the statistics of all frames in um:
+            pv, rms: of the frames in the window (mean, std, p50, p99 and max)
+            piston: standard deviation of the mean of the frames in the window
+            mean_pv, mean_rms: of the running mean wavefront
+            stability: RMS over the mask of the standard deviation of every lenslet, i.e. the temporal fluctuation
+        """
+        pv, rms, piston = [values[np.isfinite(values)] for values in self._window(slice(0, 3)).T]
+        summary = {"frames": self.count, "pv": describe(pv), "rms": describe(rms), "piston": float(np.std(piston)) if len(piston) else None}
+        if self._values is None or not (self._counts > 0).any():
+            return dict(summary, mean_pv=None, mean_rms=None, stability=None)
+        mean = self._mean[self._counts > 0]
+        variance = self._m2[self._counts > 1] / (self._counts[self._counts > 1] - 1)
+        summary["mean_pv"] = float(np.ptp(mean))
+        summary["mean_rms"] = float(mean.std())
+        summary["stability"] = float(np.sqrt(variance.mean())) if len(variance) else None
+        return summary
@@ -2,13 +2,21 @@
 
 """
 
+import time
+from enum import IntFlag
+from collections import namedtuple
+from contextlib import contextmanager
 from ctypes import c_uint8, c_int16, c_int32, c_double, c_ulong, c_float, c_bool, c_char, c_char_p, create_string_buffer, byref, POINTER
 import numpy as np
 
 try:
     from .helper import log
+    from .calibration import calibration_key
+    from .timing import TimedDll
 except:
     from helper import log
+    from calibration import calibration_key
+    from timing import TimedDll
 
 
 # WFS status bits
@@ -33,10 +41,104 @@ WFS_STATUS = {
 }
 
 
+class StatusFlag(IntFlag):
+    """
+    This class is the base of WfsStatus, a status word that also supports the dict access of former versions, e.g. status["PTH"],
+    "PTH" in status, dict(status) or iterating over the keys. The raised flags are [flag for flag in WfsStatus if flag & status].
+    On hot paths test the bits with a single AND instead, e.g. status & (WfsStatus.PTH | WfsStatus.PTL).
+    """
+
+    def __getitem__(self, key):
+        return bool(self._value_ & WFS_STATUS[key])
+
+    def __contains__(self, key):
+        # the keys like the former dict, flags are still tested for membership as usual
+        if isinstance(key, str):
+            return key in WFS_STATUS
+        return super().__contains__(key)
+
+    def __iter__(self):
+        return iter(WFS_STATUS)
+
+    def __len__(self):
+        return len(WFS_STATUS)
+
+    def get(self, key, default=None):
+        return self[key] if key in WFS_STATUS else default
+
+    def keys(self):
+        return WFS_STATUS.keys()
+
+    def values(self):
+        return [self[key] for key in WFS_STATUS]
+
+    def items(self):
+        return [(key, self[key]) for key in WFS_STATUS]
+
+    def to_dict(self):
+        return dict(self.items())
+
+
+# the status bits as flags
+WfsStatus = StatusFlag("WfsStatus", WFS_STATUS, module=__name__)
+
+
 # MAX_SPOTS is actually a constrained by the library version
 # see WFS.h for the actual value
 MAX_SPOTS = [80, 80]
 
+# trigger modes, see WFS.h
+WFS_TRIGGER_MODES = {
+    "off": 0,  # no hardware trigger, images are taken immediately
+    "high_low": 1,  # hardware trigger on falling edge
+    "low_high": 2,  # hardware trigger on rising edge
+    "software": 3  # software trigger
+}
+
+# trigger modes in which taking an image only arms the camera, the image is taken on an edge of the trigger input
+HARDWARE_TRIGGER_MODES = (WFS_TRIGGER_MODES["high_low"], WFS_TRIGGER_MODES["low_high"])
+
+# camera resolutions [X, Y] in pixels indexed by cam_resol_index, see the manuals of the instrument families
+CAM_RESOLUTIONS = {
+    "WFS10": [[640, 480], [480, 480], [360, 360], [260, 260], [180, 180]],
+    "WFS20": [[1440, 1080], [1080, 1080], [768, 768], [512, 512], [360, 360], [720, 540], [540, 540], [384, 384], [256, 256], [180, 180]],
+    "WFS30": [[1936, 1216], [1216, 1216], [1024, 1024], [768, 768], [512, 512], [360, 360], [968, 608], [608, 608], [512, 512], [384, 384], [256, 256], [180, 180]],
+    "WFS40": [[2048, 2048], [1536, 1536], [1024, 1024], [768, 768], [512, 512], [360, 360], [1024, 1024], [768, 768], [512, 512], [384, 384], [256, 256], [180, 180]],
+    "WFS150": [[1280, 1024], [1024, 1024], [768, 768], [512, 512], [320, 320]],
+    "WFS300": [[1280, 1024], [1024, 1024], [768, 768], [512, 512], [320, 320]]
+}
+
+# instrument families matched against the instrument name, the longer names first as WFS300 starts with WFS30
+CAM_FAMILIES = sorted(CAM_RESOLUTIONS, key=len, reverse=True)
+
+# the largest image of all instruments, used for the buffers of unknown instruments
+MAX_IMAGE_SIZE = max((size for sizes in CAM_RESOLUTIONS.values() for size in sizes), key=lambda size: size[0] * size[1])
+
+
+def camera_resolutions(instrument_name):
+    """
+    This function returns the camera resolutions of the family of an instrument or None for unknown instruments
+    """
+    for family in CAM_FAMILIES:
+        if instrument_name.startswith(family):
+            return CAM_RESOLUTIONS[family]
+    return None
+
+
+# see WFS.h, the zernike arrays of the dll are indexed starting with 1
+MAX_ZERNIKE_MODES = 66
+MAX_ZERNIKE_ORDERS = 10
+
+# per spot data, dll function and the fields it fills
+SPOT_DATA = [
+    ["WFS_GetSpotCentroids", ["centroid_x", "centroid_y"]],
+    ["WFS_GetSpotDiameters", ["diameter_x", "diameter_y"]],
+    ["WFS_GetSpotIntensities", ["intensity"]],
+    ["WFS_GetSpotReferencePositions", ["reference_x", "reference_y"]],
+    ["WFS_GetSpotDeviations", ["deviation_x", "deviation_y"]]
+]
+SPOT_FIELDS = [field for function, fields in SPOT_DATA for field in fields]
+
 # defining names according to the manual
 ViStatus = c_int32
 ViBoolean = c_bool
@@ -49,7 +151,14 @@ ViReal64 = c_double
 ViChar256 = c_char * 256
 ViChar512 = c_char * 512
 ViRsrc = ViChar256
-ArrFloat = np.ctypeslib.ndpointer(shape=MAX_SPOTS[::-1])  # note the Y, X order
+ArrFloat = np.ctypeslib.ndpointer(dtype=np.float32, shape=MAX_SPOTS[::-1], flags="C_CONTIGUOUS")  # note the Y, X order
+ArrZernikeModes = np.ctypeslib.ndpointer(dtype=np.float32, shape=(MAX_ZERNIKE_MODES + 1,), flags="C_CONTIGUOUS")
+ArrZernikeOrders = np.ctypeslib.ndpointer(dtype=np.float32, shape=(MAX_ZERNIKE_ORDERS + 1,), flags="C_CONTIGUOUS")
+ArrUInt8 = np.ctypeslib.ndpointer(dtype=np.uint8, flags="C_CONTIGUOUS")
+ArrFloatX = np.ctypeslib.ndpointer(dtype=np.float32, shape=MAX_SPOTS[:1], flags="C_CONTIGUOUS")
+ArrFloatY = np.ctypeslib.ndpointer(dtype=np.float32, shape=MAX_SPOTS[1:], flags="C_CONTIGUOUS")
+ArrInt32X = np.ctypeslib.ndpointer(dtype=np.int32, shape=MAX_SPOTS[:1], flags="C_CONTIGUOUS")
+ArrInt32Y = np.ctypeslib.ndpointer(dtype=np.int32, shape=MAX_SPOTS[1:], flags="C_CONTIGUOUS")
 
 # VI_NULL = lambda: None
 VI_NULL = lambda: c_ulong()
@@ -65,224 +174,193 @@ class WfsError(Exception):
     pass
 
 
-class WfsLib(object):
-    """
-    This class provides a Python wrapper for the bare C functions
-    """
-
-    def __init__(self, dll):
-        # general methods for WFS library
-        dll.WFS_init.restype = ViStatus
-        dll.WFS_init.argtypes = [ViRsrc, ViBoolean, ViBoolean, POINTER(ViSession)]
-
-        dll.WFS_close.restype = ViStatus
-        dll.WFS_close.argtypes = [ViSession]
-        
-        # configuration functions
-        dll.WFS_GetInstrumentInfo.restype = ViStatus
-        dll.WFS_GetInstrumentInfo.argtypes = [ViSession, ViChar256, ViChar256, ViChar256, ViChar256]
-
-        dll.WFS_ConfigureCam.restype = ViStatus
-        dll.WFS_ConfigureCam.argtypes = [ViSession, ViInt32, ViInt32, POINTER(ViInt32), POINTER(ViInt32)]
-
-        dll.WFS_SetHighspeedMode.restype = ViStatus
-        dll.WFS_SetHighspeedMode.argtypes = [ViSession, ViInt32, ViInt32, ViInt32, ViInt32]
-
-        dll.WFS_GetHighspeedWindows.restype = ViStatus
-        dll.WFS_GetHighspeedWindows.argtypes = [POINTER(ViInt32), POINTER(ViInt32), POINTER(ViInt32), POINTER(ViInt32), ViInt32, ViInt32]
-
-        dll.WFS_CheckHighspeedCentroids.restype = ViStatus
-        dll.WFS_CheckHighspeedCentroids.argtypes = [ViSession]
-
-        dll.WFS_GetExposureTimeRange.restype = ViStatus
-        dll.WFS_GetExposureTimeRange.argtypes = [ViSession, POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64)]
-
-        dll.WFS_SetExposureTime.restype = ViStatus
-        dll.WFS_SetExposureTime.argtypes = [ViSession, ViReal64, POINTER(ViReal64)]
-
-        dll.WFS_GetExposureTime.restype = ViStatus
-        dll.WFS_GetExposureTime.argtypes = [ViSession, POINTER(ViReal64)]
-
-        dll.WFS_GetMasterGainRange.restype = ViStatus
-        dll.WFS_GetMasterGainRange.argtypes = [ViSession, POINTER(ViReal64), POINTER(ViReal64)]
-
-        dll.WFS_SetMasterGain.restype = ViStatus
-        dll.WFS_SetMasterGain.argtypes = [ViSession, ViReal64, POINTER(ViReal64)]
-
-        dll.WFS_GetMasterGain.restype = ViStatus
-        dll.WFS_GetMasterGain.argtypes = [ViSession, POINTER(ViReal64)]
-
-        dll.WFS_SetBlackLevelOffset.restype = ViStatus
-        dll.WFS_SetBlackLevelOffset.argtypes = [ViSession, ViInt32]
-
-        dll.WFS_GetBlackLevelOffset.restype = ViStatus
-        dll.WFS_GetBlackLevelOffset.argtypes = [ViSession, POINTER(ViInt32)]
-
-        dll.WFS_SetTriggerMode.restype = ViStatus
-        dll.WFS_SetTriggerMode.argtypes = [ViSession, ViInt32]
-
-        dll.WFS_GetTriggerMode.restype = ViStatus
-        dll.WFS_GetTriggerMode.argtypes = [ViSession, POINTER(ViInt32)]
-
-        # dll.WFS_SetTriggerDelayRange.restype = ViStatus
-        # dll.WFS_SetTriggerDelayRange.argtypes = [ViSession, POINTER(ViInt32), POINTER(ViInt32), POINTER(ViInt32)]
-
-        dll.WFS_GetMlaCount.restype = ViStatus
-        dll.WFS_GetMlaCount.argtypes = [ViSession, POINTER(ViInt32)]
-
-        dll.WFS_GetMlaData.restype = ViStatus
-        dll.WFS_GetMlaData.argtypes = [ViSession, ViInt32, ViChar256, POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64)]
-        
-        dll.WFS_GetMlaData2.restype = ViStatus
-        dll.WFS_GetMlaData2.argtypes = [ViSession, ViInt32, ViChar256, POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64)]
-
-        dll.WFS_SelectMla.restype = ViStatus
-        dll.WFS_SelectMla.argtypes = [ViSession, ViInt32]
-
-        # WFS_SetAoi and WFS_SetAoi are undocumented and thus left out
-
-        dll.WFS_SetPupil.restype = ViStatus
-        dll.WFS_SetPupil.argtypes = [ViSession, ViReal64, ViReal64, ViReal64, ViReal64]
-
-        dll.WFS_GetPupil.restype = ViStatus
-        dll.WFS_GetPupil.argtypes = [ViSession, POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64)]
-
-        dll.WFS_SetReferencePlane.restype = ViStatus
-        dll.WFS_SetReferencePlane.argtypes = [ViSession, ViInt32]
-
-        dll.WFS_GetReferencePlane.restype = ViStatus
-        dll.WFS_GetReferencePlane.argtypes = [ViSession, POINTER(ViInt32)]
-
-        # Action/Status Functions
-        dll.WFS_GetStatus.restype = ViStatus
-        dll.WFS_GetStatus.argtypes = [ViSession, POINTER(ViInt32)]
+# one entry of the instrument list
+WfsDevice = namedtuple("WfsDevice", ["device_id", "in_use", "instrument_name", "serial", "resource_name"])
 
-        # Data Functions
-        dll.WFS_TakeSpotfieldImage.restype = ViStatus
-        dll.WFS_TakeSpotfieldImage.argtypes = [ViSession]
+# statistics of the last calculated wavefront within the pupil in um, see WfsSDK.calc_wavefront_statistics()
+WfsWavefrontStatistics = namedtuple("WfsWavefrontStatistics", ["min", "max", "pv", "mean", "rms", "weighted_rms"])
 
-        dll.WFS_TakeSpotfieldImageAutoExpos.restype = ViStatus
-        dll.WFS_TakeSpotfieldImageAutoExpos.argtypes = [ViSession, POINTER(ViReal64), POINTER(ViReal64)]
 
-        # WFS_GetSpotfieldImage left out
-
-        dll.WFS_GetSpotfieldImageCopy.restype = ViStatus
-        dll.WFS_GetSpotfieldImageCopy.argtypes = [ViSession, ViUInt8, POINTER(ViInt32), POINTER(ViInt32)]  # ViUInt8[]
-
-        dll.WFS_AverageImage.restype = ViStatus
-        dll.WFS_AverageImage.argtypes = [ViSession, ViInt32, POINTER(ViInt32)]
-
-        dll.WFS_AverageImageRolling.restype = ViStatus
-        dll.WFS_AverageImageRolling.argtypes = [ViSession, ViInt32, ViInt32]
-
-        dll.WFS_CutImageNoiseFloor.restype = ViStatus
-        dll.WFS_CutImageNoiseFloor.argtypes = [ViSession, ViInt32]
-
-        dll.WFS_CalcImageMinMax.restype = ViStatus
-        dll.WFS_CalcImageMinMax.argtypes = [ViSession, POINTER(ViInt32), POINTER(ViInt32), POINTER(ViReal64)]
-
-        dll.WFS_CalcMeanRmsNoise.restype = ViStatus
-        dll.WFS_CalcMeanRmsNoise.argtypes = [ViSession, POINTER(ViReal64), POINTER(ViReal64)]
-
-        dll.WFS_GetLine.restype = ViStatus
-        dll.WFS_GetLine.argtypes = [ViSession, ViInt32, c_float] # float[]
-
-        dll.WFS_GetLineView.restype = ViStatus
-        dll.WFS_GetLineView.argtypes = [ViSession, c_float, c_float] # float[]
-
-        dll.WFS_CalcBeamCentroidDia.restype = ViStatus
-        dll.WFS_CalcBeamCentroidDia.argtypes = [ViSession, POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64)]
-
-        dll.WFS_CalcSpotsCentrDiaIntens.restype = ViStatus
-        dll.WFS_CalcSpotsCentrDiaIntens.argtypes = [ViSession, ViInt32, ViInt32]
-
-        dll.WFS_GetSpotCentroids.restype = ViStatus
-        dll.WFS_GetSpotCentroids.argtypes = [ViSession, c_float, c_float] # float[]
-
-        dll.WFS_GetSpotDiameters.restype = ViStatus
-        dll.WFS_GetSpotDiameters.argtypes = [ViSession, c_float, c_float] # float[]
-
-        dll.WFS_GetSpotDiaStatistics.restype = ViStatus
-        dll.WFS_GetSpotDiaStatistics.argtypes = [ViSession, POINTER(ViInt32), POINTER(ViInt32), POINTER(ViInt32)]
-
-        dll.WFS_GetSpotIntensities.restype = ViStatus
-        dll.WFS_GetSpotIntensities.argtypes = [ViSession, c_float] # float[]
-
-        dll.WFS_CalcSpotToReferenceDeviations.restype = ViStatus
-        dll.WFS_CalcSpotToReferenceDeviations.argtypes = [ViSession, ViInt32]
-
-        dll.WFS_GetSpotReferencePositions.restype = ViStatus
-        dll.WFS_GetSpotReferencePositions.argtypes = [ViSession, c_float, c_float] # float[]
-
-        dll.WFS_GetSpotDeviations.restype = ViStatus
-        dll.WFS_GetSpotDeviations.argtypes = [ViSession, c_float, c_float] # float[]
-
-        dll.WFS_ZernikeLsf.restype = ViStatus
-        dll.WFS_ZernikeLsf.argtypes = [ViSession, POINTER(ViInt32), c_float, c_float, POINTER(ViReal64)] # float[]
-
-        dll.WFS_CalcFourierOptometric.restype = ViStatus
-        dll.WFS_CalcFourierOptometric.argtypes = [ViSession, ViInt32, ViInt32, POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64)]
-
-        dll.WFS_CalcReconstrDeviations.restype = ViStatus
-        dll.WFS_CalcReconstrDeviations.argtypes = [ViSession, ViInt32, ViInt32, ViInt32, POINTER(ViReal64), POINTER(ViReal64)] # ViInt32[]
-
-        dll.WFS_CalcWavefront.restype = ViStatus
-        dll.WFS_CalcWavefront.argtypes = [ViSession, ViInt32, ViInt32, ArrFloat] # float[]
-
-        dll.WFS_CalcWavefrontStatistics.restype = ViStatus
-        dll.WFS_CalcWavefrontStatistics.argtypes = [ViSession, POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64)]
-
-        # Utility Functions
-        dll.WFS_self_test.restype = ViStatus
-        dll.WFS_self_test.argtypes = [ViSession, ViInt16, c_char_p] # ViChar[]
-
-        dll.WFS_reset.restype = ViStatus
-        dll.WFS_reset.argtypes = [ViSession]
-
-        dll.WFS_revision_query.restype = ViStatus
-        dll.WFS_revision_query.argtypes = [ViSession, c_char_p, c_char_p] # ViChar[]
+class StatusHistory(object):
+    """
+    This class keeps the status words and timestamps of the last size frames in NumPy arrays for vectorized analysis.
+    """
 
-        dll.WFS_error_query.restype = ViStatus
-        dll.WFS_error_query.argtypes = [ViSession, POINTER(ViInt32), c_char_p] # ViChar[]
+    def __init__(self, size=1024):
+        self.size = size
+        self._words = np.zeros(size, dtype=np.uint32)
+        self._timestamps = np.zeros(size, dtype=np.float64)
+        self.count = 0
 
-        dll.WFS_error_message.restype = ViStatus
-        dll.WFS_error_message.argtypes = [ViSession, ViStatus, ViChar256]
+    def __len__(self):
+        return min(self.count, self.size)
 
-        dll.WFS_GetInstrumentListLen.restype = ViStatus
-        dll.WFS_GetInstrumentListLen.argtypes = [ViSession, POINTER(ViInt32)]
+    def append(self, word, timestamp=None):
+        index = self.count % self.size
+        self._words[index] = word
+        self._timestamps[index] = time.time() if timestamp is None else timestamp
+        self.count += 1
 
-        dll.WFS_GetInstrumentListInfo.restype = ViStatus
-        dll.WFS_GetInstrumentListInfo.argtypes = [ViSession, ViInt32, POINTER(ViInt32), POINTER(ViInt32), ViChar256, ViChar256, ViRsrc] # ViChar[]
+    def clear(self):
+        self.count = 0
 
-        dll.WFS_GetXYScale.restype = ViStatus
-        dll.WFS_GetXYScale.argtypes = [ViSession, c_float, c_float] # float[]
+    @property
+    def words(self):
+        """
+        This function returns the recorded status words, oldest first
+        """
+        return np.roll(self._words, -self.count % self.size)[-len(self):] if self.count > self.size else self._words[:self.count].copy()
 
-        dll.WFS_ConvertWavefrontWaves.restype = ViStatus
-        dll.WFS_ConvertWavefrontWaves.argtypes = [ViSession, ViReal64, ViReal32, ViReal32] # ViReal[]
+    @property
+    def timestamps(self):
+        """
+        This function returns the timestamps of the recorded status words, oldest first
+        """
+        return np.roll(self._timestamps, -self.count % self.size)[-len(self):] if self.count > self.size else self._timestamps[:self.count].copy()
 
-        dll.WFS_Flip2DArray.restype = ViStatus
-        dll.WFS_Flip2DArray.argtypes = [ViSession, ViReal32, ViReal32] # ViReal32
+    def rate(self, flags):
+        """
+        This function returns the fraction of recorded frames with any of flags raised, e.g. rate(WfsStatus.PTH | WfsStatus.PTL)
+        """
+        if not len(self):
+            return 0.0
+        return np.count_nonzero(self.words & int(flags)) / len(self)
 
-        # Calibration Functions
-        dll.WFS_SetSpotsToUserReference.restype = ViStatus
-        dll.WFS_SetSpotsToUserReference.argtypes = [ViSession]
+    def rates(self):
+        """
+        This function returns the fraction of recorded frames with each status bit raised
+        """
+        words = self.words
+        return {key: np.count_nonzero(words & bit) / max(len(words), 1) for key, bit in WFS_STATUS.items()}
+
+
+# argtypes of the dll functions, all of them return a ViStatus. The prototypes are bound on first use, see WfsDll
+PROTOTYPES = {
+    # general methods for WFS library
+    "WFS_init": [ViRsrc, ViBoolean, ViBoolean, POINTER(ViSession)],
+    "WFS_close": [ViSession],
+
+    # configuration functions
+    "WFS_GetInstrumentInfo": [ViSession, ViChar256, ViChar256, ViChar256, ViChar256],
+    "WFS_ConfigureCam": [ViSession, ViInt32, ViInt32, POINTER(ViInt32), POINTER(ViInt32)],
+    "WFS_SetHighspeedMode": [ViSession, ViInt32, ViInt32, ViInt32, ViInt32],
+    "WFS_GetHighspeedWindows": [ViSession, POINTER(ViInt32), POINTER(ViInt32), POINTER(ViInt32), POINTER(ViInt32), ArrInt32X, ArrInt32Y],
+    "WFS_CheckHighspeedCentroids": [ViSession],
+    "WFS_GetExposureTimeRange": [ViSession, POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64)],
+    "WFS_SetExposureTime": [ViSession, ViReal64, POINTER(ViReal64)],
+    "WFS_GetExposureTime": [ViSession, POINTER(ViReal64)],
+    "WFS_GetMasterGainRange": [ViSession, POINTER(ViReal64), POINTER(ViReal64)],
+    "WFS_SetMasterGain": [ViSession, ViReal64, POINTER(ViReal64)],
+    "WFS_GetMasterGain": [ViSession, POINTER(ViReal64)],
+    "WFS_SetBlackLevelOffset": [ViSession, ViInt32],
+    "WFS_GetBlackLevelOffset": [ViSession, POINTER(ViInt32)],
+    "WFS_SetTriggerMode": [ViSession, ViInt32],
+    "WFS_GetTriggerMode": [ViSession, POINTER(ViInt32)],
+    # "WFS_SetTriggerDelayRange": [ViSession, POINTER(ViInt32), POINTER(ViInt32), POINTER(ViInt32)],
+    "WFS_GetMlaCount": [ViSession, POINTER(ViInt32)],
+    "WFS_GetMlaData": [ViSession, ViInt32, ViChar256, POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64)],
+    "WFS_GetMlaData2": [ViSession, ViInt32, ViChar256, POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64)],
+    "WFS_SelectMla": [ViSession, ViInt32],
+
+    # WFS_SetAoi and WFS_SetAoi are undocumented and thus left out
+    "WFS_SetPupil": [ViSession, ViReal64, ViReal64, ViReal64, ViReal64],
+    "WFS_GetPupil": [ViSession, POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64)],
+    "WFS_SetReferencePlane": [ViSession, ViInt32],
+    "WFS_GetReferencePlane": [ViSession, POINTER(ViInt32)],
+
+    # Action/Status Functions
+    "WFS_GetStatus": [ViSession, POINTER(ViInt32)],
+
+    # Data Functions
+    "WFS_TakeSpotfieldImage": [ViSession],
+    "WFS_TakeSpotfieldImageAutoExpos": [ViSession, POINTER(ViReal64), POINTER(ViReal64)],
+
+    # WFS_GetSpotfieldImage left out
+    "WFS_GetSpotfieldImageCopy": [ViSession, ArrUInt8, POINTER(ViInt32), POINTER(ViInt32)],
+    "WFS_AverageImage": [ViSession, ViInt32, POINTER(ViInt32)],
+    "WFS_AverageImageRolling": [ViSession, ViInt32, ViInt32],
+    "WFS_CutImageNoiseFloor": [ViSession, ViInt32],
+    "WFS_CalcImageMinMax": [ViSession, POINTER(ViInt32), POINTER(ViInt32), POINTER(ViReal64)],
+    "WFS_CalcMeanRmsNoise": [ViSession, POINTER(ViReal64), POINTER(ViReal64)],
+    "WFS_GetLine": [ViSession, ViInt32, c_float],  # float[]
+    "WFS_GetLineView": [ViSession, c_float, c_float],  # float[]
+    "WFS_CalcBeamCentroidDia": [ViSession, POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64)],
+    "WFS_CalcSpotsCentrDiaIntens": [ViSession, ViInt32, ViInt32],
+    "WFS_GetSpotCentroids": [ViSession, ArrFloat, ArrFloat],
+    "WFS_GetSpotDiameters": [ViSession, ArrFloat, ArrFloat],
+    "WFS_GetSpotDiaStatistics": [ViSession, POINTER(ViInt32), POINTER(ViInt32), POINTER(ViInt32)],
+    "WFS_GetSpotIntensities": [ViSession, ArrFloat],
+    "WFS_CalcSpotToReferenceDeviations": [ViSession, ViInt32],
+    "WFS_GetSpotReferencePositions": [ViSession, ArrFloat, ArrFloat],
+    "WFS_GetSpotDeviations": [ViSession, ArrFloat, ArrFloat],
+    "WFS_ZernikeLsf": [ViSession, POINTER(ViInt32), ArrZernikeModes, ArrZernikeOrders, POINTER(ViReal64)],
+    "WFS_CalcFourierOptometric": [ViSession, ViInt32, ViInt32, POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64)],
+    "WFS_CalcReconstrDeviations": [ViSession, ViInt32, ViInt32, ViInt32, POINTER(ViReal64), POINTER(ViReal64)],  # ViInt32[]
+    "WFS_CalcWavefront": [ViSession, ViInt32, ViInt32, ArrFloat],  # float[]
+    "WFS_CalcWavefrontStatistics": [ViSession, POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64), POINTER(ViReal64)],
+
+    # Utility Functions
+    "WFS_self_test": [ViSession, ViInt16, c_char_p],  # ViChar[]
+    "WFS_reset": [ViSession],
+    "WFS_revision_query": [ViSession, c_char_p, c_char_p],  # ViChar[]
+    "WFS_error_query": [ViSession, POINTER(ViInt32), c_char_p],  # ViChar[]
+    "WFS_error_message": [ViSession, ViStatus, ViChar256],
+    "WFS_GetInstrumentListLen": [ViSession, POINTER(ViInt32)],
+    "WFS_GetInstrumentListInfo": [ViSession, ViInt32, POINTER(ViInt32), POINTER(ViInt32), ViChar256, ViChar256, ViRsrc],  # ViChar[]
+    "WFS_GetXYScale": [ViSession, ArrFloatX, ArrFloatY],
+    "WFS_ConvertWavefrontWaves": [ViSession, ViReal64, ViReal32, ViReal32],  # ViReal[]
+    "WFS_Flip2DArray": [ViSession, ViReal32, ViReal32],  # ViReal32
+
+    # Calibration Functions
+    "WFS_SetSpotsToUserReference": [ViSession],
+    "WFS_SetCalcSpotsToUserReference": [ViSession, ViInt32, c_float, c_float],  # float[]
+    "WFS_CreateDefaultUserReference": [ViSession],
+    "WFS_SaveUserRefFile": [ViSession],
+    "WFS_LoadUserRefFile": [ViSession],
+    "WFS_DoSphericalRef": [ViSession]
+}
 
-        dll.WFS_SetCalcSpotsToUserReference.restype = ViStatus
-        dll.WFS_SetCalcSpotsToUserReference.argtypes = [ViSession, ViInt32, c_float, c_float] # float[]
 
-        dll.WFS_CreateDefaultUserReference.restype = ViStatus
-        dll.WFS_CreateDefaultUserReference.argtypes = [ViSession]
+class WfsDll(object):
+    """
+    This class wraps the dll and binds the prototype of a function on its first use, so creating it does not touch the dll.
+    """
 
-        dll.WFS_SaveUserRefFile.restype = ViStatus
-        dll.WFS_SaveUserRefFile.argtypes = [ViSession]
+    def __init__(self, dll):
+        self._dll = dll
 
-        dll.WFS_LoadUserRefFile.restype = ViStatus
-        dll.WFS_LoadUserRefFile.argtypes = [ViSession]
+    def __getattr__(self, name):
+        function = getattr(self._dll, name)
+        if name in PROTOTYPES:
+            function.restype = ViStatus
+            function.argtypes = PROTOTYPES[name]
+            log.spam("bound prototype of %s", name)
+        # later lookups find the bound function without passing __getattr__
+        setattr(self, name, function)
+        return function
 
-        dll.WFS_DoSphericalRef.restype = ViStatus
-        dll.WFS_DoSphericalRef.argtypes = [ViSession]
 
+class WfsLib(object):
+    """
+    This class provides a Python wrapper for the bare C functions
+    """
 
+    def __init__(self, dll, enumeration_ttl=10.0, calibration=None, timings=None):
+        """
+        The instrument list is cached for enumeration_ttl seconds (None caches until refresh() is called).
+        calibration is an optional CalibrationCache, opened sensors then read MLA data, XY scales and reference positions from it.
+        timings is an optional WfsTimings measuring all dll calls of the library and its sensors.
+        """
+        self.enumeration_ttl = enumeration_ttl
+        self.calibration = calibration
+        self.timings = timings
+        if not isinstance(dll, (WfsDll, TimedDll)):
+            dll = WfsDll(dll)
+        if timings is not None and not isinstance(dll, TimedDll):
+            dll = timings.wrap(dll)
+        self._devices = None
+        self._devices_time = None
+        self._open_resources = {}
         self._dll = dll
 
     @staticmethod
@@ -291,7 +369,7 @@ class WfsLib(object):
          This function queries the instrument and returns instrument-specific error information. 
         """
         if dev_status != 0:
-            log.error(f"ViStatus code {dev_status} occured")
+            log.error("ViStatus code %s occured", dev_status)
             raise WfsError(dev_status)
 
     def device_count(self):
@@ -301,31 +379,60 @@ class WfsLib(object):
         """
         count = ViInt32()
         WfsLib.result(self._dll.WFS_GetInstrumentListLen(VI_NULL(), byref(count)))
-        log.spam(f"WFS_GetInstrumentListLen: {count.value} connected sensors")
+        log.spam("WFS_GetInstrumentListLen: %s connected sensors", count.value)
         return count.value
 
-    def device_info(self):
+    def refresh(self):
         """
-        This function returns information about connected WFS instruments. 
+        This function reads the instrument list from the driver and updates the cache.
         """
-        count = self.device_count()
-        sensors = []
-        for list_index in range(count):
+        devices = []
+        for list_index in range(self.device_count()):
             device_id = ViInt32()
             in_use = ViInt32()
             instrument_name = ViChar256()
             instrument_sn = ViChar256()
             resource_name = ViRsrc()
             WfsLib.result(self._dll.WFS_GetInstrumentListInfo(VI_NULL(), list_index, byref(device_id), byref(in_use), instrument_name, instrument_sn, resource_name))
-            log.info(f"WFS device_id: {device_id.value}")
-            log.info(f"in use: {in_use.value}")
-            log.info(f"instrument_name: {instrument_name.value}")
-            log.info(f"instrument_sn: {instrument_sn.value}")
-            log.info(f"resource_name: {resource_name.value}")
-            sensors.append([device_id.value, in_use.value, instrument_name.value, instrument_sn.value, resource_name.value])
-        return sensors
+            devices.append(WfsDevice(device_id.value, in_use.value, instrument_name.value, instrument_sn.value, resource_name.value))
+            log.spam("WFS device %s", devices[-1])
+        self._devices = devices
+        self._devices_time = time.monotonic()
+        return list(devices)
+
+    def devices(self, refresh=False):
+        """
+        This function returns the connected WFS instruments as list of WfsDevice, from the cache if it is still valid.
+        """
+        expired = self._devices_time is None or (self.enumeration_ttl is not None and time.monotonic() - self._devices_time > self.enumeration_ttl)
+        if refresh or expired:
+            return self.refresh()
+        return list(self._devices)
+
+    def device_info(self):
+        """
+        This function returns information about connected WFS instruments. 
+        """
+        return [list(device) for device in self.devices(refresh=True)]
 
-    def open(self, list_index=0):
+    def find_device(self, list_index=None, serial=None, resource=None):
+        """
+        This function returns the index and WfsDevice of an instrument selected by list index, serial number or resource name.
+        """
+        def encode(value):
+            return value.encode() if isinstance(value, str) else value
+        devices = self.devices()
+        for index, device in enumerate(devices):
+            if serial is not None and device.serial != encode(serial):
+                continue
+            if resource is not None and device.resource_name != encode(resource):
+                continue
+            if list_index is not None and index != list_index:
+                continue
+            return index, device
+        raise WfsError(f"no device with list_index={list_index}, serial={serial}, resource={resource}")
+
+    def open(self, list_index=None, serial=None, resource=None):
         """
         This function initializes the instrument driver session and performs the following initialization actions:
         (1) Opens a session to the Default Resource Manager resource and a session to the selected device using the Resource Name.
@@ -333,28 +440,44 @@ class WfsLib(object):
         (3) Resets the instrument to a known state.
         (4) Sends initialization commands to the instrument.
         (5) Returns an instrument handle.
+        The device is selected by list index, serial number or resource name, by default the first device is used.
         """
-        log.spam(f"opening sensor with index {list_index}")
+        if list_index is None and serial is None and resource is None:
+            list_index = 0
+        log.spam("opening sensor with list_index=%s, serial=%s, resource=%s", list_index, serial, resource)
         resource_name = ViRsrc()
         id_query = ViBoolean()
         reset_device = ViBoolean()
         handle = ViSession()
-        # check if device is already in use
-        instrument = self.device_info()[list_index]
-        if instrument[1] != 0:
+        # check if device is already in use, the cache might be outdated
+        index, device = self.find_device(list_index, serial, resource)
+        if device.in_use != 0:
+            self.refresh()
+            index, device = self.find_device(list_index, serial, resource)
+        if device.in_use != 0:
             raise WfsError(f"device is already in use!")
-        resource_name.value = instrument[-1]
+        resource_name.value = device.resource_name
         WfsLib.result(self._dll.WFS_init(resource_name, id_query, reset_device, byref(handle)))
-        log.spam(f"sensor initialized with handle {handle.value}")
-        return WfsSDK(handle, self._dll)
+        log.spam("sensor initialized with handle %s", handle.value)
+        self._devices[index] = device._replace(in_use=1)
+        self._open_resources[handle.value] = device.resource_name
+        sdk = WfsSDK(handle, self._dll, lib=self)
+        sdk.instrument_name = device.instrument_name.decode()
+        sdk.serial = device.serial.decode()
+        if self.calibration is not None:
+            sdk.calibration = self.calibration.sensor(sdk.serial)
+        return sdk
 
     def close(self, handle: ViSession):
         """
         This function closes the instrument driver session.
         Note: The instrument must be reinitialized to use it again. 
         """
-        log.spam(f"closing instrument with handle {handle.value}")
+        log.spam("closing instrument with handle %s", handle.value)
         WfsLib.result(self._dll.WFS_close(handle))
+        resource_name = self._open_resources.pop(handle.value, None)
+        if self._devices is not None:
+            self._devices = [device._replace(in_use=0) if device.resource_name == resource_name else device for device in self._devices]
 
 
 class WfsSDK(object):
@@ -362,35 +485,108 @@ class WfsSDK(object):
     This class is a python wrapper for sensor specific function calls (all calls that need a specific handle)
     """
 
-    def __init__(self, handle: ViSession, dll):
+    def __init__(self, handle: ViSession, dll, lib=None):
         """
         Instances of WFSSensor are created by invoking WFSLib.open()
         """
         self._handle = handle
         self._dll = dll
+        self._lib = lib
+        self.timings = None if lib is None else lib.timings
+        self.wavefront_ring_size = 0
+        self._wavefront_raw = None
+        self._wavefront_out = None
+        self._wavefront_index = 0
+        self.instrument_name = None
+        self.serial = None
+        self.calibration = None
+        self.mla_index = ViInt32(0)
+        self._spot_raw = None
+        self._spot_data = None
+        self._xy_scale = None
+        self._image_size = None
+        self._zernike_um = None
+        self._zernike_orders_um = None
+        self.spotfield_ring_size = 1
+        self._spotfield = None
+        self._spotfield_index = 0
+        self._device_status = ViInt32()
+        self._device_status_ref = byref(self._device_status)
+        self.status_history = None
+        self.highspeed = False
+        self.highspeed_check_interval = 0
+        self.highspeed_rearms = 0
+        self._highspeed_frames = 0
+        # the settings of the last calc_spot(), reused by rearm_highspeed_mode()
+        self.dynamic_noise_cut = ViInt32(True)
+        self.calculate_diameters = ViInt32(False)
+        # the setting of the last calc_deviations(), reused by acquire_burst()
+        self.cancel_spot_wavefront_tilt = ViInt32(True)
 
     def close(self):
         """
         This functions closes the handle
         """
-        WfsLib(self._dll).close(self._handle)
+        (WfsLib(self._dll) if self._lib is None else self._lib).close(self._handle)
 
     def get_status(self):
         """
-        This function returns the device status of the Wavefront Sensor instrument.
-        """
-        device_status = ViInt32()
-        log.spam(f"querying device status")
-        WfsLib.result(self._dll.WFS_GetStatus(self._handle, byref(device_status)))
-        log.info(f"WFS_GetStatus: {device_status.value}")
-        # check all status bits
-        status = {}
-        for key in WFS_STATUS:
-            if WFS_STATUS[key] & device_status.value:
-                status[key] = True
+        This function returns the device status of the Wavefront Sensor instrument as WfsStatus.
+        """
+        WfsLib.result(self._dll.WFS_GetStatus(self._handle, self._device_status_ref))
+        log.spam("WFS_GetStatus: %d", self._device_status.value)
+        return WfsStatus(self._device_status.value)
+
+    def set_status_history(self, size=1024):
+        """
+        This function records the status word of every frame acquired by WfsCamera in a StatusHistory of size frames (0 disables it).
+        """
+        self.status_history = StatusHistory(size) if size else None
+        return self.status_history
+
+    def get_instrument_info(self):
+        """
+        This function returns the manufacturer, instrument name and the serial numbers of the WFS and its camera.
+        """
+        manufacturer_name = ViChar256()
+        instrument_name = ViChar256()
+        serial_number_wfs = ViChar256()
+        serial_number_cam = ViChar256()
+        WfsLib.result(self._dll.WFS_GetInstrumentInfo(self._handle, manufacturer_name, instrument_name, serial_number_wfs, serial_number_cam))
+        log.info("WFS_GetInstrumentInfo: %s %s", instrument_name.value, serial_number_wfs.value)
+        self.instrument_name = instrument_name.value.decode()
+        self.serial = serial_number_wfs.value.decode()
+        return [manufacturer_name.value, instrument_name.value, serial_number_wfs.value, serial_number_cam.value]
+
+    def get_image_size(self):
+        """
+        This function returns the camera resolution [X, Y] in pixels for the configured cam_resol_index or None for unknown instruments.
+        The resolution is looked up once by set_resolution().
+        """
+        if not hasattr(self, "cam_resol_index"):
+            raise WfsError("the resolution has to be configured first (set_resolution)")
+        return self._image_size
+
+    def get_xy_scale(self):
+        """
+        This function returns the X and Y coordinates of the lenslets in mm relative to the sensor center.
+        The scales only depend on MLA and resolution, they are read once per configuration (or from the calibration cache).
+        """
+        if self._xy_scale is None:
+            key = self._calibration_key("grid")
+            if key is not None and self.calibration.get(key) is not None:
+                scale_x, scale_y = self.calibration.get(key)
             else:
-                status[key] = False
-        return status
+                scale_x = np.zeros(MAX_SPOTS[0], dtype=np.float32)
+                scale_y = np.zeros(MAX_SPOTS[1], dtype=np.float32)
+                WfsLib.result(self._dll.WFS_GetXYScale(self._handle, scale_x, scale_y))
+                log.spam("WFS_GetXYScale: read lenslet coordinates")
+                scale_x = scale_x[:self.spots[0].value].tolist()
+                scale_y = scale_y[:self.spots[1].value].tolist()
+                if key is not None:
+                    self.calibration.set(key, [scale_x, scale_y])
+            self._xy_scale = [np.array(scale_x, dtype=np.float32), np.array(scale_y, dtype=np.float32)]
+        return self._xy_scale
 
     def set_resolution(self, cam_resol_index):
         """
@@ -401,21 +597,140 @@ class WfsSDK(object):
         self.cam_resol_index = ViInt32(cam_resol_index)
         self.spots = [ViInt32(), ViInt32()]
         WfsLib.result(self._dll.WFS_ConfigureCam(self._handle, self.pixel_format, self.cam_resol_index, byref(self.spots[0]), byref(self.spots[1])))
-        log.spam(f"sensor configured with {self.spots[0].value} x {self.spots[1].value} spots")
+        log.spam("sensor configured with %s x %s spots", self.spots[0].value, self.spots[1].value)
+        if self.instrument_name is None:
+            self.get_instrument_info()
+        resolutions = camera_resolutions(self.instrument_name)
+        self._image_size = None if resolutions is None else resolutions[cam_resol_index]
+        self._xy_scale = None
+        # the wavefront ring and spot data depend on the number of spots, the spotfield ring on the resolution
+        self._wavefront_raw = None
+        self._spot_data = None
+        self._spotfield = None
+
+    def set_highspeed_mode(self, enable=True, adapt_centroids=True, subtract_offset=True, allow_auto_exposure=True, check_interval=100):
+        """
+        This function activates the highspeed mode of the camera, only the windows around the spots are read out.
+        With adapt_centroids the windows are centered on the spots of a full frame image that is taken beforehand.
+        Every check_interval frames poll_highspeed() verifies the centroids and re-arms the highspeed mode on a mismatch (0 disables the check).
+        Configure resolution and pupil before enabling the highspeed mode.
+        """
+        self.highspeed_adapt_centroids = ViInt32(adapt_centroids)
+        self.highspeed_subtract_offset = ViInt32(subtract_offset)
+        self.highspeed_allow_auto_exposure = ViInt32(allow_auto_exposure)
+        self.highspeed_check_interval = check_interval
+        self._highspeed_frames = 0
+        if enable and adapt_centroids:
+            # the windows are placed around the spots of the last image
+            self._switch_highspeed_mode(False)
+            self.take_spot_field_image_auto_expos()
+            self.calc_spot()
+        self._switch_highspeed_mode(enable)
+
+    def _switch_highspeed_mode(self, enable):
+        """
+        This function switches the highspeed mode with the options given to set_highspeed_mode()
+        """
+        log.spam("switching highspeed mode %s", "on" if enable else "off")
+        WfsLib.result(self._dll.WFS_SetHighspeedMode(self._handle, ViInt32(enable), self.highspeed_adapt_centroids, self.highspeed_subtract_offset, self.highspeed_allow_auto_exposure))
+        self.highspeed = bool(enable)
+
+    def get_highspeed_windows(self):
+        """
+        This function returns the number and size of the highspeed windows in X and Y as well as their start positions in pixels.
+        """
+        window_count = [ViInt32(), ViInt32()]
+        window_size = [ViInt32(), ViInt32()]
+        start_x = np.zeros(MAX_SPOTS[0], dtype=np.int32)
+        start_y = np.zeros(MAX_SPOTS[1], dtype=np.int32)
+        WfsLib.result(self._dll.WFS_GetHighspeedWindows(self._handle, byref(window_count[0]), byref(window_count[1]), byref(window_size[0]), byref(window_size[1]), start_x, start_y))
+        log.spam("%s x %s highspeed windows of %s x %s pixels", window_count[0].value, window_count[1].value, window_size[0].value, window_size[1].value)
+        return {
+            "count": [window_count[0].value, window_count[1].value],
+            "size": [window_size[0].value, window_size[1].value],
+            "start_x": start_x[:window_count[0].value],
+            "start_y": start_y[:window_count[1].value]
+        }
+
+    def check_highspeed_centroids(self):
+        """
+        This function checks if the centroids calculated in highspeed mode are still within their windows.
+        It returns False if the centroids are mismatched (status bit MIS).
+        """
+        log.spam("checking highspeed centroids")
+        WfsLib.result(self._dll.WFS_CheckHighspeedCentroids(self._handle))
+        return not self.get_status() & WfsStatus.MIS
+
+    def rearm_highspeed_mode(self, auto_exposure=True):
+        """
+        This function falls back to full frame mode to find the spots, re-enables the highspeed mode with adapted windows and
+        takes a new highspeed image, so spots are calculated afterwards just like after calc_spot().
+        Without auto_exposure the images are taken with the current exposure settings, e.g. while the exposure is locked.
+        """
+        log.warning("highspeed centroids mismatched, re-arming highspeed mode")
+        take_image = self.take_spot_field_image_auto_expos if auto_exposure else self.take_spot_field_image
+        self.highspeed_rearms += 1
+        # the images have to be taken right away, not on the next triggers
+        with self.untriggered():
+            self._switch_highspeed_mode(False)
+            take_image()
+            self.calc_spot(self.dynamic_noise_cut.value, self.calculate_diameters.value)
+            self._switch_highspeed_mode(True)
+            take_image()
+            self.calc_spot(self.dynamic_noise_cut.value, self.calculate_diameters.value)
+
+    def poll_highspeed(self, auto_exposure=True):
+        """
+        This function has to be called after calc_spot(). In highspeed mode it checks the centroids every highspeed_check_interval calls
+        and re-arms the highspeed mode on a mismatch, see rearm_highspeed_mode(). It returns False if the highspeed mode had to be re-armed.
+        """
+        if not (self.highspeed and self.highspeed_check_interval):
+            return True
+        self._highspeed_frames += 1
+        if self._highspeed_frames < self.highspeed_check_interval:
+            return True
+        self._highspeed_frames = 0
+        if self.check_highspeed_centroids():
+            return True
+        self.rearm_highspeed_mode(auto_exposure)
+        return False
+
+    def _calibration_key(self, kind):
+        """
+        This function returns the calibration cache key of the current configuration, None without calibration cache.
+        """
+        if self.calibration is None:
+            return None
+        if kind == "mlas":
+            return kind
+        parts = [kind, self.mla_index.value, self.cam_resol_index.value]
+        if kind == "reference":
+            if getattr(self, "reference_index", ViInt32(0)).value:
+                # the user reference can be changed on the device at any time, it is never cached
+                return None
+            center = [c.value for c in getattr(self, "pupil_center", [])]
+            diameter = [d.value for d in getattr(self, "pupil_diameter", [])]
+            parts += [center, diameter, getattr(self, "reference_index", ViInt32(0)).value]
+        return calibration_key(*parts)
 
     def get_mla_count(self):
         """
         This function returns the number of calibrated Microlens Arrays
         """
+        if self.calibration is not None and self.calibration.get("mlas") is not None:
+            return len(self.calibration.get("mlas"))
         mla_count = ViInt32()
         WfsLib.result(self._dll.WFS_GetMlaCount(self._handle, byref(mla_count)))
-        log.info(f"WFS_GetMlaCount: {mla_count.value} available microlens arrays")
+        log.info("WFS_GetMlaCount: %s available microlens arrays", mla_count.value)
         return mla_count.value
 
     def get_mla_info(self):
         """
         This functions lists all available microlens arrays.
         """
+        key = self._calibration_key("mlas")
+        if key is not None and self.calibration.get(key) is not None:
+            return [[name.encode()] + values for name, *values in self.calibration.get(key)]
         mlas = []
         for mla_index in range(self.get_mla_count()):
             mla_name = ViChar256()
@@ -426,8 +741,10 @@ class WfsSDK(object):
             grd_corr_0 = ViReal64()
             grd_corr_45 = ViReal64()
             WfsLib.result(self._dll.WFS_GetMlaData(self._handle, mla_index, mla_name, byref(cam_pitch), byref(lenslet_pitch), byref(spot_offset[0]), byref(spot_offset[1]), byref(lenslet_f), byref(grd_corr_0), byref(grd_corr_45)))
-            log.info(f"MLA name: {mla_name.value}")
-            mlas.append([mla_name.value, cam_pitch.value, lenslet_pitch.value, spot_offset[0].value, spot_offset[1].value, lenslet_f.value, grd_corr_0.value, grd_corr_45])
+            log.info("MLA name: %s", mla_name.value)
+            mlas.append([mla_name.value, cam_pitch.value, lenslet_pitch.value, spot_offset[0].value, spot_offset[1].value, lenslet_f.value, grd_corr_0.value, grd_corr_45.value])
+        if key is not None:
+            self.calibration.set(key, [[name.decode()] + values for name, *values in mlas])
         return mlas
     
     def set_mla(self, mla_index=0):
@@ -435,8 +752,60 @@ class WfsSDK(object):
         This function selects one of the removable microlens arrays by its index.
         Appropriate calibration values are read out of the instrument and set active.
         """
-        log.spam(f"selecting MLA with index {mla_index}")
-        WfsLib.result(self._dll.WFS_SelectMla(self._handle, mla_index))
+        self.mla_index = ViInt32(mla_index)
+        log.spam("selecting MLA with index %s", mla_index)
+        WfsLib.result(self._dll.WFS_SelectMla(self._handle, self.mla_index))
+
+    def set_trigger_mode(self, trigger_mode="off"):
+        """
+        This function sets the trigger mode of the camera, either a key of WFS_TRIGGER_MODES or its value.
+        With a hardware trigger taking an image waits for the trigger (status bit ATR).
+        """
+        self.trigger_mode = ViInt32(WFS_TRIGGER_MODES.get(trigger_mode, trigger_mode))
+        log.spam("configuring trigger mode %s", self.trigger_mode.value)
+        WfsLib.result(self._dll.WFS_SetTriggerMode(self._handle, self.trigger_mode))
+
+    @contextmanager
+    def untriggered(self):
+        """
+        This function is a context manager switching a hardware trigger mode off, so the enclosed calls take their images
+        immediately, e.g. to converge the exposure. The trigger mode is restored afterwards, other modes are left untouched.
+        """
+        trigger_mode = getattr(self, "trigger_mode", None)
+        if trigger_mode is None or trigger_mode.value not in HARDWARE_TRIGGER_MODES:
+            yield
+            return
+        self.set_trigger_mode("off")
+        try:
+            yield
+        finally:
+            self.set_trigger_mode(trigger_mode.value)
+
+    def get_trigger_mode(self):
+        """
+        This function returns the trigger mode of the camera.
+        """
+        trigger_mode = ViInt32()
+        WfsLib.result(self._dll.WFS_GetTriggerMode(self._handle, byref(trigger_mode)))
+        return trigger_mode.value
+
+    def wait_for_trigger(self, timeout=None, poll_interval=1e-3):
+        """
+        This function waits until an armed camera received its trigger (status bit ATR cleared) and returns the WfsStatus.
+        The status is polled with sleeps growing from poll_interval / 16 to poll_interval, so the thread does not spin and the
+        trigger is detected at most poll_interval late. Raises a WfsError after timeout seconds (None waits forever).
+        """
+        get_status = self._dll.WFS_GetStatus
+        start = time.monotonic()
+        delay = poll_interval / 16
+        while True:
+            WfsLib.result(get_status(self._handle, self._device_status_ref))
+            if not self._device_status.value & WfsStatus.ATR:
+                return WfsStatus(self._device_status.value)
+            if timeout is not None and time.monotonic() - start > timeout:
+                raise WfsError(f"no trigger within {timeout} s")
+            time.sleep(delay)
+            delay = min(2 * delay, poll_interval)
 
     def set_reference_plane(self, internal=True):
         """
@@ -444,9 +813,9 @@ class WfsSDK(object):
         """
         self.reference_index = ViInt32(not internal)
         if internal:
-            log.spam(f"configuring reference plane to internal")
+            log.spam("configuring reference plane to internal")
         else:
-            log.spam(f"configuring reference plane to external")
+            log.spam("configuring reference plane to external")
         WfsLib.result(self._dll.WFS_SetReferencePlane(self._handle, self.reference_index))
 
     def set_pupil(self, center=[0, 0], diameter=[3, 3]):
@@ -455,9 +824,77 @@ class WfsSDK(object):
         """
         self.pupil_center = [ViReal64(center[0]), ViReal64(center[1])]
         self.pupil_diameter = [ViReal64(diameter[0]), ViReal64(diameter[1])]
-        log.spam(f"configuring pupil")
+        log.spam("configuring pupil")
         WfsLib.result(self._dll.WFS_SetPupil(self._handle, *self.pupil_center, *self.pupil_diameter))
 
+    def get_exposure_time_range(self):
+        """
+        This function returns the minimal and maximal exposure time and its increment in ms.
+        """
+        exposure_time = [ViReal64(), ViReal64(), ViReal64()]
+        WfsLib.result(self._dll.WFS_GetExposureTimeRange(self._handle, *[byref(e) for e in exposure_time]))
+        return [e.value for e in exposure_time]
+
+    def set_exposure_time(self, exposure_time):
+        """
+        This function sets the exposure time in ms and returns the actual exposure time.
+        """
+        self.exposure_time_act = ViReal64()
+        log.spam("setting exposure time %s", exposure_time)
+        WfsLib.result(self._dll.WFS_SetExposureTime(self._handle, ViReal64(exposure_time), byref(self.exposure_time_act)))
+        return self.exposure_time_act.value
+
+    def get_exposure_time(self):
+        """
+        This function returns the exposure time in ms.
+        """
+        exposure_time = ViReal64()
+        WfsLib.result(self._dll.WFS_GetExposureTime(self._handle, byref(exposure_time)))
+        return exposure_time.value
+
+    def get_master_gain_range(self):
+        """
+        This function returns the minimal and maximal master gain.
+        """
+        master_gain = [ViReal64(), ViReal64()]
+        WfsLib.result(self._dll.WFS_GetMasterGainRange(self._handle, *[byref(g) for g in master_gain]))
+        return [g.value for g in master_gain]
+
+    def set_master_gain(self, master_gain):
+        """
+        This function sets the master gain and returns the actual master gain.
+        """
+        self.master_gain_act = ViReal64()
+        log.spam("setting master gain %s", master_gain)
+        WfsLib.result(self._dll.WFS_SetMasterGain(self._handle, ViReal64(master_gain), byref(self.master_gain_act)))
+        return self.master_gain_act.value
+
+    def get_master_gain(self):
+        """
+        This function returns the master gain.
+        """
+        master_gain = ViReal64()
+        WfsLib.result(self._dll.WFS_GetMasterGain(self._handle, byref(master_gain)))
+        return master_gain.value
+
+    def take_spot_field_image(self):
+        """
+        This function receives a spotfield image from the WFS camera into a driver buffer using the current exposure and gain settings.
+        It is much faster than take_spot_field_image_auto_expos().
+        """
+        log.spam("taking spot field")
+        WfsLib.result(self._dll.WFS_TakeSpotfieldImage(self._handle))
+
+    def calc_image_min_max(self):
+        """
+        This function returns the minimal and maximal pixel value of the spotfield image and the percentage of saturated pixels.
+        """
+        image_min = ViInt32()
+        image_max = ViInt32()
+        saturated_pixels_percent = ViReal64()
+        WfsLib.result(self._dll.WFS_CalcImageMinMax(self._handle, byref(image_min), byref(image_max), byref(saturated_pixels_percent)))
+        return image_min.value, image_max.value, saturated_pixels_percent.value
+
     def take_spot_field_image_auto_expos(self):
         """
         This function tries to find optimal exposure and gain settings and then it receives a spotfield image from the WFS camera into a driver buffer. The reference to this buffer is provided by function GetSpotfieldImage() and an image copy is returned by function GetSpotfieldImageCopy().
@@ -465,10 +902,65 @@ class WfsSDK(object):
         """
         self.exposure_time_act = ViReal64()
         self.master_gain_act = ViReal64()
-        log.spam(f"taking spot field with auto exposure")
+        log.spam("taking spot field with auto exposure")
         WfsLib.result(self._dll.WFS_TakeSpotfieldImageAutoExpos(self._handle, byref(self.exposure_time_act), byref(self.master_gain_act)))
-        log.spam(f"exposure_time_act {self.exposure_time_act.value}")
-        log.spam(f"master_gain_act {self.master_gain_act.value}")
+        log.spam("exposure_time_act %s, master_gain_act %s", self.exposure_time_act.value, self.master_gain_act.value)
+
+    def average_image(self, average_count=10):
+        """
+        This function takes average_count images and averages them in the driver buffer, the average is then used by calc_spot() and get_spotfield_image().
+        """
+        self.average_count = ViInt32(average_count)
+        average_data_ready = ViInt32()
+        log.spam("averaging %s images", average_count)
+        # every call takes one image until the average is complete
+        for i in range(average_count):
+            WfsLib.result(self._dll.WFS_AverageImage(self._handle, self.average_count, byref(average_data_ready)))
+            if average_data_ready.value:
+                return
+        raise WfsError(f"averaged image not ready after {average_count} images")
+
+    def average_image_rolling(self, average_count=10, rolling_reset=False):
+        """
+        This function takes one image and adds it to a rolling average over average_count images in the driver buffer, rolling_reset restarts the average.
+        """
+        self.average_count = ViInt32(average_count)
+        log.spam("rolling average over %s images", average_count)
+        WfsLib.result(self._dll.WFS_AverageImageRolling(self._handle, self.average_count, ViInt32(rolling_reset)))
+
+    def set_spotfield_ring(self, size=4):
+        """
+        This function makes get_spotfield_image reuse a ring of size preallocated image buffers.
+        A returned image is overwritten once the ring wraps around, i.e. after size further calls.
+        """
+        log.spam("using a ring of %s spotfield buffers", size)
+        self.spotfield_ring_size = max(size, 1)
+        self._spotfield = None
+
+    def get_spotfield_image(self, out=None):
+        """
+        This function copies the spotfield image of the driver buffer into out or the next buffer of the spotfield ring (see set_spotfield_ring).
+        out has to be a C contiguous uint8 array with at least as many elements as the camera has pixels.
+        A view of shape (rows, columns) is returned, i.e. Y, X order.
+        """
+        rows = ViInt32()
+        columns = ViInt32()
+        image_size = self.get_image_size()
+        if image_size is None:
+            image_size = MAX_IMAGE_SIZE
+        if out is not None:
+            if out.dtype != np.uint8 or not out.flags.c_contiguous or out.size < image_size[0] * image_size[1]:
+                raise WfsError(f"out has to be a contiguous uint8 array of at least {image_size[0]} x {image_size[1]} pixels")
+        else:
+            if self._spotfield is None:
+                log.spam("allocating %s spotfield buffers of %s x %s pixels", self.spotfield_ring_size, image_size[0], image_size[1])
+                self._spotfield = np.zeros([self.spotfield_ring_size, image_size[0] * image_size[1]], dtype=np.uint8)
+                self._spotfield_index = 0
+            out = self._spotfield[self._spotfield_index]
+            self._spotfield_index = (self._spotfield_index + 1) % len(self._spotfield)
+        log.spam("copying spotfield image")
+        WfsLib.result(self._dll.WFS_GetSpotfieldImageCopy(self._handle, out, byref(rows), byref(columns)))
+        return out.reshape(-1)[:rows.value * columns.value].reshape(rows.value, columns.value)
 
     def calc_spot(self, dynamic_noise_cut=True, calculate_diameters=False):
         """
@@ -493,19 +985,210 @@ class WfsSDK(object):
         log.spam("calculating spot deviation from reference")
         WfsLib.result(self._dll.WFS_CalcSpotToReferenceDeviations(self._handle, self.cancel_spot_wavefront_tilt))
 
-    def calc_wavefront(self, wavefront_type=0, limit_to_pupil=True):
+    def _get_spot_arrays(self, function, fields):
+        """
+        This function fills the driver buffers of the given fields and returns them trimmed to the spot grid in X, Y order.
+        The returned views are overwritten by the next call.
+        """
+        if self._spot_raw is None:
+            # one record holding a MAX_SPOTS array per field, every field is a contiguous Y, X array for the dll
+            self._spot_raw = np.zeros((), dtype=[(field, np.float32, MAX_SPOTS[::-1]) for field in SPOT_FIELDS])
+        arrays = [self._spot_raw[field] for field in fields]
+        log.spam("%s: reading %s", function, fields)
+        WfsLib.result(getattr(self._dll, function)(self._handle, *arrays))
+        return [np.transpose(array[:self.spots[1].value, :self.spots[0].value]) for array in arrays]
+
+    def get_spot_centroids(self):
+        """
+        This function returns the centroids in X and Y of all spots in pixels as calculated by calc_spot().
+        """
+        return self._get_spot_arrays(*SPOT_DATA[0])
+
+    def get_spot_diameters(self):
+        """
+        This function returns the diameters in X and Y of all spots in pixels, calc_spot() has to be called with calculate_diameters=True.
+        """
+        return self._get_spot_arrays(*SPOT_DATA[1])
+
+    def get_spot_intensities(self):
+        """
+        This function returns the intensities of all spots in arbitrary units.
+        """
+        return self._get_spot_arrays(*SPOT_DATA[2])[0]
+
+    def get_spot_reference_positions(self, cached=False):
+        """
+        This function returns the reference positions in X and Y of all spots in pixels as calculated by calc_deviations().
+        With cached the positions are read from the calibration cache for MLA, resolution, pupil and reference plane if available,
+        otherwise they are read from the driver and stored, so calc_deviations() only has to be called on a cold start.
+        Only the internal reference plane is cached, the positions of a user reference plane are always read from the driver.
+        """
+        key = self._calibration_key("reference") if cached else None
+        if key is not None:
+            reference = self.calibration.get_array(key)
+            if reference is not None:
+                return list(reference)
+        reference = self._get_spot_arrays(*SPOT_DATA[3])
+        if key is not None:
+            self.calibration.set(key, np.array(reference))
+        return reference
+
+    def get_spot_deviations(self):
+        """
+        This function returns the deviations in X and Y of all spots from their reference positions in pixels as calculated by calc_deviations().
+        """
+        return self._get_spot_arrays(*SPOT_DATA[4])
+
+    def get_spot_data(self, diameters=None, out=None):
+        """
+        This function returns all per spot data (see SPOT_FIELDS) as structured array of shape (spots X, spots Y).
+        The result is written into out if given, else into a buffer that is overwritten by the next call.
+        Diameters are only read if calc_spot() calculated them unless diameters is given explicitly.
+        """
+        if diameters is None:
+            diameters = getattr(self, "calculate_diameters", ViInt32(0)).value
+        if out is None:
+            if self._spot_data is None:
+                self._spot_data = np.zeros([self.spots[0].value, self.spots[1].value], dtype=[(field, np.float32) for field in SPOT_FIELDS])
+            out = self._spot_data
+        for function, fields in SPOT_DATA:
+            if function == "WFS_GetSpotDiameters" and not diameters:
+                for field in fields:
+                    out[field] = np.nan
+                continue
+            for field, array in zip(fields, self._get_spot_arrays(function, fields)):
+                out[field] = array
+        return out
+
+    def zernike_lsf(self, zernike_orders=0):
+        """
+        This function calculates the Zernike coefficients of the wavefront on the device, calc_deviations() has to be called before.
+        zernike_orders 0 determines the order automatically, otherwise 2 to MAX_ZERNIKE_ORDERS are valid.
+        Returns the coefficients in um (in the order of the driver, starting with Z1), the rms per radial order in um and the radius of curvature in mm.
+        The driver does not number the polynomials like Noll (e.g. Z4 is the 45 degree astigmatism and Z5 the defocus),
+        use pywfs.zernike.driver_coefficients_to_noll to compare them with a ZernikeFit.
+        The arrays are overwritten by the next call, see pywfs.zernike for fitting on the host.
+        """
+        self.zernike_orders = ViInt32(zernike_orders)
+        if self._zernike_um is None:
+            self._zernike_um = np.zeros(MAX_ZERNIKE_MODES + 1, dtype=np.float32)
+            self._zernike_orders_um = np.zeros(MAX_ZERNIKE_ORDERS + 1, dtype=np.float32)
+        roc_mm = ViReal64()
+        log.spam("fitting zernike polynomials with %s orders", zernike_orders)
+        WfsLib.result(self._dll.WFS_ZernikeLsf(self._handle, byref(self.zernike_orders), self._zernike_um, self._zernike_orders_um, byref(roc_mm)))
+        orders = self.zernike_orders.value
+        return self._zernike_um[1:(orders + 1) * (orders + 2) // 2 + 1], self._zernike_orders_um[:orders + 1], roc_mm.value
+
+    def set_wavefront_ring(self, size=4):
+        """
+        This function makes calc_wavefront reuse a ring of size preallocated buffers instead of allocating a new array per call.
+        A returned wavefront is overwritten once the ring wraps around, i.e. after size further calls.
+        Set size to 0 to get newly allocated arrays again.
+        """
+        log.spam("using a ring of %s wavefront buffers", size)
+        self.wavefront_ring_size = size
+        self._wavefront_raw = None
+
+    def _allocate_wavefront_ring(self):
+        """
+        This function allocates the driver buffers (MAX_SPOTS, Y, X order) and the output buffers (spots X, Y order)
+        """
+        size = max(self.wavefront_ring_size, 1)
+        self._wavefront_raw = np.zeros([size] + MAX_SPOTS[::-1], dtype=np.float32)
+        if self.wavefront_ring_size:
+            self._wavefront_out = np.zeros([size, self.spots[0].value, self.spots[1].value], dtype=np.float32)
+        else:
+            self._wavefront_out = None
+        self._wavefront_index = 0
+
+    def calc_wavefront(self, wavefront_type=0, limit_to_pupil=True, out=None, contiguous=True):
         """
         This function calculates the wavefront based on the spot deviations.
+        The result has the shape (spots X, spots Y) and is written into out if given, else into the next buffer of the wavefront ring (see set_wavefront_ring) or a new array.
+        With contiguous=False a transposed view of the driver buffer is returned without any copy, it is valid until the buffer is reused.
         max_spots is a bit dirty, will be hopefully removed.
         """
         self.wavefront_type = ViInt32(wavefront_type)
         self.limit_to_pupil = ViInt32(limit_to_pupil)
-        array_wavefront = np.zeros(MAX_SPOTS[::-1], dtype = np.float32)
-        log.spam(f"calculating wavefront type {self.wavefront_type.value}")
+        if self._wavefront_raw is None:
+            self._allocate_wavefront_ring()
+        index = self._wavefront_index
+        self._wavefront_index = (index + 1) % len(self._wavefront_raw)
+        array_wavefront = self._wavefront_raw[index]
+        log.spam("calculating wavefront type %d", self.wavefront_type.value)
         # WFSLib.result(self._dll.WFS_CalcWavefront(self._handle, self.wavefront_type, self.limit_to_pupil, array_wavefront.ctypes.data))
         WfsLib.result(self._dll.WFS_CalcWavefront(self._handle, self.wavefront_type, self.limit_to_pupil, array_wavefront))
-        return np.transpose(array_wavefront[:self.spots[1].value, :self.spots[0].value].copy())
+        wavefront = np.transpose(array_wavefront[:self.spots[1].value, :self.spots[0].value])
+        if out is None:
+            if not contiguous:
+                return wavefront
+            out = np.empty(wavefront.shape, dtype=np.float32) if self._wavefront_out is None else self._wavefront_out[index]
+        np.copyto(out, wavefront)
+        return out
+
+    def calc_wavefront_statistics(self):
+        """
+        This function returns the statistics of the wavefront calculated by the last calc_wavefront() as WfsWavefrontStatistics.
+        The driver evaluates the wavefront within the pupil, weighted_rms weights every spot with its intensity.
+        """
+        values = [ViReal64() for i in range(6)]
+        WfsLib.result(self._dll.WFS_CalcWavefrontStatistics(self._handle, *[byref(value) for value in values]))
+        statistics = WfsWavefrontStatistics(*[value.value for value in values])
+        log.spam("WFS_CalcWavefrontStatistics: pv %.4f rms %.4f", statistics.pv, statistics.rms)
+        return statistics
 
+    def acquire_burst(self, out, exposure_times, master_gains, status, timestamps, auto_exposure=True, wavefront_type=0, limit_to_pupil=True, fault_mask=0, on_fault=None):
+        """
+        This function acquires len(out) wavefronts into out (shape (n, spots X, spots Y), float32) and fills the vectors
+        exposure_times, master_gains, status and timestamps per frame.
+        The argument objects and dll functions are set up once, so the loop only issues the dll calls and copies.
+        Without auto_exposure the current exposure and gain are used and on_fault() is called after a frame whose status
+        matches fault_mask, e.g. to converge the exposure again. Spots and deviations are calculated with the settings of the
+        last calc_spot() and calc_deviations(), with auto_exposure the settings of the last frame are kept in exposure_time_act
+        and master_gain_act like after take_spot_field_image_auto_expos().
+        """
+        handle = self._handle
+        result = WfsLib.result
+        take_image = self._dll.WFS_TakeSpotfieldImageAutoExpos if auto_exposure else self._dll.WFS_TakeSpotfieldImage
+        calc_spot = self._dll.WFS_CalcSpotsCentrDiaIntens
+        calc_deviations = self._dll.WFS_CalcSpotToReferenceDeviations
+        calc_wavefront = self._dll.WFS_CalcWavefront
+        get_status = self._dll.WFS_GetStatus
+        exposure_time = ViReal64()
+        master_gain = ViReal64()
+        take_args = (handle, byref(exposure_time), byref(master_gain)) if auto_exposure else (handle,)
+        if not auto_exposure:
+            exposure_time.value = self.get_exposure_time()
+            master_gain.value = self.get_master_gain()
+        spot_args = (handle, ViInt32(self.dynamic_noise_cut.value), ViInt32(self.calculate_diameters.value))
+        deviation_args = (handle, ViInt32(self.cancel_spot_wavefront_tilt.value))
+        array_wavefront = np.zeros(MAX_SPOTS[::-1], dtype=np.float32)
+        wavefront_args = (handle, ViInt32(wavefront_type), ViInt32(limit_to_pupil), array_wavefront)
+        wavefront = np.transpose(array_wavefront[:self.spots[1].value, :self.spots[0].value])
+        status_args = (handle, self._device_status_ref)
+        highspeed = self.highspeed and self.highspeed_check_interval
+        log.spam("acquiring a burst of %d wavefronts", len(out))
+        for index in range(len(out)):
+            result(take_image(*take_args))
+            result(calc_spot(*spot_args))
+            if highspeed:
+                self.poll_highspeed(auto_exposure)
+            result(calc_deviations(*deviation_args))
+            result(calc_wavefront(*wavefront_args))
+            result(get_status(*status_args))
+            timestamps[index] = time.time()
+            out[index] = wavefront
+            exposure_times[index] = exposure_time.value
+            master_gains[index] = master_gain.value
+            status[index] = word = self._device_status.value
+            if word & fault_mask and on_fault is not None:
+                on_fault()
+                exposure_time.value = self.get_exposure_time()
+                master_gain.value = self.get_master_gain()
+        if auto_exposure and len(out):
+            self.exposure_time_act = exposure_time
+            self.master_gain_act = master_gain
+        return out
 
 # some example code to acquire one wavefront and close the instrument
 if __name__ == "__main__":
@@ -532,8 +1215,8 @@ if __name__ == "__main__":
         sdk.take_spot_field_image_auto_expos()
         status = sdk.get_status()
         # check if parameters are right
-        print(status)
-        if (not status["PTH"]) and (not status["PTL"]) and (not status["HAL"]):
+        print(status.to_dict())
+        if not status & (WfsStatus.PTH | WfsStatus.PTL | WfsStatus.HAL):
             break
     sdk.calc_spot()
     sdk.calc_deviations()
@@ -543,6 +1226,6 @@ if __name__ == "__main__":
         plt.colorbar()
         plt.show()
     except Exception as e:
-        log.critical(f"{e}")
+        log.critical("%s", e)
     finally:
         sdk.close()
\ No newline at end of file
@@ -0,0 +1,768 @@
+"""
+Simulator
+=========
+
+Pure python stand-in for the WFS dll. An instance of SimulatedWfsDll can be passed to WfsLib instead of
+ct.windll.WFS_32, e.g. to benchmark WfsSDK and WfsCamera or to develop on machines without a sensor attached.
+"""
+
+import time
+import threading
+from ctypes import c_int32
+import numpy as np
+
+try:
+    from .helper import log
+    from .sdk import WFS_STATUS, WFS_TRIGGER_MODES, MAX_SPOTS, camera_resolutions
+    from .zernike import ZernikeFit, zernike, noll_to_nm, driver_to_noll
+except:
+    from helper import log
+    from sdk import WFS_STATUS, WFS_TRIGGER_MODES, MAX_SPOTS, camera_resolutions
+    from zernike import ZernikeFit, zernike, noll_to_nm, driver_to_noll
+
+
+# status codes returned by the simulated driver
+# the values are made up but live in the same (negative) ranges as the ones of VISA and WFS.h
+VI_SUCCESS = 0
+VI_ERROR_INV_OBJECT = c_int32(0xBFFF000E).value
+SIM_ERROR = {
+    "NOT_IMPLEMENTED": c_int32(0xBFFA0F00).value,  # function is not provided by the simulator
+    "INVALID_PARAMETER": c_int32(0xBFFA0F01).value,  # e.g. index out of range
+    "IN_USE": c_int32(0xBFFA0F02).value,  # instrument is already opened
+    "NOT_CONFIGURED": c_int32(0xBFFA0F03).value,  # ConfigureCam has not been called
+    "NO_IMAGE": c_int32(0xBFFA0F04).value,  # no spotfield image has been taken
+    "NO_SPOTS": c_int32(0xBFFA0F05).value,  # spots have not been calculated
+    "NO_DEVIATIONS": c_int32(0xBFFA0F06).value,  # deviations have not been calculated
+}
+
+# exposure time in ms (min, max, increment) and master gain (min, max)
+EXPOSURE_TIME_RANGE = [0.079, 65.0, 0.001]
+MASTER_GAIN_RANGE = [1.0, 5.0]
+
+# calibrated microlens arrays as returned by WFS_GetMlaData
+# name, cam_pitch (um), lenslet_pitch (um), spot_offset x/y (pixel), lenslet_f (um), grd_corr_0, grd_corr_45
+DEFAULT_MLAS = [
+    ["MLA150-5C", 5.86, 150.0, 0.0, 0.0, 5200.0, 1.0, 1.0],
+    ["MLA300-14AR", 5.86, 300.0, 0.0, 0.0, 14200.0, 1.0, 1.0],
+]
+
+
+def _value(arg):
+    """
+    This function returns the python value of a ctypes object, a byref() argument or a plain python object
+    """
+    arg = getattr(arg, "_obj", arg)
+    return getattr(arg, "value", arg)
+
+
+def _store(ref, value):
+    """
+    This function writes a value into a ctypes object that has been passed directly or by byref()
+    """
+    getattr(ref, "_obj", ref).value = value
+
+
+class SimulatedFunction(object):
+    """
+    This class mimics a ctypes function pointer, i.e. it accepts restype and argtypes and can be called
+    """
+
+    def __init__(self, name, func, latency):
+        self.__name__ = name
+        self.restype = None
+        self.argtypes = None
+        self._func = func
+        self._latency = latency
+
+    def __call__(self, *args):
+        # time.sleep releases the GIL just like a ctypes call into the real dll
+        if self._latency:
+            time.sleep(self._latency)
+        return self._func(*args)
+
+
+class SimulatedSensor(object):
+    """
+    This class holds the state of one simulated Shack-Hartmann sensor
+    """
+
+    def __init__(self, serial="M00000000", name="WFS30-5C", zernike={}, noise=0.0, faults={}, exposure=1.0, gain=1.0, mlas=DEFAULT_MLAS, seed=None, trigger_delay=None):
+        """
+        zernike maps Noll indices to coefficients in um, noise is the rms of white noise added to every spot in um.
+        faults maps keys of WFS_STATUS to the probability that this bit is raised for a taken spotfield image.
+        With a hardware trigger mode an armed sensor is triggered trigger_delay seconds after arming,
+        with None only by SimulatedWfsDll.trigger().
+        """
+        self.trigger_delay = trigger_delay
+        self.serial = serial
+        self.name = name
+        self.zernike = dict(zernike)
+        self.noise = noise
+        self.faults = dict(faults)
+        self.exposure = exposure
+        self.gain = gain
+        self.mlas = [list(mla) for mla in mlas]
+        self.resolutions = camera_resolutions(name)
+        if self.resolutions is None:
+            raise ValueError(f"unknown instrument family of {name}")
+        self.in_use = False
+        self._rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self):
+        """
+        This function puts the sensor into its power on state
+        """
+        self.mla_index = 0
+        self.cam_resol_index = None
+        self.spots = None
+        self.pupil_center = [0.0, 0.0]
+        self.pupil_diameter = None
+        self.reference_index = 0
+        self.trigger_mode = 0
+        self.armed = None
+        self.cancel_wavefront_tilt = False
+        self.status = 0
+        self.highspeed = False
+        self.frame = None
+        self.stage = None
+        self.calculated = None
+        self.average = 0
+        self._grid = None
+
+    def configure(self, cam_resol_index):
+        """
+        This function selects a camera resolution and returns the number of spots in X and Y
+        """
+        cam_pitch, lenslet_pitch = self.mlas[self.mla_index][1:3]
+        self.cam_resol_index = cam_resol_index
+        self.spots = [min(int(pixels * cam_pitch / lenslet_pitch), max_spots) for pixels, max_spots in zip(self.resolutions[cam_resol_index], MAX_SPOTS)]
+        if self.pupil_diameter is None:
+            self.pupil_diameter = [spots * lenslet_pitch / 1000 for spots in self.spots]
+        self.status |= WFS_STATUS["CFG"] | WFS_STATUS["SPC"]
+        self.stage = None
+        self._grid = None
+        return self.spots
+
+    def grid(self):
+        """
+        This function returns the lenslet coordinates in mm and the pupil mask, both in Y, X order
+        """
+        if self._grid is None:
+            lenslet_pitch = self.mlas[self.mla_index][2] / 1000
+            x = (np.arange(self.spots[0]) - (self.spots[0] - 1) / 2) * lenslet_pitch
+            y = (np.arange(self.spots[1]) - (self.spots[1] - 1) / 2) * lenslet_pitch
+            xx, yy = np.meshgrid(x, y)
+            u = (xx - self.pupil_center[0]) / (self.pupil_diameter[0] / 2)
+            v = (yy - self.pupil_center[1]) / (self.pupil_diameter[1] / 2)
+            rho = np.hypot(u, v)
+            theta = np.arctan2(v, u)
+            reconstructed = np.zeros_like(rho)
+            for j, coefficient in self.zernike.items():
+                reconstructed += coefficient * zernike(j, rho, theta)
+            self._grid = (xx, yy, rho <= 1, reconstructed)
+        return self._grid
+
+    def take_image(self):
+        """
+        This function simulates the acquisition of a spotfield image
+        """
+        _, _, _, reconstructed = self.grid()
+        measured = reconstructed
+        if self.noise:
+            measured = reconstructed + self._rng.normal(0.0, self.noise, reconstructed.shape)
+        self.frame = (measured, reconstructed)
+        self.status &= ~(WFS_STATUS["RDA"] | WFS_STATUS["SPC"])
+        for key in ("PTH", "PTL", "HAL", "SCL", "LOS", "FIL", "CON", "MIS"):
+            self.status &= ~WFS_STATUS[key]
+        for key, probability in self.faults.items():
+            # mismatched centroids only occur in highspeed mode
+            if key == "MIS" and not self.highspeed:
+                continue
+            if self._rng.random() < probability:
+                self.status |= WFS_STATUS[key]
+        self.stage = "image"
+
+    def arm(self):
+        """
+        This function waits for a hardware trigger before the next image is taken (status bit ATR)
+        """
+        self.armed = time.monotonic()
+        self.status |= WFS_STATUS["ATR"]
+        self.stage = None
+
+    def trigger(self):
+        """
+        This function takes the image of an armed sensor
+        """
+        if self.armed is not None:
+            self.armed = None
+            # the image is available once ATR is cleared
+            self.take_image()
+            self.status &= ~WFS_STATUS["ATR"]
+
+    def poll_trigger(self):
+        """
+        This function fires the trigger of an armed sensor once trigger_delay elapsed
+        """
+        if self.armed is not None and self.trigger_delay is not None and time.monotonic() - self.armed >= self.trigger_delay:
+            self.trigger()
+
+    def spot_data(self):
+        """
+        This function returns the per spot data of the current frame in pixels, Y, X order, keyed like SPOT_FIELDS
+        """
+        xx, yy, pupil, _ = self.grid()
+        measured, _ = self.frame
+        cam_pitch, lenslet_pitch, spot_offset_x, spot_offset_y, lenslet_f = self.mlas[self.mla_index][1:6]
+        # the wavefront in um is sampled every lenslet_pitch um, a slope of 1 shifts a spot by lenslet_f um
+        gradient_y, gradient_x = np.gradient(measured, lenslet_pitch)
+        deviation_x = gradient_x * lenslet_f / cam_pitch
+        deviation_y = gradient_y * lenslet_f / cam_pitch
+        if self.cancel_wavefront_tilt:
+            deviation_x = deviation_x - deviation_x[pupil].mean()
+            deviation_y = deviation_y - deviation_y[pupil].mean()
+        pixels = self.resolutions[self.cam_resol_index]
+        reference_x = pixels[0] / 2 + spot_offset_x + xx * 1000 / cam_pitch
+        reference_y = pixels[1] / 2 + spot_offset_y + yy * 1000 / cam_pitch
+        diameter = np.full(xx.shape, lenslet_pitch / cam_pitch / 3)
+        return {
+            "centroid_x": reference_x + deviation_x,
+            "centroid_y": reference_y + deviation_y,
+            "diameter_x": diameter,
+            "diameter_y": diameter,
+            "intensity": 250 * np.exp(-(xx ** 2 + yy ** 2) / (2 * (self.pupil_diameter[0] / 2) ** 2)),
+            "reference_x": reference_x,
+            "reference_y": reference_y,
+            "deviation_x": deviation_x,
+            "deviation_y": deviation_y,
+        }
+
+    def image(self):
+        """
+        This function renders the spotfield of the current frame as uint8 image (rows, columns) with gaussian spots at the centroids
+        """
+        data = self.spot_data()
+        columns, rows = self.resolutions[self.cam_resol_index]
+        cam_pitch, lenslet_pitch = self.mlas[self.mla_index][1:3]
+        pitch = lenslet_pitch / cam_pitch
+        # every pixel belongs to its closest reference spot
+        x = np.arange(columns)
+        y = np.arange(rows)
+        lenslet_x = np.clip(np.round((x - data["reference_x"][0, 0]) / pitch).astype(int), 0, self.spots[0] - 1)
+        lenslet_y = np.clip(np.round((y - data["reference_y"][0, 0]) / pitch).astype(int), 0, self.spots[1] - 1)
+        centroid_x = data["centroid_x"][lenslet_y[:, None], lenslet_x[None, :]]
+        centroid_y = data["centroid_y"][lenslet_y[:, None], lenslet_x[None, :]]
+        intensity = data["intensity"][lenslet_y[:, None], lenslet_x[None, :]]
+        sigma = data["diameter_x"][0, 0] / 2
+        image = intensity * np.exp(-((x[None, :] - centroid_x) ** 2 + (y[:, None] - centroid_y) ** 2) / (2 * sigma ** 2))
+        return np.clip(image, 0, 255).astype(np.uint8)
+
+    def wavefront(self, wavefront_type, limit_to_pupil):
+        """
+        This function returns the measured (0), reconstructed (1) or difference (2) wavefront in um, Y, X order
+        """
+        measured, reconstructed = self.frame
+        wavefront = [measured, reconstructed, measured - reconstructed][wavefront_type]
+        if limit_to_pupil:
+            wavefront = np.where(self.grid()[2], wavefront, np.nan)
+        return wavefront
+
+
+class SimulatedWfsDll(object):
+    """
+    This class provides the WFS_* entry points of the dll used by WfsLib and WfsSDK.
+    Functions not covered by the simulator return SIM_ERROR["NOT_IMPLEMENTED"].
+    """
+
+    def __init__(self, sensors=1, latency=0.0, seed=None, **sensor_kwargs):
+        """
+        sensors is either the number of identical simulated instruments or a list of SimulatedSensor.
+        latency is the delay of every call in seconds or a dict mapping function names to delays.
+        All other keyword arguments are passed to SimulatedSensor.
+        """
+        if isinstance(sensors, int):
+            seeds = np.random.SeedSequence(seed).spawn(sensors)
+            sensors = [SimulatedSensor(serial=f"M{index:08d}", seed=seeds[index], **sensor_kwargs) for index in range(sensors)]
+        self.sensors = list(sensors)
+        self.latency = latency
+        self._sessions = {}
+        self._next_handle = 1
+        self._functions = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # only called for attributes that are not found the usual way, i.e. the WFS_* functions
+        if not name.startswith("WFS_"):
+            raise AttributeError(name)
+        if name not in self._functions:
+            func = getattr(self, f"_{name}", None)
+            if func is None:
+                func = self._not_implemented(name)
+            latency = self.latency.get(name, 0.0) if isinstance(self.latency, dict) else self.latency
+            self._functions[name] = SimulatedFunction(name, func, latency)
+        return self._functions[name]
+
+    @staticmethod
+    def _not_implemented(name):
+        def func(*args):
+            log.warning("%s is not provided by the simulator", name)
+            return SIM_ERROR["NOT_IMPLEMENTED"]
+        return func
+
+    @staticmethod
+    def resource_name(index):
+        """
+        This function returns the VISA resource name of a simulated instrument
+        """
+        return f"USB::0x1313::0x0000::SIM{index}"
+
+    def trigger(self, index=None):
+        """
+        This function sends a hardware trigger to all armed sensors or the one with list index index
+        """
+        with self._lock:
+            for sensor in (self.sensors if index is None else [self.sensors[index]]):
+                sensor.trigger()
+
+    def _sensor(self, handle):
+        return self._sessions.get(_value(handle))
+
+    # general functions
+    def _WFS_init(self, resource_name, id_query, reset_device, handle):
+        resource_name = _value(resource_name)
+        if isinstance(resource_name, bytes):
+            resource_name = resource_name.decode()
+        for index, sensor in enumerate(self.sensors):
+            if self.resource_name(index) == resource_name:
+                break
+        else:
+            return SIM_ERROR["INVALID_PARAMETER"]
+        with self._lock:
+            if sensor.in_use:
+                return SIM_ERROR["IN_USE"]
+            sensor.in_use = True
+            sensor.reset()
+            self._sessions[self._next_handle] = sensor
+            _store(handle, self._next_handle)
+            self._next_handle += 1
+        return VI_SUCCESS
+
+    def _WFS_close(self, handle):
+        with self._lock:
+            sensor = self._sessions.pop(_value(handle), None)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        sensor.in_use = False
+        return VI_SUCCESS
+
+    def _WFS_GetInstrumentListLen(self, handle, count):
+        _store(count, len(self.sensors))
+        return VI_SUCCESS
+
+    def _WFS_GetInstrumentListInfo(self, handle, list_index, device_id, in_use, instrument_name, instrument_sn, resource_name):
+        list_index = _value(list_index)
+        if not 0 <= list_index < len(self.sensors):
+            return SIM_ERROR["INVALID_PARAMETER"]
+        sensor = self.sensors[list_index]
+        _store(device_id, list_index)
+        _store(in_use, int(sensor.in_use))
+        _store(instrument_name, sensor.name.encode())
+        _store(instrument_sn, sensor.serial.encode())
+        _store(resource_name, self.resource_name(list_index).encode())
+        return VI_SUCCESS
+
+    def _WFS_GetInstrumentInfo(self, handle, manufacturer_name, instrument_name, serial_number_wfs, serial_number_cam):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        _store(manufacturer_name, b"Thorlabs GmbH (simulated)")
+        _store(instrument_name, sensor.name.encode())
+        _store(serial_number_wfs, sensor.serial.encode())
+        _store(serial_number_cam, sensor.serial.encode())
+        return VI_SUCCESS
+
+    # configuration functions
+    def _WFS_ConfigureCam(self, handle, pixel_format, cam_resol_index, spots_x, spots_y):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        cam_resol_index = _value(cam_resol_index)
+        if not 0 <= cam_resol_index < len(sensor.resolutions):
+            return SIM_ERROR["INVALID_PARAMETER"]
+        spots = sensor.configure(cam_resol_index)
+        _store(spots_x, spots[0])
+        _store(spots_y, spots[1])
+        return VI_SUCCESS
+
+    def _WFS_GetXYScale(self, handle, array_scale_x, array_scale_y):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        if sensor.cam_resol_index is None:
+            return SIM_ERROR["NOT_CONFIGURED"]
+        xx, yy = sensor.grid()[:2]
+        array_scale_x[:sensor.spots[0]] = xx[0]
+        array_scale_y[:sensor.spots[1]] = yy[:, 0]
+        return VI_SUCCESS
+
+    def _WFS_GetMlaCount(self, handle, mla_count):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        _store(mla_count, len(sensor.mlas))
+        return VI_SUCCESS
+
+    def _WFS_GetMlaData(self, handle, mla_index, mla_name, cam_pitch, lenslet_pitch, spot_offset_x, spot_offset_y, lenslet_f, grd_corr_0, grd_corr_45):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        mla_index = _value(mla_index)
+        if not 0 <= mla_index < len(sensor.mlas):
+            return SIM_ERROR["INVALID_PARAMETER"]
+        mla = sensor.mlas[mla_index]
+        _store(mla_name, mla[0].encode())
+        for ref, value in zip([cam_pitch, lenslet_pitch, spot_offset_x, spot_offset_y, lenslet_f, grd_corr_0, grd_corr_45], mla[1:]):
+            _store(ref, value)
+        return VI_SUCCESS
+
+    def _WFS_SelectMla(self, handle, mla_index):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        mla_index = _value(mla_index)
+        if not 0 <= mla_index < len(sensor.mlas):
+            return SIM_ERROR["INVALID_PARAMETER"]
+        sensor.mla_index = mla_index
+        if sensor.cam_resol_index is not None:
+            sensor.configure(sensor.cam_resol_index)
+        return VI_SUCCESS
+
+    def _WFS_SetPupil(self, handle, center_x, center_y, diameter_x, diameter_y):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        if _value(diameter_x) <= 0 or _value(diameter_y) <= 0:
+            return SIM_ERROR["INVALID_PARAMETER"]
+        sensor.pupil_center = [_value(center_x), _value(center_y)]
+        sensor.pupil_diameter = [_value(diameter_x), _value(diameter_y)]
+        sensor.status |= WFS_STATUS["PUD"] | WFS_STATUS["SPC"]
+        sensor._grid = None
+        return VI_SUCCESS
+
+    def _WFS_GetPupil(self, handle, center_x, center_y, diameter_x, diameter_y):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        if sensor.pupil_diameter is None:
+            return SIM_ERROR["NOT_CONFIGURED"]
+        for ref, value in zip([center_x, center_y, diameter_x, diameter_y], sensor.pupil_center + sensor.pupil_diameter):
+            _store(ref, value)
+        return VI_SUCCESS
+
+    def _WFS_SetReferencePlane(self, handle, reference_index):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        sensor.reference_index = _value(reference_index)
+        return VI_SUCCESS
+
+    def _WFS_GetReferencePlane(self, handle, reference_index):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        _store(reference_index, sensor.reference_index)
+        return VI_SUCCESS
+
+    def _WFS_SetHighspeedMode(self, handle, highspeed_mode, adapt_centroids, subtract_offset, allow_auto_exposure):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        if sensor.spots is None:
+            return SIM_ERROR["NOT_CONFIGURED"]
+        if _value(highspeed_mode) and _value(adapt_centroids) and sensor.stage is None:
+            return SIM_ERROR["NO_SPOTS"]
+        sensor.highspeed = bool(_value(highspeed_mode))
+        sensor.status &= ~(WFS_STATUS["HSP"] | WFS_STATUS["MIS"])
+        if sensor.highspeed:
+            sensor.status |= WFS_STATUS["HSP"]
+        sensor.stage = None
+        return VI_SUCCESS
+
+    def _WFS_GetHighspeedWindows(self, handle, window_count_x, window_count_y, window_size_x, window_size_y, window_start_position_x, window_start_position_y):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        if not sensor.highspeed:
+            return SIM_ERROR["NOT_CONFIGURED"]
+        cam_pitch, lenslet_pitch, spot_offset_x, spot_offset_y = sensor.mlas[sensor.mla_index][1:5]
+        size = int(lenslet_pitch / cam_pitch)
+        for ref, value in zip([window_count_x, window_count_y, window_size_x, window_size_y], sensor.spots + [size, size]):
+            _store(ref, value)
+        for start, spots, pixels, offset in zip([window_start_position_x, window_start_position_y], sensor.spots, sensor.resolutions[sensor.cam_resol_index], [spot_offset_x, spot_offset_y]):
+            start[:spots] = (pixels - spots * size) // 2 + int(offset) + np.arange(spots) * size
+        return VI_SUCCESS
+
+    def _WFS_CheckHighspeedCentroids(self, handle):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        if not sensor.highspeed:
+            return SIM_ERROR["NOT_CONFIGURED"]
+        return VI_SUCCESS
+
+    def _WFS_SetTriggerMode(self, handle, trigger_mode):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        if _value(trigger_mode) not in (0, 1, 2, 3):
+            return SIM_ERROR["INVALID_PARAMETER"]
+        sensor.trigger_mode = _value(trigger_mode)
+        return VI_SUCCESS
+
+    def _WFS_GetTriggerMode(self, handle, trigger_mode):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        _store(trigger_mode, sensor.trigger_mode)
+        return VI_SUCCESS
+
+    # action/status functions
+    def _WFS_GetStatus(self, handle, device_status):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        sensor.poll_trigger()
+        _store(device_status, sensor.status)
+        return VI_SUCCESS
+
+    # data functions
+    def _WFS_TakeSpotfieldImage(self, handle):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        if sensor.spots is None:
+            return SIM_ERROR["NOT_CONFIGURED"]
+        if sensor.trigger_mode in (WFS_TRIGGER_MODES["high_low"], WFS_TRIGGER_MODES["low_high"]):
+            # the image is taken on the trigger edge, trigger() must not interleave with arming
+            with self._lock:
+                sensor.arm()
+        else:
+            sensor.take_image()
+        return VI_SUCCESS
+
+    def _WFS_GetExposureTimeRange(self, handle, exposure_time_min, exposure_time_max, exposure_time_incr):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        for ref, value in zip([exposure_time_min, exposure_time_max, exposure_time_incr], EXPOSURE_TIME_RANGE):
+            _store(ref, value)
+        return VI_SUCCESS
+
+    def _WFS_SetExposureTime(self, handle, exposure_time_set, exposure_time_act):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        minimum, maximum, increment = EXPOSURE_TIME_RANGE
+        sensor.exposure = min(max(round(_value(exposure_time_set) / increment) * increment, minimum), maximum)
+        _store(exposure_time_act, sensor.exposure)
+        return VI_SUCCESS
+
+    def _WFS_GetExposureTime(self, handle, exposure_time_act):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        _store(exposure_time_act, sensor.exposure)
+        return VI_SUCCESS
+
+    def _WFS_GetMasterGainRange(self, handle, master_gain_min, master_gain_max):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        _store(master_gain_min, MASTER_GAIN_RANGE[0])
+        _store(master_gain_max, MASTER_GAIN_RANGE[1])
+        return VI_SUCCESS
+
+    def _WFS_SetMasterGain(self, handle, master_gain_set, master_gain_act):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        sensor.gain = min(max(_value(master_gain_set), MASTER_GAIN_RANGE[0]), MASTER_GAIN_RANGE[1])
+        _store(master_gain_act, sensor.gain)
+        return VI_SUCCESS
+
+    def _WFS_GetMasterGain(self, handle, master_gain_act):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        _store(master_gain_act, sensor.gain)
+        return VI_SUCCESS
+
+    def _WFS_CalcImageMinMax(self, handle, image_min, image_max, saturated_pixels_percent):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        if sensor.stage is None:
+            return SIM_ERROR["NO_IMAGE"]
+        # the peak intensity of the rendered spots
+        _store(image_min, 0)
+        _store(image_max, 255 if sensor.status & WFS_STATUS["PTH"] else 250)
+        _store(saturated_pixels_percent, 0.0)
+        return VI_SUCCESS
+
+    def _WFS_TakeSpotfieldImageAutoExpos(self, handle, exposure_time_act, master_gain_act):
+        status = self._WFS_TakeSpotfieldImage(handle)
+        if status == VI_SUCCESS:
+            sensor = self._sensor(handle)
+            _store(exposure_time_act, sensor.exposure)
+            _store(master_gain_act, sensor.gain)
+        return status
+
+    def _WFS_GetSpotfieldImageCopy(self, handle, image_buf, rows, columns):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        if sensor.stage is None:
+            return SIM_ERROR["NO_IMAGE"]
+        image = sensor.image()
+        image_buf.reshape(-1)[:image.size] = image.reshape(-1)
+        _store(rows, image.shape[0])
+        _store(columns, image.shape[1])
+        return VI_SUCCESS
+
+    def _WFS_AverageImage(self, handle, average_count, average_data_ready):
+        # the simulated frames are identical apart from noise, every call takes one image
+        status = self._WFS_TakeSpotfieldImage(handle)
+        if status == VI_SUCCESS:
+            sensor = self._sensor(handle)
+            sensor.average += 1
+            _store(average_data_ready, int(sensor.average >= _value(average_count)))
+            if sensor.average >= _value(average_count):
+                sensor.average = 0
+        return status
+
+    def _WFS_AverageImageRolling(self, handle, average_count, rolling_reset):
+        return self._WFS_TakeSpotfieldImage(handle)
+
+    def _WFS_CalcSpotsCentrDiaIntens(self, handle, dynamic_noise_cut, calculate_diameters):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        if sensor.stage is None:
+            return SIM_ERROR["NO_IMAGE"]
+        sensor.stage = "spots"
+        return VI_SUCCESS
+
+    def _WFS_CalcSpotToReferenceDeviations(self, handle, cancel_wavefront_tilt):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        if sensor.stage not in ("spots", "deviations"):
+            return SIM_ERROR["NO_SPOTS"]
+        sensor.stage = "deviations"
+        sensor.cancel_wavefront_tilt = bool(_value(cancel_wavefront_tilt))
+        sensor.status |= WFS_STATUS["RDA"]
+        return VI_SUCCESS
+
+    def _get_spot_data(self, handle, stage, fields, arrays):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        if sensor.stage not in stage:
+            return SIM_ERROR["NO_DEVIATIONS"] if "spots" not in stage else SIM_ERROR["NO_SPOTS"]
+        data = sensor.spot_data()
+        for field, array in zip(fields, arrays):
+            array[:sensor.spots[1], :sensor.spots[0]] = data[field]
+        return VI_SUCCESS
+
+    def _WFS_GetSpotCentroids(self, handle, array_centroid_x, array_centroid_y):
+        return self._get_spot_data(handle, ("spots", "deviations"), ["centroid_x", "centroid_y"], [array_centroid_x, array_centroid_y])
+
+    def _WFS_GetSpotDiameters(self, handle, array_diameter_x, array_diameter_y):
+        return self._get_spot_data(handle, ("spots", "deviations"), ["diameter_x", "diameter_y"], [array_diameter_x, array_diameter_y])
+
+    def _WFS_GetSpotIntensities(self, handle, array_intensities):
+        return self._get_spot_data(handle, ("spots", "deviations"), ["intensity"], [array_intensities])
+
+    def _WFS_GetSpotReferencePositions(self, handle, array_reference_x, array_reference_y):
+        return self._get_spot_data(handle, ("deviations",), ["reference_x", "reference_y"], [array_reference_x, array_reference_y])
+
+    def _WFS_GetSpotDeviations(self, handle, array_deviation_x, array_deviation_y):
+        return self._get_spot_data(handle, ("deviations",), ["deviation_x", "deviation_y"], [array_deviation_x, array_deviation_y])
+
+    def _WFS_ZernikeLsf(self, handle, zernike_orders, array_zernike_um, array_zernike_orders_um, roc_mm):
+        # the simulator fits Noll ordered polynomials on the host and returns them in the order of the driver
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        if sensor.stage != "deviations":
+            return SIM_ERROR["NO_DEVIATIONS"]
+        orders = _value(zernike_orders) or 4
+        if not 2 <= orders <= len(array_zernike_orders_um) - 1:
+            return SIM_ERROR["INVALID_PARAMETER"]
+        fit = ZernikeFit(sensor.spots, sensor.mlas[sensor.mla_index][2], sensor.pupil_center, sensor.pupil_diameter, orders)
+        coefficients = fit.fit(sensor.frame[0].T)
+        array_zernike_um[:] = 0
+        for j in range(1, len(coefficients) + 1):
+            array_zernike_um[j] = coefficients[driver_to_noll(j) - 1]
+        array_zernike_orders_um[:] = 0
+        for j, coefficient in zip(fit.modes, coefficients):
+            array_zernike_orders_um[noll_to_nm(j)[0]] += coefficient ** 2
+        array_zernike_orders_um[:] = np.sqrt(array_zernike_orders_um)
+        # defocus sag 2 sqrt(3) c rho^2 equals r^2 / (2 roc)
+        defocus = coefficients[3] * 1e-3
+        _store(zernike_orders, orders)
+        _store(roc_mm, (sensor.pupil_diameter[0] / 2) ** 2 / (4 * np.sqrt(3) * defocus) if defocus else np.inf)
+        return VI_SUCCESS
+
+    def _WFS_CalcWavefront(self, handle, wavefront_type, limit_to_pupil, array_wavefront):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        if sensor.stage != "deviations":
+            return SIM_ERROR["NO_DEVIATIONS"]
+        wavefront_type = _value(wavefront_type)
+        if wavefront_type not in (0, 1, 2):
+            return SIM_ERROR["INVALID_PARAMETER"]
+        array_wavefront[:sensor.spots[1], :sensor.spots[0]] = sensor.wavefront(wavefront_type, _value(limit_to_pupil))
+        sensor.calculated = wavefront_type
+        return VI_SUCCESS
+
+    def _WFS_CalcWavefrontStatistics(self, handle, minimum, maximum, diff, mean, rms, weighted_rms):
+        sensor = self._sensor(handle)
+        if sensor is None:
+            return VI_ERROR_INV_OBJECT
+        if sensor.calculated is None or sensor.stage != "deviations":
+            return SIM_ERROR["NO_DEVIATIONS"]
+        # the driver evaluates the last calculated wavefront within the pupil
+        pupil = sensor.grid()[2]
+        wavefront = sensor.wavefront(sensor.calculated, False)[pupil]
+        intensity = sensor.spot_data()["intensity"][pupil]
+        average = wavefront.mean()
+        for ref, value in zip([minimum, maximum, diff, mean, rms], [wavefront.min(), wavefront.max(), np.ptp(wavefront), average, wavefront.std()]):
+            _store(ref, value)
+        _store(weighted_rms, np.sqrt(np.average((wavefront - average) ** 2, weights=intensity)))
+        return VI_SUCCESS
+
+
+# some example code measuring the overhead of WfsSDK on top of the simulated dll
+if __name__ == "__main__":
+    try:
+        from .sdk import WfsLib
+    except:
+        from sdk import WfsLib
+    dll = SimulatedWfsDll(zernike={4: 0.5, 5: 0.1}, noise=0.01, faults={"PTH": 0.01})
+    lib = WfsLib(dll)
+    sdk = lib.open(list_index=0)
+    sdk.set_mla(mla_index=0)
+    sdk.set_resolution(cam_resol_index=2)
+    sdk.set_pupil(center=[0, 0], diameter=[3, 3])
+    n = 1000
+    start = time.perf_counter()
+    for i in range(n):
+        sdk.take_spot_field_image_auto_expos()
+        sdk.calc_spot()
+        sdk.calc_deviations()
+        result = sdk.calc_wavefront()
+    print(f"{(time.perf_counter() - start) / n * 1e6:.1f} us per wavefront")
+    sdk.close()
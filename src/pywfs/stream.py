@@ -0,0 +1,185 @@
+"""
+Stream
+======
+
+Background acquisition of wavefronts, capturing the next frame while the consumer processes the current one.
+"""
+
+import time
+import threading
+from collections import deque, namedtuple
+import numpy as np
+
+try:
+    from .helper import log
+    from .sdk import WfsError
+except:
+    from helper import log
+    from sdk import WfsError
+
+
+# one acquired wavefront, index counts all acquired frames including dropped ones
+WfsFrame = namedtuple("WfsFrame", ["index", "timestamp", "wavefront"])
+
+
+class WfsStream(object):
+    """
+    This class runs WfsCamera.acquire_wavefront on a dedicated thread and hands the frames over through a bounded queue.
+    The ctypes calls into the dll release the GIL, so capturing frame N+1 overlaps with the consumer working on frame N.
+
+    A full queue is handled according to policy:
+        block: the acquisition thread waits for the consumer
+        drop_oldest: the oldest queued frame is discarded
+        drop_newest: the newly acquired frame is discarded
+
+    Wavefronts are written into preallocated buffers. A yielded frame is only valid until the next one is requested,
+    copy it if it has to be kept. The camera must not be used otherwise while the stream is running.
+    """
+
+    POLICIES = ("block", "drop_oldest", "drop_newest")
+
+    def __init__(self, camera, queue_size=4, policy="block", limit_to_pupil=True):
+        if policy not in WfsStream.POLICIES:
+            raise WfsError(f"unknown policy {policy}, use one of {WfsStream.POLICIES}")
+        if queue_size < 1:
+            raise WfsError("queue_size has to be at least 1")
+        self._camera = camera
+        self.queue_size = queue_size
+        self.policy = policy
+        self.limit_to_pupil = limit_to_pupil
+        self._queue = deque()
+        self._free = []
+        self._current = None
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._error = None
+        self.acquired = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self):
+        """
+        This function returns the number of frames waiting in the queue
+        """
+        return len(self._queue)
+
+    @property
+    def counters(self):
+        """
+        This function returns the acquired, delivered and dropped frames as well as the current and maximum queue depth
+        """
+        return {
+            "acquired": self.acquired,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+        }
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        """
+        This function allocates the frame buffers and starts the acquisition thread
+        """
+        if self._running:
+            return
+        # check if the device has been already initiated
+        if self._camera.configuration is None:
+            self._camera.configure()
+        spots = self._camera._sdk.spots
+        # queued frames, one frame held by the consumer and one being acquired
+        self._free = [np.empty([spots[0].value, spots[1].value], dtype=np.float32) for i in range(self.queue_size + 2)]
+        self._queue.clear()
+        self._current = None
+        self._error = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="WfsStream", daemon=True)
+        self._thread.start()
+        log.spam("stream started with queue size %s and policy %s", self.queue_size, self.policy)
+
+    def stop(self):
+        """
+        This function stops the acquisition thread and waits for the current acquisition to finish
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        log.spam("stream stopped: %s", self.counters)
+
+    def _run(self):
+        """
+        This function is the acquisition loop, there is always a free buffer since the queue is bounded
+        """
+        try:
+            while self._running:
+                with self._condition:
+                    buffer = self._free.pop()
+                self._camera.acquire_wavefront(limit_to_pupil=self.limit_to_pupil, out=buffer)
+                frame = WfsFrame(self.acquired, time.time(), buffer)
+                self.acquired += 1
+                with self._condition:
+                    if len(self._queue) >= self.queue_size:
+                        if self.policy == "block":
+                            while self._running and len(self._queue) >= self.queue_size:
+                                self._condition.wait()
+                            if not self._running:
+                                # stopped while waiting, the frame is never delivered
+                                self._free.append(buffer)
+                                self.dropped += 1
+                                break
+                        elif self.policy == "drop_oldest":
+                            self._free.append(self._queue.popleft().wavefront)
+                            self.dropped += 1
+                        else:
+                            self._free.append(buffer)
+                            self.dropped += 1
+                            continue
+                    self._queue.append(frame)
+                    self.max_depth = max(self.max_depth, len(self._queue))
+                    self._condition.notify_all()
+        except Exception as e:
+            log.error("stream acquisition failed: %s", e)
+            self._error = e
+        finally:
+            with self._condition:
+                self._running = False
+                self._condition.notify_all()
+
+    def __iter__(self):
+        if self._thread is None:
+            self.start()
+        return self
+
+    def __next__(self):
+        with self._condition:
+            # the buffer of the previous frame can be reused now
+            if self._current is not None:
+                self._free.append(self._current)
+                self._current = None
+            while self._running and not self._queue:
+                self._condition.wait()
+            if not self._queue:
+                if self._error is not None:
+                    raise self._error
+                raise StopIteration
+            frame = self._queue.popleft()
+            self._condition.notify_all()
+        self._current = frame.wavefront
+        self.delivered += 1
+        return frame
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
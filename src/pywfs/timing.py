@@ -0,0 +1,230 @@
+"""
+Timing
+======
+
+Opt-in instrumentation of the dll calls and acquisition stages. Latencies are measured with time.perf_counter() and
+collected in fixed size logarithmic histograms, so recording has constant cost and memory.
+The dll time spent within a stage is accounted separately, which tells driver bound from Python bound time.
+"""
+
+import json
+import math
+import threading
+from time import perf_counter
+from contextlib import contextmanager
+
+try:
+    from .helper import log
+except:
+    from helper import log
+
+
+# histogram bins from 100 ns to 100 s, BINS_PER_DECADE bins per decade
+MIN_EXPONENT = -7
+MAX_EXPONENT = 2
+BINS_PER_DECADE = 20
+BIN_COUNT = (MAX_EXPONENT - MIN_EXPONENT) * BINS_PER_DECADE
+
+
+class LatencyHistogram(object):
+    """
+    This class counts latencies in logarithmic bins, percentiles are resolved to the upper edge of their bin (about 12 %)
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bins = [0] * BIN_COUNT
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        index = int((math.log10(seconds) - MIN_EXPONENT) * BINS_PER_DECADE) if seconds > 0 else 0
+        self.bins[min(max(index, 0), BIN_COUNT - 1)] += 1
+
+    def percentile(self, percent):
+        """
+        This function returns the latency in seconds below which percent of the calls finished
+        """
+        if not self.count:
+            return 0.0
+        threshold = percent / 100 * self.count
+        cumulative = 0
+        for index, count in enumerate(self.bins):
+            cumulative += count
+            if cumulative >= threshold:
+                return min(10 ** (MIN_EXPONENT + (index + 1) / BINS_PER_DECADE), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "max": self.max
+        }
+
+
+class WfsTimings(object):
+    """
+    This class collects the latencies of dll calls (by function name) and of acquisition stages (see stage()).
+    With enabled False nothing is measured, the remaining overhead is a single attribute check per call.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.calls = {}
+        self.stages = {}
+        self.stage_driver = {}
+
+    def record(self, name, seconds, stage=False):
+        """
+        This function adds one latency in seconds to the histogram of a dll function or a stage
+        """
+        histograms = self.stages if stage else self.calls
+        with self._lock:
+            histogram = histograms.get(name)
+            if histogram is None:
+                histogram = histograms[name] = LatencyHistogram()
+            histogram.record(seconds)
+        if not stage:
+            # dll time of the calling thread, read by the enclosing stages
+            self._local.driver = getattr(self._local, "driver", 0.0) + seconds
+
+    @contextmanager
+    def _measure(self, name):
+        driver = getattr(self._local, "driver", 0.0)
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, perf_counter() - start, stage=True)
+            with self._lock:
+                self.stage_driver[name] = self.stage_driver.get(name, 0.0) + getattr(self._local, "driver", 0.0) - driver
+
+    def stage(self, name):
+        """
+        This function returns a context manager measuring the enclosed code as stage name
+        """
+        if not self.enabled:
+            return NULL_STAGE
+        return self._measure(name)
+
+    def wrap(self, dll):
+        """
+        This function returns a proxy of dll whose WFS_ functions are measured
+        """
+        return TimedDll(dll, self)
+
+    def reset(self):
+        with self._lock:
+            self.calls = {}
+            self.stages = {}
+            self.stage_driver = {}
+
+    def snapshot(self):
+        """
+        This function returns count, total, mean, p50, p99 and max (in seconds) of every dll function and stage.
+        Stages additionally split their total into driver (time within dll calls) and python (the rest).
+        """
+        with self._lock:
+            calls = {name: histogram.summary() for name, histogram in self.calls.items()}
+            stages = {name: histogram.summary() for name, histogram in self.stages.items()}
+            for name, summary in stages.items():
+                summary["driver"] = self.stage_driver.get(name, 0.0)
+                summary["python"] = summary["total"] - summary["driver"]
+        return {"calls": calls, "stages": stages}
+
+    def export(self, filename):
+        """
+        This function writes the snapshot as JSON file
+        """
+        with open(filename, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        log.spam("timings exported to %s", filename)
+
+    def report(self):
+        """
+        This function returns the snapshot as text table, latencies in microseconds
+        """
+        snapshot = self.snapshot()
+        lines = [f"{'name':40s} {'count':>8s} {'mean':>10s} {'p50':>10s} {'p99':>10s} {'max':>10s}"]
+        for name, summary in sorted(list(snapshot["stages"].items()) + list(snapshot["calls"].items())):
+            values = " ".join(f"{summary[key] * 1e6:10.1f}" for key in ("mean", "p50", "p99", "max"))
+            lines.append(f"{name:40s} {summary['count']:8d} {values}")
+        return "\n".join(lines)
+
+
+class _NullStage(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+# the stage of disabled timings, it measures nothing
+NULL_STAGE = _NullStage()
+
+
+def untimed(name):
+    """
+    This function returns NULL_STAGE for every stage name, it stands in for WfsTimings.stage where nothing is measured
+    """
+    return NULL_STAGE
+
+
+class TimedDll(object):
+    """
+    This class forwards attribute access to a dll and measures every call of a WFS_ function.
+    Prototypes (argtypes, restype) are read from and assigned to the wrapped functions.
+    """
+
+    def __init__(self, dll, timings):
+        self._dll = dll
+        self._timings = timings
+
+    def __getattr__(self, name):
+        function = getattr(self._dll, name)
+        if not name.startswith("WFS_"):
+            return function
+        timed = TimedFunction(name, function, self._timings)
+        # cache the wrapper, later lookups do not pass __getattr__
+        object.__setattr__(self, name, timed)
+        return timed
+
+
+class TimedFunction(object):
+    """
+    This class measures the calls of one dll function while its timings are enabled
+    """
+
+    def __init__(self, name, function, timings):
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "function", function)
+        object.__setattr__(self, "timings", timings)
+
+    def __getattr__(self, name):
+        return getattr(self.function, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.function, name, value)
+
+    def __call__(self, *args):
+        if not self.timings.enabled:
+            return self.function(*args)
+        start = perf_counter()
+        try:
+            return self.function(*args)
+        finally:
+            self.timings.record(self.name, perf_counter() - start)
@@ -0,0 +1,151 @@
+"""
+Trigger
+=======
+
+Acquisition synchronized to a hardware trigger. Every frame is stamped when the camera is armed, when the trigger has been
+detected and when the wavefront has been calculated (time.perf_counter() seconds), which gives the latency and jitter of
+the triggered loop.
+"""
+
+from time import perf_counter
+from collections import namedtuple
+import numpy as np
+
+try:
+    from .helper import log, describe
+    from .sdk import WfsError, WFS_TRIGGER_MODES, HARDWARE_TRIGGER_MODES
+except:
+    from helper import log, describe
+    from sdk import WfsError, WFS_TRIGGER_MODES, HARDWARE_TRIGGER_MODES
+
+
+# one triggered wavefront with the perf_counter() times of arming, trigger detection and completed processing
+WfsTriggeredFrame = namedtuple("WfsTriggeredFrame", ["index", "wavefront", "status", "armed", "triggered", "processed"])
+
+
+class TriggerStatistics(object):
+    """
+    This class keeps the times of the last size triggered frames
+    """
+
+    def __init__(self, size=1024):
+        self.size = size
+        self._times = np.zeros((size, 3), dtype=np.float64)
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def append(self, armed, triggered, processed):
+        self._times[self.count % self.size] = armed, triggered, processed
+        self.count += 1
+
+    @property
+    def times(self):
+        """
+        This function returns the recorded (armed, triggered, processed) times, oldest first
+        """
+        if self.count > self.size:
+            return np.roll(self._times, -(self.count % self.size), axis=0)
+        return self._times[:self.count].copy()
+
+    def summary(self):
+        """
+        This function returns the statistics of the recorded frames in seconds:
+            trigger_wait: from arming until the trigger has been detected
+            processing: from the trigger until the wavefront is available, i.e. the latency of the loop
+            period: between consecutive triggers, jitter is its standard deviation
+        """
+        armed, triggered, processed = self.times.T
+        period = np.diff(triggered)
+        return {
+            "frames": self.count,
+            "trigger_wait": describe(triggered - armed),
+            "processing": describe(processed - triggered),
+            "period": describe(period),
+            "jitter": float(np.std(period)) if len(period) else None
+        }
+
+
+class TriggeredAcquisition(object):
+    """
+    This class acquires wavefronts on hardware triggers. acquire() arms the camera with the current exposure settings
+    (configure exposure_time or lock the exposure beforehand), waits for the trigger without spinning and calculates the wavefront
+    like WfsCamera.acquire_wavefront(), see WfsCamera.arm() and WfsCamera.process_frame().
+    The trigger is detected up to poll_interval late, choose it small against the trigger period.
+    The trigger mode is switched on by start() and restored by stop(), the class can be used as context manager.
+    """
+
+    def __init__(self, camera, trigger_mode="low_high", timeout=1.0, poll_interval=1e-3, history=1024):
+        """
+        timeout in seconds per frame (None waits forever), history is the number of frames kept for summary()
+        """
+        self.trigger_mode = WFS_TRIGGER_MODES.get(trigger_mode, trigger_mode)
+        if self.trigger_mode not in HARDWARE_TRIGGER_MODES:
+            raise WfsError(f"{trigger_mode} is not a hardware trigger mode")
+        self._camera = camera
+        self._sdk = camera.sdk
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.statistics = TriggerStatistics(history)
+        self.acquired = 0
+        self._previous_mode = None
+
+    def start(self):
+        """
+        This function switches the camera to the trigger mode
+        """
+        if self._camera.configuration is None:
+            self._camera.configure()
+        self._previous_mode = self._sdk.get_trigger_mode()
+        self._camera.set_feature("trigger_mode", {"trigger_mode": self.trigger_mode})
+        log.spam("triggered acquisition started with trigger mode %s", self.trigger_mode)
+        return self
+
+    def stop(self):
+        """
+        This function restores the trigger mode the camera had before start()
+        """
+        if self._previous_mode is not None:
+            self._camera.set_feature("trigger_mode", {"trigger_mode": self._previous_mode})
+            self._previous_mode = None
+        log.spam("triggered acquisition stopped after %s frames", self.acquired)
+
+    def acquire(self, limit_to_pupil=True, out=None):
+        """
+        This function arms the camera, waits for the trigger and returns the wavefront as WfsTriggeredFrame
+        """
+        armed = perf_counter()
+        self._camera.arm()
+        status = self._sdk.wait_for_trigger(self.timeout, self.poll_interval)
+        triggered = perf_counter()
+        wavefront = self._camera.process_frame(status, limit_to_pupil=limit_to_pupil, out=out)
+        processed = perf_counter()
+        self.statistics.append(armed, triggered, processed)
+        frame = WfsTriggeredFrame(self.acquired, wavefront, status, armed, triggered, processed)
+        self.acquired += 1
+        return frame
+
+    def frames(self, count=None, limit_to_pupil=True):
+        """
+        This function is a generator of WfsTriggeredFrame, count limits the number of frames
+        """
+        acquired = 0
+        while count is None or acquired < count:
+            yield self.acquire(limit_to_pupil=limit_to_pupil)
+            acquired += 1
+
+    def __iter__(self):
+        return self.frames()
+
+    def summary(self):
+        """
+        This function returns the latency and jitter statistics, see TriggerStatistics.summary()
+        """
+        return self.statistics.summary()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
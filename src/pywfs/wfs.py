@@ -3,13 +3,38 @@ This file only contains python code, no C is to be found here.
 """
 
 import numpy as np
+from collections import namedtuple
 
 try:
     from .helper import log
-    from .sdk import WfsLib, WfsSDK, WFSError
+    from .sdk import WfsLib, WfsSDK, WfsError
+    from .timing import untimed
+    from .stream import WfsStream
+    from .trigger import TriggeredAcquisition
+    from .processing import WfsPipeline
+    from .network import WfsServer
+    from .rolling import WfsStatistics
+    from .change import WfsChangeDetector
+    from .zernike import ZernikeFit
+    from .exposure import ExposureController, EXPOSURE_FAULTS
+    from .configuration import WfsConfiguration
 except:
     from helper import log
     from sdk import WfsLib, WfsSDK, WfsError
+    from timing import untimed
+    from stream import WfsStream
+    from trigger import TriggeredAcquisition
+    from processing import WfsPipeline
+    from network import WfsServer
+    from rolling import WfsStatistics
+    from change import WfsChangeDetector
+    from zernike import ZernikeFit
+    from exposure import ExposureController, EXPOSURE_FAULTS
+    from configuration import WfsConfiguration
+
+
+# result of WfsCamera.acquire_burst(), one entry per frame in all arrays
+WfsBurst = namedtuple("WfsBurst", ["wavefronts", "exposure_times", "master_gains", "status", "timestamps"])
 
 
 class WfsCamera(object):
@@ -24,6 +49,9 @@ class WfsCamera(object):
         self._sdk = sdk
         self._default_configuration = default_configuration
         self._configuration = None
+        self._state = WfsConfiguration(sdk)
+        self._exposure = None
+        self._statistics = None
 
     def close(self):
         """
@@ -33,9 +61,9 @@ class WfsCamera(object):
 
     def set_feature(self, feature, kwargs):
         """
-        This functions calls a set_ methos in WfsSDK with kwargs
+        This functions calls the set_ method of a feature (see configuration.FEATURES) in WfsSDK with kwargs
         """
-        return getattr(self._sdk, f"set_{feature}")(**kwargs)
+        return self._state.apply({feature: kwargs}, force=True).get(feature)
 
     @property
     def default_configuration(self):
@@ -51,15 +79,27 @@ class WfsCamera(object):
         """
         return self._configuration
 
-    def configure(self, configuration=None):
+    @property
+    def sdk(self):
         """
-        This functions configures the sensor via a provided dict, else a default is used
+        This function returns the WfsSDK of the camera
+        """
+        return self._sdk
+
+    @property
+    def state(self):
+        """
+        This function returns the WfsConfiguration tracking what has been applied to the device
+        """
+        return self._state
+
+    def configure(self, configuration=None, force=False):
+        """
+        This functions configures the sensor via a provided dict, else a default is used.
+        Only features that changed since the last call are applied (all with force), values are validated before any call.
         """
         self._configuration = self._default_configuration if configuration is None else configuration
-        for feature in self.configuration:
-            # only execute a call if it is really a feature
-            if hasattr(self._sdk, f"set_{feature}"):
-                self.set_feature(feature, self.configuration[feature])
+        self._state.apply(self._configuration, force=force)
 
     def auto_exposure(self, max_tries=10):
         """
@@ -70,25 +110,155 @@ class WfsCamera(object):
             self.configure()
         for c in range(max_tries):
             self._sdk.take_spot_field_image_auto_expos()
-            status = self._sdk.get_status()
             # check if parameters are right
-            if (not status["PTH"]) and (not status["PTL"]) and (not status["HAL"]):
-                log.spam(f"adjusting exposure took {c + 1} runs")
+            if not self._sdk.get_status() & EXPOSURE_FAULTS:
+                log.spam("adjusting exposure took %d runs", c + 1)
                 return
         raise WfsError("auto adjusting parameters not successful")
 
-    def acquire_wavefront(self, limit_to_pupil=True):
+    def lock_exposure(self, max_tries=10, intensity_tolerance=None, check_interval=1):
+        """
+        This function converges exposure and gain once and uses fixed exposure images for the following acquisitions.
+        Auto exposure is only repeated if PTH, PTL or HAL are raised or the intensity drifts, see ExposureController.
+        """
+        # check if the device has been already initiated
+        if self.configuration is None:
+            self.configure()
+        self._exposure = ExposureController(self._sdk, max_tries, intensity_tolerance, check_interval)
+        # in a hardware trigger mode the images of the convergence must not wait for triggers
+        with self._sdk.untriggered():
+            self._exposure.converge()
+        return self._exposure
+
+    def unlock_exposure(self):
+        """
+        This function returns to auto exposure for every acquisition
+        """
+        self._exposure = None
+
+    @property
+    def exposure_controller(self):
+        """
+        This function returns the ExposureController if the exposure is locked
+        """
+        return self._exposure
+
+    def set_statistics(self, window=1024, alpha=0.1, mask=None):
+        """
+        This function updates a WfsStatistics with every acquired wavefront and returns it, window 0 disables it.
+        """
+        self._statistics = WfsStatistics(window, alpha, mask) if window else None
+        return self._statistics
+
+    @property
+    def statistics(self):
+        """
+        This function returns the WfsStatistics of the acquired wavefronts or None, see set_statistics
+        """
+        return self._statistics
+
+    def _stage(self):
+        """
+        This function returns the stage factory of the WfsTimings of the sdk, untimed without timings
+        """
+        timings = self._sdk.timings
+        return untimed if timings is None else timings.stage
+
+    def acquire_wavefront(self, limit_to_pupil=True, out=None):
         """
-        This function gets one wavefront from the sensor
+        This function gets one wavefront from the sensor, optionally written into out (see WfsSDK.calc_wavefront)
+        With WfsTimings enabled on the sdk the call is measured as stage acquire_wavefront and split into the stages
+        take_image, calc_spot (including the highspeed check), calc_deviations and calc_wavefront.
         """
+        stage = self._stage()
+        with stage("acquire_wavefront"):
+            return self._acquire_wavefront(limit_to_pupil, out, stage)
+
+    def _acquire_wavefront(self, limit_to_pupil, out, stage=untimed):
         # check if the device has been already initiated
         if self.configuration is None:
             self.configure()
         # necessaray steps to get one wavefront
-        self._sdk.take_spot_field_image_auto_expos()
-        self._sdk.calc_spot()
-        self._sdk.calc_deviations()
-        return sdk.calc_wavefront(limit_to_pupil=limit_to_pupil)
+        with stage("take_image"):
+            if self._exposure is None:
+                self._sdk.take_spot_field_image_auto_expos()
+            else:
+                self._exposure.take_image()
+        return self._process_frame(limit_to_pupil, out, None, stage)
+
+    def arm(self):
+        """
+        This function arms the camera in a hardware trigger mode, the image is taken on the next trigger.
+        Wait for it with WfsSDK.wait_for_trigger() and calculate the wavefront with process_frame().
+        A locked exposure that has been unlocked by a bad frame converges again beforehand, with the trigger switched off.
+        """
+        # check if the device has been already initiated
+        if self.configuration is None:
+            self.configure()
+        if self._exposure is not None and not self._exposure.locked:
+            with self._sdk.untriggered():
+                self._exposure.converge()
+        self._sdk.take_spot_field_image()
+
+    def process_frame(self, status, limit_to_pupil=True, out=None):
+        """
+        This function calculates the wavefront of an image taken outside of acquire_wavefront(), e.g. after arm() on a hardware trigger,
+        with the same per frame steps: the highspeed check, the status history and the statistics.
+        status is the WfsStatus of the image, with locked exposure a frame raising PTH, PTL or HAL (or a drifting intensity) makes the
+        exposure converge before the next arm(), see ExposureController.check().
+        """
+        if self._exposure is not None:
+            self._exposure.check(status)
+        return self._process_frame(limit_to_pupil, out, status, self._stage())
+
+    def _process_frame(self, limit_to_pupil, out, status, stage):
+        with stage("calc_spot"):
+            self._sdk.calc_spot()
+            self._sdk.poll_highspeed(auto_exposure=self._exposure is None)
+        with stage("calc_deviations"):
+            self._sdk.calc_deviations()
+        with stage("calc_wavefront"):
+            wavefront = self._sdk.calc_wavefront(limit_to_pupil=limit_to_pupil, out=out)
+        if self._sdk.status_history is not None:
+            self._sdk.status_history.append(self._sdk.get_status() if status is None else status)
+        if self._statistics is not None:
+            self._statistics.update(wavefront)
+        return wavefront
+
+    def acquire_burst(self, n, out=None, limit_to_pupil=True):
+        """
+        This function acquires n wavefronts in a tight loop and returns them as WfsBurst, the wavefronts are written into out
+        (shape (n, spots X, spots Y), float32) if given. With locked exposure (see lock_exposure) the frames use fixed exposure
+        and the exposure converges again after a frame raising PTH, PTL or HAL, the status of that frame keeps the fault.
+        With WfsTimings enabled on the sdk the call is measured as stage acquire_burst, the dll calls of the frames are measured individually.
+        """
+        with self._stage()("acquire_burst"):
+            return self._acquire_burst(n, out, limit_to_pupil)
+
+    def _acquire_burst(self, n, out, limit_to_pupil):
+        # check if the device has been already initiated
+        if self.configuration is None:
+            self.configure()
+        shape = (n, self._sdk.spots[0].value, self._sdk.spots[1].value)
+        if out is None:
+            out = np.empty(shape, dtype=np.float32)
+        elif out.shape != shape or out.dtype != np.float32:
+            raise WfsError(f"out has to be a float32 array of shape {shape}")
+        burst = WfsBurst(out, np.empty(n), np.empty(n), np.empty(n, dtype=np.uint32), np.empty(n))
+        if self._exposure is None:
+            self._sdk.acquire_burst(*burst, limit_to_pupil=limit_to_pupil)
+        else:
+            if not self._exposure.locked:
+                self._exposure.converge()
+            self._sdk.acquire_burst(*burst, auto_exposure=False, limit_to_pupil=limit_to_pupil, fault_mask=EXPOSURE_FAULTS, on_fault=self._exposure.converge)
+            self._exposure.images += n
+        if self._sdk.status_history is not None:
+            for word, timestamp in zip(burst.status, burst.timestamps):
+                self._sdk.status_history.append(word, timestamp)
+        if self._statistics is not None:
+            for wavefront, timestamp in zip(burst.wavefronts, burst.timestamps):
+                self._statistics.update(wavefront, timestamp)
+        return burst
 
     def acquire_wavefront_full(self):
         """
@@ -96,6 +266,57 @@ class WfsCamera(object):
         """
         return self.acquire_wavefront(limit_to_pupil=False)
 
+    def stream(self, queue_size=4, policy="block", limit_to_pupil=True):
+        """
+        This function returns a WfsStream acquiring wavefronts on a background thread, use it as context manager:
+            with camera.stream(policy="drop_oldest") as stream:
+                for frame in stream:
+                    process(frame.wavefront)
+        """
+        return WfsStream(self, queue_size=queue_size, policy=policy, limit_to_pupil=limit_to_pupil)
+
+    def pipeline(self, slots=8, workers=None, spot_data=False, limit_to_pupil=True):
+        """
+        This function returns a WfsPipeline analysing the wavefronts of this camera in worker processes:
+            with camera.pipeline(workers=4) as pipeline:
+                pipeline.register(analysis)
+                for result in pipeline.run(1000):
+                    print(result.results["analysis"])
+        """
+        return WfsPipeline(self, slots=slots, workers=workers, spot_data=spot_data, limit_to_pupil=limit_to_pupil)
+
+    def serve(self, host="127.0.0.1", port=0, queue_size=4, policy="drop_oldest", limit_to_pupil=True):
+        """
+        This function returns a WfsServer publishing the wavefronts of this camera over TCP, receive them with WfsClient:
+            with camera.serve(host="0.0.0.0", port=5150) as server:
+                input("serving, press enter to stop")
+        """
+        return WfsServer(self, host=host, port=port, queue_size=queue_size, policy=policy, limit_to_pupil=limit_to_pupil)
+
+    def triggered(self, trigger_mode="low_high", timeout=1.0, poll_interval=1e-3, history=1024):
+        """
+        This function switches to a hardware trigger mode and returns a TriggeredAcquisition, use it as context manager:
+            with camera.triggered(timeout=0.5) as triggered:
+                frame = triggered.acquire()
+            print(triggered.summary())
+        """
+        return TriggeredAcquisition(self, trigger_mode=trigger_mode, timeout=timeout, poll_interval=poll_interval, history=history)
+
+    def changes(self, threshold=0.01, metric="rms", heartbeat=10.0, order=2, limit_to_pupil=True):
+        """
+        This function returns a WfsChangeDetector acquiring wavefronts of this camera and emitting only the frames that moved
+        by at least threshold um (see WfsChangeDetector.METRICS), the zernike metric compares the coefficients up to order:
+            detector = camera.changes(threshold=0.02, heartbeat=60)
+            for event in detector.events():
+                publish(event.wavefront)
+        """
+        fit = None
+        if metric == "zernike":
+            if self.configuration is None:
+                self.configure()
+            fit = ZernikeFit.from_sdk(self._sdk, order)
+        return WfsChangeDetector(self, threshold=threshold, metric=metric, heartbeat=heartbeat, fit=fit, limit_to_pupil=limit_to_pupil)
+
 
 if __name__ == "__main__":
     import ctypes as ct
@@ -0,0 +1,215 @@
+"""
+Zernike
+=======
+
+Host side Zernike decomposition of wavefronts and spot slopes on the lenslet grid of the sensor.
+Polynomials are numbered and normalized according to Noll, arrays are in X, Y order like the result of WfsSDK.calc_wavefront.
+The driver (WfsSDK.zernike_lsf) numbers the polynomials differently, e.g. its Z4 is the 45 degree astigmatism and Z5 the defocus,
+use driver_to_noll or driver_coefficients_to_noll to compare on-device and host fits.
+"""
+
+from math import factorial
+from functools import lru_cache
+import numpy as np
+
+try:
+    from .sdk import WfsError
+except:
+    from sdk import WfsError
+
+
+def noll_to_nm(j):
+    """
+    This function converts a Noll index j (starting at 1) to the radial and azimuthal order (n, m)
+    """
+    n = int(np.sqrt(2 * j - 1) + 0.5) - 1
+    if n % 2:
+        m = 2 * int((2 * (j + 1) - n * (n + 1)) // 4) - 1
+    else:
+        m = 2 * int((2 * j + 1 - n * (n + 1)) // 4)
+    return n, m * (-1) ** (j % 2)
+
+
+def nm_to_noll(n, m):
+    """
+    This function converts the radial and azimuthal order (n, m) to the Noll index j
+    """
+    j = n * (n + 1) // 2 + abs(m)
+    # Noll numbers the cosine terms (m > 0) even and the sine terms (m < 0) odd
+    if (m >= 0 and n % 4 in (2, 3)) or (m <= 0 and n % 4 in (0, 1)):
+        j += 1
+    return j
+
+
+def driver_to_nm(j):
+    """
+    This function converts a driver index j (starting at 1) to the radial and azimuthal order (n, m).
+    The driver orders the polynomials by radial order and within one by the azimuthal order from -n to n.
+    """
+    n = int((np.sqrt(8 * (j - 1) + 1) - 1) / 2)
+    return n, 2 * (j - 1) - n * (n + 2)
+
+
+def driver_to_noll(j):
+    """
+    This function converts a driver index j (starting at 1) to the Noll index of the same polynomial
+    """
+    return nm_to_noll(*driver_to_nm(j))
+
+
+def driver_coefficients_to_noll(coefficients):
+    """
+    This function reorders coefficients (..., modes) of WfsSDK.zernike_lsf (starting with Z1) into Noll order like ZernikeFit.fit.
+    modes has to cover complete radial orders, which is always the case for the driver.
+    """
+    coefficients = np.asarray(coefficients)
+    noll = np.empty_like(coefficients)
+    for j in range(1, coefficients.shape[-1] + 1):
+        noll[..., driver_to_noll(j) - 1] = coefficients[..., j - 1]
+    return noll
+
+
+def mode_count(order):
+    """
+    This function returns the number of Zernike polynomials up to the radial order
+    """
+    return (order + 1) * (order + 2) // 2
+
+
+def zernike(j, rho, theta):
+    """
+    This function evaluates the Noll normalized Zernike polynomial j on polar coordinates
+    """
+    n, m = noll_to_nm(j)
+    radial = np.zeros_like(rho)
+    for k in range((n - abs(m)) // 2 + 1):
+        coefficient = (-1) ** k * factorial(n - k) / (factorial(k) * factorial((n + abs(m)) // 2 - k) * factorial((n - abs(m)) // 2 - k))
+        radial += coefficient * rho ** (n - 2 * k)
+    if m == 0:
+        return np.sqrt(n + 1) * radial
+    if m > 0:
+        return np.sqrt(2 * (n + 1)) * radial * np.cos(m * theta)
+    return np.sqrt(2 * (n + 1)) * radial * np.sin(-m * theta)
+
+
+def zernike_cartesian(j, u, v):
+    """
+    This function evaluates the Zernike polynomial j on cartesian coordinates normalized to the pupil radius
+    """
+    return zernike(j, np.hypot(u, v), np.arctan2(v, u))
+
+
+def lenslet_coordinates(spots, lenslet_pitch, center, diameter):
+    """
+    This function returns the lenslet positions normalized to the pupil radius, both of shape (spots X, spots Y).
+    The lenslet pitch is given in um, pupil center and diameter in mm. The grid is assumed to be centered on the sensor.
+    """
+    x = (np.arange(spots[0]) - (spots[0] - 1) / 2) * lenslet_pitch / 1000
+    y = (np.arange(spots[1]) - (spots[1] - 1) / 2) * lenslet_pitch / 1000
+    u = (x[:, None] - center[0]) / (diameter[0] / 2)
+    v = (y[None, :] - center[1]) / (diameter[1] / 2)
+    return np.broadcast_arrays(u, v)
+
+
+@lru_cache(maxsize=32)
+def _fit_matrices(spots, lenslet_pitch, center, diameter, order, slopes):
+    """
+    This function returns the pupil mask, the basis (modes, points) and its pseudo-inverse (modes, points) for one geometry.
+    For slopes the points are the X slopes followed by the Y slopes in um/mm.
+    """
+    u, v = lenslet_coordinates(spots, lenslet_pitch, center, diameter)
+    mask = np.hypot(u, v) <= 1
+    u, v = u[mask], v[mask]
+    modes = range(1, mode_count(order) + 1)
+    if slopes:
+        # central differences in normalized coordinates, scaled to mm
+        h = 1e-6
+        basis_x = [(zernike_cartesian(j, u + h, v) - zernike_cartesian(j, u - h, v)) / (2 * h) / (diameter[0] / 2) for j in modes]
+        basis_y = [(zernike_cartesian(j, u, v + h) - zernike_cartesian(j, u, v - h)) / (2 * h) / (diameter[1] / 2) for j in modes]
+        basis = np.concatenate([np.array(basis_x), np.array(basis_y)], axis=1)
+    else:
+        basis = np.array([zernike_cartesian(j, u, v) for j in modes])
+    pseudo_inverse = np.linalg.pinv(basis.T)
+    for array in (mask, basis, pseudo_inverse):
+        array.setflags(write=False)
+    return mask, basis, pseudo_inverse
+
+
+class ZernikeFit(object):
+    """
+    This class fits Zernike polynomials up to a radial order to wavefronts or slopes sampled on the lenslet grid.
+    The least squares pseudo-inverse is cached per geometry and order, a whole stack of frames is fitted with one matrix multiply.
+    Coefficients are in um if the wavefront is given in um (slopes in um/mm), the piston can not be determined from slopes and is 0.
+    """
+
+    def __init__(self, spots, lenslet_pitch, center=[0, 0], diameter=[3, 3], order=4):
+        """
+        spots is the number of lenslets in X and Y, lenslet_pitch in um, center and diameter of the pupil in mm
+        """
+        self.spots = (int(spots[0]), int(spots[1]))
+        self.lenslet_pitch = float(lenslet_pitch)
+        self.center = (float(center[0]), float(center[1]))
+        self.diameter = (float(diameter[0]), float(diameter[1]))
+        self.order = int(order)
+
+    @classmethod
+    def from_sdk(cls, sdk, order=4):
+        """
+        This function creates a fit for the spot grid, MLA and pupil configured in a WfsSDK
+        """
+        if not (hasattr(sdk, "spots") and hasattr(sdk, "pupil_center")):
+            raise WfsError("resolution and pupil have to be configured first")
+        lenslet_pitch = sdk.get_mla_info()[sdk.mla_index.value][2]
+        center = [c.value for c in sdk.pupil_center]
+        diameter = [d.value for d in sdk.pupil_diameter]
+        return cls([sdk.spots[0].value, sdk.spots[1].value], lenslet_pitch, center, diameter, order)
+
+    def _matrices(self, slopes=False):
+        return _fit_matrices(self.spots, self.lenslet_pitch, self.center, self.diameter, self.order, slopes)
+
+    @property
+    def modes(self):
+        """
+        This function returns the Noll indices of the fitted polynomials
+        """
+        return list(range(1, mode_count(self.order) + 1))
+
+    @property
+    def mask(self):
+        """
+        This function returns the lenslets within the pupil as boolean array (spots X, spots Y)
+        """
+        return self._matrices()[0]
+
+    @property
+    def basis(self):
+        """
+        This function returns the polynomials as array (modes, spots X, spots Y), NaN outside of the pupil
+        """
+        return self.evaluate(np.eye(len(self.modes)))
+
+    def fit(self, wavefronts):
+        """
+        This function fits a wavefront (spots X, spots Y) or a stack of wavefronts (..., spots X, spots Y).
+        It returns the coefficients (..., modes), lenslets inside the pupil must not be NaN.
+        """
+        mask, basis, pseudo_inverse = self._matrices()
+        return np.asarray(wavefronts)[..., mask] @ pseudo_inverse.T
+
+    def fit_slopes(self, slopes_x, slopes_y):
+        """
+        This function fits wavefront slopes in um/mm (i.e. mrad) of shape (..., spots X, spots Y) and returns the coefficients (..., modes)
+        """
+        mask, basis, pseudo_inverse = self._matrices(slopes=True)
+        slopes = np.concatenate([np.asarray(slopes_x)[..., mask], np.asarray(slopes_y)[..., mask]], axis=-1)
+        return slopes @ pseudo_inverse.T
+
+    def evaluate(self, coefficients):
+        """
+        This function returns the wavefront(s) (..., spots X, spots Y) for coefficients (..., modes), NaN outside of the pupil
+        """
+        mask, basis, pseudo_inverse = self._matrices()
+        coefficients = np.asarray(coefficients)
+        wavefronts = np.full(coefficients.shape[:-1] + mask.shape, np.nan)
+        wavefronts[..., mask] = coefficients @ basis
+        return wavefronts
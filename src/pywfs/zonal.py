@@ -0,0 +1,110 @@
+"""
+Zonal
+=====
+
+Host side zonal wavefront reconstruction from spot deviations (Southwell geometry, i.e. wavefront and slopes are both sampled at the lenslet centers).
+The sparse least squares system is factorized once per pupil mask, reconstructing a frame is a back substitution.
+Requires scipy.
+"""
+
+from functools import lru_cache
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import splu
+
+try:
+    from .helper import log
+    from .sdk import WfsError
+    from .zernike import lenslet_coordinates
+except:
+    from helper import log
+    from sdk import WfsError
+    from zernike import lenslet_coordinates
+
+
+# regularization of the normal equations, only lifts the piston which is removed afterwards
+REGULARIZATION = 1e-8
+
+
+@lru_cache(maxsize=8)
+def _factorize(shape, mask_bytes):
+    """
+    This function builds the Southwell system for a pupil mask and returns the LU factorization of its normal equations
+    and the sparse matrix mapping the masked X and Y slopes (in units of a lenslet pitch) to the right hand side.
+    """
+    mask = np.frombuffer(mask_bytes, dtype=bool).reshape(shape)
+    points = int(mask.sum())
+    index = np.full(shape, -1)
+    index[mask] = np.arange(points)
+    rows = []
+    for axis in (0, 1):
+        # neighbours along X (axis 0) and Y (axis 1) that are both inside the pupil
+        first = [slice(None), slice(None)]
+        second = [slice(None), slice(None)]
+        first[axis] = slice(None, -1)
+        second[axis] = slice(1, None)
+        both = mask[tuple(first)] & mask[tuple(second)]
+        rows.append((axis, index[tuple(first)][both], index[tuple(second)][both]))
+    differences = []
+    averages = []
+    for axis, i0, i1 in rows:
+        n = len(i0)
+        r = np.arange(n)
+        differences.append(sparse.csr_matrix((np.r_[-np.ones(n), np.ones(n)], (np.r_[r, r], np.r_[i0, i1])), shape=(n, points)))
+        # the slope between two lenslets is the mean of their slopes, Y slopes are stored after the X slopes
+        offset = axis * points
+        averages.append(sparse.csr_matrix((np.full(2 * n, 0.5), (np.r_[r, r], np.r_[i0, i1] + offset)), shape=(n, 2 * points)))
+    difference = sparse.vstack(differences).tocsr()
+    average = sparse.vstack(averages).tocsr()
+    normal = (difference.T @ difference + REGULARIZATION * sparse.identity(points)).tocsc()
+    log.spam("factorizing zonal reconstructor with %s points and %s slopes", points, difference.shape[0])
+    return splu(normal), (difference.T @ average).tocsr()
+
+
+class ZonalReconstructor(object):
+    """
+    This class reconstructs wavefronts in um from spot deviations in pixels on a fixed pupil mask.
+    Arrays are in X, Y order like the results of WfsSDK.get_spot_deviations and WfsSDK.calc_wavefront.
+    """
+
+    def __init__(self, mask, lenslet_pitch, lenslet_f, cam_pitch):
+        """
+        mask is a boolean array (spots X, spots Y) of the lenslets to use, lenslet_pitch, lenslet_f and cam_pitch are in um as returned by WfsSDK.get_mla_info
+        """
+        self.mask = np.ascontiguousarray(mask, dtype=bool)
+        if self.mask.ndim != 2 or not self.mask.any():
+            raise WfsError("mask has to be a 2d array with at least one lenslet")
+        self.lenslet_pitch = float(lenslet_pitch)
+        # deviation in pixels -> slope in rad -> wavefront difference in um between neighbouring lenslets
+        self.scale = cam_pitch / lenslet_f * lenslet_pitch
+        self._lu, self._rhs = _factorize(self.mask.shape, self.mask.tobytes())
+
+    @classmethod
+    def from_sdk(cls, sdk, mask=None):
+        """
+        This function creates a reconstructor for the MLA and spot grid of a WfsSDK, by default using the lenslets within the configured pupil
+        """
+        mla = sdk.get_mla_info()[sdk.mla_index.value]
+        cam_pitch, lenslet_pitch, lenslet_f = mla[1], mla[2], mla[5]
+        if mask is None:
+            if not hasattr(sdk, "pupil_center"):
+                raise WfsError("pupil has to be configured first")
+            spots = [sdk.spots[0].value, sdk.spots[1].value]
+            u, v = lenslet_coordinates(spots, lenslet_pitch, [c.value for c in sdk.pupil_center], [d.value for d in sdk.pupil_diameter])
+            mask = np.hypot(u, v) <= 1
+        return cls(mask, lenslet_pitch, lenslet_f, cam_pitch)
+
+    def reconstruct(self, deviation_x, deviation_y):
+        """
+        This function reconstructs one frame (spots X, spots Y) or a stack of frames (..., spots X, spots Y) of deviations in pixels.
+        The wavefront is returned in um with zero mean and NaN outside of the mask, deviations inside the mask must not be NaN.
+        """
+        deviation_x = np.asarray(deviation_x)
+        deviation_y = np.asarray(deviation_y)
+        frames = deviation_x.shape[:-2]
+        slopes = np.concatenate([deviation_x[..., self.mask].reshape(-1, self.mask.sum()), deviation_y[..., self.mask].reshape(-1, self.mask.sum())], axis=1)
+        wavefront = self._lu.solve(np.ascontiguousarray(self._rhs @ (self.scale * slopes.T)))
+        wavefront -= wavefront.mean(axis=0)
+        result = np.full(frames + self.mask.shape, np.nan)
+        result[..., self.mask] = wavefront.T.reshape(frames + (-1,))
+        return result
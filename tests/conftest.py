@@ -0,0 +1,59 @@
+import os
+import sys
+
+import pytest
+
+# the package is not installed, import it from the source tree
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from pywfs.simulator import SimulatedWfsDll
+from pywfs.sdk import WfsLib
+from pywfs.wfs import WfsCamera
+
+
+CONFIGURATION = {
+    "mla": {"mla_index": 0},
+    "resolution": {"cam_resol_index": 2},
+    "pupil": {"center": [0, 0], "diameter": [3, 3]}
+}
+
+# Noll coefficients in um of the simulated wavefront
+ZERNIKE = {2: 0.05, 3: -0.03, 4: 0.5, 5: 0.1, 7: 0.02}
+
+
+@pytest.fixture
+def dll():
+    return SimulatedWfsDll(zernike=ZERNIKE, seed=1)
+
+
+@pytest.fixture
+def sdk(dll):
+    sdk = WfsLib(dll).open(list_index=0)
+    yield sdk
+    sdk.close()
+
+
+@pytest.fixture
+def configured(sdk):
+    sdk.set_mla(mla_index=0)
+    sdk.set_resolution(cam_resol_index=2)
+    sdk.set_pupil(center=[0, 0], diameter=[3, 3])
+    return sdk
+
+
+@pytest.fixture
+def camera(sdk):
+    camera = WfsCamera(sdk, CONFIGURATION)
+    camera.configure()
+    return camera
+
+
+@pytest.fixture
+def measure():
+    def measure(sdk, limit_to_pupil=True):
+        # one wavefront with the current exposure settings
+        sdk.take_spot_field_image()
+        sdk.calc_spot()
+        sdk.calc_deviations()
+        return sdk.calc_wavefront(limit_to_pupil=limit_to_pupil)
+    return measure
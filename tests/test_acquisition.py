@@ -0,0 +1,146 @@
+import time
+import threading
+
+import numpy as np
+import pytest
+
+from pywfs.sdk import WfsError, WfsLib
+from pywfs.pool import WfsPool
+from pywfs.simulator import SimulatedWfsDll
+from pywfs.wfs import WfsCamera
+from conftest import CONFIGURATION, ZERNIKE
+
+
+def test_pool_acquires_all_sensors():
+    with WfsPool(WfsLib(SimulatedWfsDll(sensors=2, zernike=ZERNIKE, seed=1)), configuration=CONFIGURATION) as pool:
+        bundle = pool.acquire()
+        assert bundle.index == 0
+        assert len(bundle.wavefronts) == 2
+        np.testing.assert_allclose(bundle.wavefronts[0], bundle.wavefronts[1])
+
+
+def test_pool_waits_for_a_common_hardware_trigger():
+    dll = SimulatedWfsDll(sensors=2, zernike=ZERNIKE, seed=1)
+    with WfsPool(WfsLib(dll), configuration=CONFIGURATION, trigger_mode="low_high") as pool:
+        result = {}
+        thread = threading.Thread(target=lambda: result.update(bundle=pool.acquire()))
+        thread.start()
+        deadline = time.monotonic() + 5
+        while not all(sensor.armed for sensor in dll.sensors):
+            assert time.monotonic() < deadline
+            time.sleep(1e-3)
+        assert "bundle" not in result
+        dll.trigger()
+        thread.join(5)
+        assert [wavefront.shape for wavefront in result["bundle"].wavefronts] == [(40, 40), (40, 40)]
+
+
+def test_pool_processes_triggered_frames_like_acquired_ones():
+    dll = SimulatedWfsDll(sensors=2, zernike=ZERNIKE, seed=1, trigger_delay=1e-3)
+    with WfsPool(WfsLib(dll), configuration=CONFIGURATION, trigger_mode="low_high") as pool:
+        statistics = [camera.set_statistics(window=4) for camera in pool.cameras]
+        pool.map(WfsCamera.lock_exposure)
+        dll.sensors[1].faults = {"HAL": 1.0}
+        pool.acquire()
+        assert [s.count for s in statistics] == [1, 1]
+        assert [camera.exposure_controller.locked for camera in pool.cameras] == [True, False]
+
+
+def test_pool_trigger_timeout():
+    dll = SimulatedWfsDll(sensors=2, seed=1)
+    with WfsPool(WfsLib(dll), configuration=CONFIGURATION, trigger_mode="high_low", timeout=0.02) as pool:
+        with pytest.raises(WfsError):
+            pool.acquire()
+
+
+def test_triggered_acquisition(sdk, dll, camera, measure):
+    dll.sensors[0].trigger_delay = 2e-3
+    expected = measure(sdk).copy()
+    with camera.triggered(timeout=1.0) as triggered:
+        frames = list(triggered.frames(5))
+        assert sdk.get_trigger_mode() == 2
+    assert sdk.get_trigger_mode() == 0
+    assert [frame.index for frame in frames] == list(range(5))
+    assert all(frame.armed <= frame.triggered <= frame.processed for frame in frames)
+    assert triggered.summary()["trigger_wait"]["p50"] >= 2e-3
+    np.testing.assert_allclose(frames[-1].wavefront, expected)
+
+
+def test_triggered_frames_are_processed_like_acquired_ones(sdk, dll, camera):
+    dll.sensors[0].trigger_delay = 1e-3
+    statistics = camera.set_statistics(window=8)
+    history = sdk.set_status_history(8)
+    with camera.triggered() as triggered:
+        triggered.acquire()
+    assert statistics.count == 1 and len(history) == 1
+
+
+def test_triggered_frames_converge_the_exposure_again(sdk, dll, camera):
+    sensor = dll.sensors[0]
+    sensor.trigger_delay = 1e-3
+    controller = camera.lock_exposure()
+    with camera.triggered() as triggered:
+        sensor.faults = {"PTL": 1.0}
+        frame = triggered.acquire()
+        assert frame.status["PTL"] and not controller.locked
+        sensor.faults = {}
+        # the exposure converges before arming, the trigger mode is restored afterwards
+        triggered.acquire()
+        assert controller.locked and controller.convergences == 2
+        assert sdk.get_trigger_mode() == 2
+
+
+def test_triggered_frames_rearm_the_highspeed_mode(sdk, dll, camera):
+    sensor = dll.sensors[0]
+    sensor.trigger_delay = 1e-3
+    sensor.faults = {"MIS": 1.0}
+    camera.configure(dict(CONFIGURATION, highspeed_mode={"check_interval": 1}))
+    camera.lock_exposure()
+    with camera.triggered() as triggered:
+        triggered.acquire()
+        assert sdk.highspeed_rearms == 1
+        assert sdk.get_trigger_mode() == 2
+
+
+def test_triggered_acquisition_timeout(camera):
+    with camera.triggered(timeout=0.02) as triggered:
+        with pytest.raises(WfsError):
+            triggered.acquire()
+
+
+def test_burst_matches_single_acquisitions(camera):
+    single = camera.acquire_wavefront().copy()
+    burst = camera.acquire_burst(4)
+    assert burst.wavefronts.shape == (4,) + single.shape
+    np.testing.assert_allclose(burst.wavefronts[-1], single)
+    assert np.all(np.diff(burst.timestamps) >= 0)
+
+
+class RecordingDll(SimulatedWfsDll):
+    """
+    This class records the arguments of the spot and deviation calculations
+    """
+
+    def _WFS_CalcSpotsCentrDiaIntens(self, handle, dynamic_noise_cut, calculate_diameters):
+        self.spot_args = (dynamic_noise_cut.value, calculate_diameters.value)
+        return super()._WFS_CalcSpotsCentrDiaIntens(handle, dynamic_noise_cut, calculate_diameters)
+
+    def _WFS_CalcSpotToReferenceDeviations(self, handle, cancel_wavefront_tilt):
+        self.deviation_args = (cancel_wavefront_tilt.value,)
+        return super()._WFS_CalcSpotToReferenceDeviations(handle, cancel_wavefront_tilt)
+
+
+def test_burst_uses_the_sdk_settings():
+    dll = RecordingDll(seed=1)
+    camera = WfsCamera(WfsLib(dll).open(), CONFIGURATION)
+    camera.configure()
+    sdk = camera.sdk
+    sdk.take_spot_field_image()
+    sdk.calc_spot(dynamic_noise_cut=False, calculate_diameters=True)
+    sdk.calc_deviations(cancel_spot_wavefront_tilt=False)
+    dll.sensors[0].exposure = 2.5
+    burst = camera.acquire_burst(2)
+    assert dll.spot_args == (0, 1) and dll.deviation_args == (0,)
+    # the auto exposure of the last frame is kept like after take_spot_field_image_auto_expos
+    assert sdk.exposure_time_act.value == burst.exposure_times[-1] == 2.5
+    assert sdk.master_gain_act.value == burst.master_gains[-1]
@@ -0,0 +1,93 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from pywfs.sdk import WfsLib
+from pywfs.simulator import SimulatedWfsDll
+from pywfs.wfs import WfsCamera
+from pywfs.aio import AsyncWfsCamera
+from conftest import CONFIGURATION
+
+
+@pytest.fixture
+def dll():
+    # a slow image acquisition, the calls release the GIL like the dll
+    return SimulatedWfsDll(latency={"WFS_TakeSpotfieldImage": 0.05, "WFS_TakeSpotfieldImageAutoExpos": 0.05}, seed=1)
+
+
+@pytest.fixture
+def camera(dll):
+    camera = WfsCamera(WfsLib(dll).open(), CONFIGURATION)
+    camera.configure()
+    return AsyncWfsCamera(camera)
+
+
+def test_timeout(camera):
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await camera.acquire_wavefront(timeout=0.01)
+        # the timed out call finishes in the background before the next one runs
+        wavefront = await camera.acquire_wavefront(timeout=1.0)
+        await camera.close()
+        return wavefront
+    assert asyncio.run(main()).shape == (40, 40)
+
+
+def test_calls_are_serialized(camera):
+    calls = []
+
+    def call(index):
+        start = time.perf_counter()
+        time.sleep(0.01)
+        calls.append((start, time.perf_counter(), threading.current_thread().name))
+        return index
+
+    async def main():
+        results = await asyncio.gather(*[camera.run(call, index) for index in range(4)])
+        await camera.close()
+        return results
+    assert asyncio.run(main()) == [0, 1, 2, 3]
+    calls.sort()
+    assert all(end <= start for (_, end, _), (start, _, _) in zip(calls, calls[1:]))
+    assert len({name for _, _, name in calls}) == 1
+
+
+def test_cancelled_frames_do_not_leak(camera):
+    async def consume():
+        async for frame in camera.frames():
+            pass
+
+    async def main():
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.12)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # the worker is free again and no prefetched frame is acquired later on
+        await camera.run(lambda: None)
+        acquired = camera.frames_acquired
+        await asyncio.sleep(0.1)
+        assert camera.frames_acquired == acquired
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+        await camera.close()
+    asyncio.run(main())
+
+
+def test_frames_with_count(camera):
+    async def main():
+        async with camera:
+            return [frame.index async for frame in camera.frames(count=3)]
+    assert asyncio.run(main()) == [0, 1, 2]
+    assert camera.frames_acquired == 3
+
+
+def test_close(camera, dll):
+    async def main():
+        await camera.acquire_wavefront()
+        await camera.close()
+        assert not dll.sensors[0].in_use
+        with pytest.raises(RuntimeError):
+            await camera.acquire_wavefront()
+    asyncio.run(main())
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from pywfs.sdk import WfsError, SPOT_FIELDS
+from pywfs.centroid import Centroider
+
+
+@pytest.fixture
+def spots(configured):
+    configured.take_spot_field_image()
+    configured.calc_spot()
+    configured.calc_deviations(cancel_spot_wavefront_tilt=False)
+    return configured.get_spot_data(diameters=True).copy()
+
+
+def test_centroids_match_the_driver(configured, spots):
+    image = configured.get_spotfield_image().copy()
+    centroider = Centroider.from_sdk(configured, reference=True)
+    result = centroider.compute(image, diameters=True)
+    assert result.dtype.names == tuple(SPOT_FIELDS)
+    inside = np.isfinite(spots["centroid_x"]) & (spots["intensity"] > 0)
+    assert np.median(np.abs(result["centroid_x"] - spots["centroid_x"])[inside]) < 0.05
+    assert np.median(np.abs(result["centroid_y"] - spots["centroid_y"])[inside]) < 0.05
+    assert np.median(np.abs(result["deviation_x"] - spots["deviation_x"])[inside]) < 0.05
+
+
+def test_stack_and_out(configured, spots):
+    image = configured.get_spotfield_image().copy()
+    centroider = Centroider.from_sdk(configured)
+    single = centroider.compute(image, cancel_tilt=True)
+    out = np.empty((2,) + single.shape, dtype=single.dtype)
+    stack = centroider.compute(np.stack([image, image]), cancel_tilt=True, out=out)
+    assert stack is out
+    np.testing.assert_array_equal(stack["centroid_x"][1], single["centroid_x"])
+    assert abs(np.nanmean(single["deviation_x"])) < 1e-4
+
+
+def test_invalid_arguments(configured, spots):
+    image = configured.get_spotfield_image().copy()
+    centroider = Centroider.from_sdk(configured)
+    with pytest.raises(WfsError):
+        centroider.compute(image[:-1])
+    with pytest.raises(WfsError):
+        centroider.compute(image, out=np.empty(centroider.spots))
@@ -0,0 +1,32 @@
+import numpy as np
+
+from pywfs.change import WfsChangeDetector
+
+
+def test_change_detector_emits_changes_and_heartbeats():
+    detector = WfsChangeDetector(threshold=0.05, heartbeat=10.0)
+    wavefront = np.random.default_rng(1).normal(0.5, 0.1, size=(6, 5)).astype(np.float32)
+    wavefront[0] = np.nan
+    assert detector.check(wavefront, timestamp=0).reason == "first"
+    assert detector.check(wavefront + 0.01, timestamp=1) is None
+    tilted = wavefront + np.linspace(0, 1, 6)[:, None]
+    event = detector.check(tilted, timestamp=2)
+    assert event.reason == "change" and event.suppressed == 1
+    assert detector.check(tilted, timestamp=12).reason == "heartbeat"
+    assert detector.counters == {"checked": 4, "emitted": 3, "suppressed": 1, "changes": 1, "heartbeats": 1}
+
+
+def test_change_detector_resets_on_a_new_shape():
+    detector = WfsChangeDetector(heartbeat=None)
+    detector.check(np.zeros((4, 4)))
+    assert detector.check(np.zeros((4, 4))) is None
+    assert detector.check(np.zeros((5, 5))).reason == "first"
+
+
+def test_change_detector_on_the_camera(camera):
+    detector = camera.changes(threshold=0.01, metric="zernike", heartbeat=None)
+    events = list(detector.events(1))
+    assert events[0].reason == "first"
+    for i in range(3):
+        detector.check(camera.acquire_wavefront())
+    assert detector.suppressed == 3
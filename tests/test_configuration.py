@@ -0,0 +1,42 @@
+import pytest
+
+from pywfs.sdk import WfsError
+from pywfs.wfs import WfsCamera
+from conftest import CONFIGURATION
+
+
+def test_unchanged_configuration_is_not_applied(camera):
+    calls = camera.state.calls
+    camera.configure(CONFIGURATION)
+    assert camera.state.calls == calls
+    assert camera.state.plan(CONFIGURATION) == []
+
+
+def test_changed_feature_reapplies_its_dependents(camera):
+    camera.configure(dict(CONFIGURATION, highspeed_mode={"check_interval": 0}))
+    steps = camera.state.plan(dict(CONFIGURATION, pupil={"center": [0, 0], "diameter": [2, 2]}, highspeed_mode={"check_interval": 0}))
+    assert [feature for feature, kwargs in steps] == ["pupil", "highspeed_mode"]
+    steps = camera.state.plan(dict(CONFIGURATION, resolution={"cam_resol_index": 1}))
+    assert [feature for feature, kwargs in steps] == ["resolution", "pupil", "highspeed_mode"]
+
+
+def test_tuples_and_lists_compare_equal(camera):
+    assert camera.state.plan(dict(CONFIGURATION, pupil={"center": (0, 0), "diameter": (3, 3)})) == []
+
+
+def test_exposure_is_always_reapplied(sdk):
+    configuration = dict(CONFIGURATION, exposure_time={"exposure_time": 1.0}, master_gain={"master_gain": 1.5})
+    camera = WfsCamera(sdk, configuration)
+    camera.configure()
+    camera.auto_exposure()
+    assert [feature for feature, kwargs in camera.state.plan(configuration)] == ["exposure_time", "master_gain"]
+    sdk.set_exposure_time(2.0)
+    camera.configure()
+    assert sdk.get_exposure_time() == pytest.approx(1.0)
+
+
+def test_invalid_values_are_rejected_before_any_call(sdk):
+    camera = WfsCamera(sdk, CONFIGURATION)
+    with pytest.raises(WfsError):
+        camera.configure(dict(CONFIGURATION, mla={"mla_index": 5}))
+    assert camera.state.calls == 0
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from pywfs.sdk import WfsError, WfsLib
+from pywfs.simulator import SimulatedWfsDll
+
+
+class CountingDll(SimulatedWfsDll):
+    """
+    This class counts the scans of the instrument list
+    """
+
+    scans = 0
+
+    def _WFS_GetInstrumentListLen(self, handle, count):
+        self.scans += 1
+        return super()._WFS_GetInstrumentListLen(handle, count)
+
+
+@pytest.fixture
+def dll():
+    return CountingDll(sensors=3)
+
+
+def test_enumeration_is_cached(dll):
+    lib = WfsLib(dll, enumeration_ttl=0.05)
+    devices = lib.devices()
+    assert [device.serial for device in devices] == [b"M00000000", b"M00000001", b"M00000002"]
+    assert lib.devices() == devices and dll.scans == 1
+    time.sleep(0.06)
+    lib.devices()
+    assert dll.scans == 2
+
+
+def test_refresh(dll):
+    lib = WfsLib(dll, enumeration_ttl=None)
+    lib.devices()
+    lib.devices()
+    assert dll.scans == 1
+    lib.refresh()
+    lib.devices(refresh=True)
+    assert dll.scans == 3
+
+
+def test_open_by_serial_and_resource(dll):
+    lib = WfsLib(dll)
+    sdk = lib.open(serial="M00000002")
+    assert sdk.serial == "M00000002" and dll.sensors[2].in_use
+    other = lib.open(resource=SimulatedWfsDll.resource_name(1))
+    assert other.serial == "M00000001"
+    # the cache tracks the sessions of the library, no further scan is needed
+    assert [device.in_use for device in lib.devices()] == [0, 1, 1] and dll.scans == 1
+    sdk.close()
+    other.close()
+    assert [device.in_use for device in lib.devices()] == [0, 0, 0]
+    with pytest.raises(WfsError):
+        lib.open(serial="M99999999")
+
+
+def test_in_use_devices_are_scanned_again(dll):
+    lib = WfsLib(dll, enumeration_ttl=None)
+    sdk = WfsLib(dll).open(list_index=0)
+    assert lib.devices()[0].in_use
+    sdk.close()
+    # the cached list is outdated, the device is scanned again before giving up
+    lib.open(list_index=0).close()
+    assert dll.scans == 3
+    WfsLib(dll).open(list_index=1)
+    lib.refresh()
+    with pytest.raises(WfsError):
+        lib.open(list_index=1)
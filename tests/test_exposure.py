@@ -0,0 +1,69 @@
+import pytest
+
+from pywfs.sdk import WfsError
+from pywfs.exposure import ExposureController
+
+
+@pytest.fixture
+def controller(configured):
+    return ExposureController(configured, intensity_tolerance=0.1)
+
+
+def test_fixed_exposure_after_convergence(controller, configured):
+    controller.converge()
+    calls = []
+    take_image = configured.take_spot_field_image_auto_expos
+    configured.take_spot_field_image_auto_expos = lambda: calls.append(1) or take_image()
+    for i in range(5):
+        controller.take_image()
+    assert not calls and controller.convergences == 1
+    assert configured.get_exposure_time() == pytest.approx(controller.exposure_time)
+
+
+@pytest.mark.parametrize("fault", ["PTH", "PTL", "HAL"])
+def test_exposure_faults_converge_again(controller, configured, dll, fault):
+    controller.converge()
+    sensor = dll.sensors[0]
+    sensor.faults = {fault: 1.0}
+    take_image = configured.take_spot_field_image_auto_expos
+
+    def auto_exposure():
+        # auto exposure clears the fault
+        sensor.faults = {}
+        return take_image()
+    configured.take_spot_field_image_auto_expos = auto_exposure
+    controller.take_image()
+    assert controller.convergences == 2 and controller.locked
+    controller.take_image()
+    assert controller.convergences == 2
+
+
+def test_intensity_drift_converges_again(controller, configured):
+    controller.converge()
+    intensities = iter([250, 240, 200, 250])
+    configured.calc_image_min_max = lambda: (0, next(intensities), 0.0)
+    controller.take_image()
+    controller.take_image()
+    assert controller.convergences == 1
+    # 200 is more than 10 % off the reference, the convergence reads the new reference of 250
+    controller.take_image()
+    assert controller.convergences == 2 and controller.reference_intensity == 250
+
+
+def test_check_interval(configured):
+    controller = ExposureController(configured, intensity_tolerance=0.1, check_interval=0)
+    controller.take_image()
+    configured.calc_image_min_max = lambda: (0, 0, 0.0)
+    for i in range(3):
+        controller.take_image()
+    assert controller.convergences == 1
+    with pytest.raises(WfsError):
+        ExposureController(configured, check_interval=-1)
+
+
+def test_convergence_fails(configured, dll):
+    dll.sensors[0].faults = {"HAL": 1.0}
+    controller = ExposureController(configured, max_tries=3)
+    with pytest.raises(WfsError):
+        controller.take_image()
+    assert not controller.locked
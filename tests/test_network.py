@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+import pytest
+
+from pywfs.network import WfsServer, WfsClient
+
+
+def connect(server, timeout=10):
+    # publish() only reaches clients the accept thread has registered already
+    client = WfsClient(*server.address, timeout=timeout)
+    deadline = time.monotonic() + timeout
+    while not server.subscribers:
+        assert time.monotonic() < deadline
+        time.sleep(1e-3)
+    return client
+
+
+def test_publish_round_trip():
+    with WfsServer() as server, connect(server) as client:
+        wavefront = np.arange(12, dtype=np.float32).reshape(4, 3)
+        wavefront[0, 0] = np.nan
+        assert server.publish(wavefront, status=0x20, timestamp=1.5) == 0
+        frame = client.receive()
+        assert frame.sequence == 0 and frame.timestamp == 1.5 and frame.status == 0x20
+        np.testing.assert_array_equal(frame.wavefront, wavefront)
+        out = np.empty((4, 3), dtype=np.float32)
+        server.publish(wavefront + 1)
+        assert client.receive(out=out).wavefront is out
+        np.testing.assert_array_equal(out, wavefront + 1)
+        assert client.received == 2 and client.dropped == 0
+
+
+def flood(server, client, frames=16):
+    # large frames fill the socket buffers while the client does not read, so the queue of the client overflows
+    wavefront = np.zeros((1000, 1000), dtype=np.float32)
+    for i in range(frames):
+        server.publish(wavefront)
+    dropped = server.counters["dropped"][client._socket.getsockname()]
+    assert dropped > 0
+    return [client.receive().sequence for i in range(frames - dropped)], dropped
+
+
+def test_drop_oldest_keeps_the_latest_frames():
+    with WfsServer(queue_size=2, policy="drop_oldest") as server, connect(server) as client:
+        sequences, dropped = flood(server, client)
+        assert sequences == sorted(set(sequences)) and sequences[-1] == 15
+        # sequence gaps are counted as dropped by the client, it does not know of frames before the first one it received
+        assert client.dropped == dropped - sequences[0]
+
+
+def test_drop_newest_keeps_the_first_frames():
+    with WfsServer(queue_size=2, policy="drop_newest") as server, connect(server) as client:
+        sequences, dropped = flood(server, client)
+        assert sequences == sorted(set(sequences)) and sequences[0] == 0
+        # the frames dropped after the last received one show up as gap with the next frame
+        server.publish(np.zeros((1000, 1000), dtype=np.float32))
+        assert client.receive().sequence == 16
+        assert client.dropped == dropped
+
+
+def test_server_streams_the_camera(camera):
+    with camera.serve() as server, connect(server) as client:
+        frames = [client.receive() for i in range(3)]
+        spots = camera.sdk.spots
+        assert frames[0].wavefront.shape == (spots[0].value, spots[1].value)
+        assert np.isfinite(frames[0].wavefront).any()
+        assert all(a.sequence < b.sequence for a, b in zip(frames, frames[1:]))
+    assert server.counters["published"] >= 3
+
+
+def test_server_disconnects_clients_when_the_acquisition_fails(camera, monkeypatch, caplog):
+    def acquire_wavefront(*args, **kwargs):
+        raise RuntimeError("camera lost")
+    monkeypatch.setattr(camera, "acquire_wavefront", acquire_wavefront)
+    # the subscriber is removed right after the failure, do not wait for it
+    with camera.serve() as server, WfsClient(*server.address, timeout=10) as client:
+        with pytest.raises(ConnectionError):
+            client.receive()
+    assert "server acquisition failed" in caplog.text
@@ -0,0 +1,74 @@
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pytest
+
+from pywfs.processing import WfsPipeline
+
+
+# stages have to be defined at module level to reach the worker processes
+def mean(frame):
+    return float(np.nanmean(frame["wavefront"]))
+
+
+def index(frame):
+    return int(frame["index"])
+
+
+def intensity(frame):
+    return float(frame["spots"]["intensity"].sum())
+
+
+def fail(frame):
+    if frame["index"] == 1:
+        raise ValueError("stage failed")
+    return True
+
+
+def test_pipeline_returns_results_in_frame_order():
+    with WfsPipeline(slots=2, workers=2, spots=(4, 3)) as pipeline:
+        pipeline.register(mean)
+        pipeline.register(index, name="frame")
+        for i in range(6):
+            pipeline.submit(np.full((4, 3), i, dtype=np.float32), timestamp=i)
+        results = list(pipeline.results(timeout=10))
+        assert [result.index for result in results] == list(range(6))
+        assert [result.timestamp for result in results] == list(range(6))
+        assert [result.results for result in results] == [{"mean": i, "frame": i} for i in range(6)]
+        assert pipeline.completed == 6 and len(pipeline) == 0
+
+
+def test_pipeline_on_the_camera_with_spot_data(camera):
+    with camera.pipeline(slots=2, workers=2, spot_data=True) as pipeline:
+        pipeline.register(mean)
+        pipeline.register(intensity)
+        results = list(pipeline.run(4))
+        assert [result.index for result in results] == list(range(4))
+        for result in results:
+            assert np.isfinite(result.results["mean"])
+            assert result.results["intensity"] > 0
+
+
+def test_pipeline_raises_stage_errors_and_releases_the_slot():
+    with WfsPipeline(slots=2, workers=1, spots=(4, 3)) as pipeline:
+        pipeline.register(fail)
+        for i in range(3):
+            pipeline.submit(np.zeros((4, 3), dtype=np.float32))
+        results = pipeline.results(timeout=10)
+        assert next(results).index == 0
+        with pytest.raises(ValueError, match="stage failed"):
+            next(results)
+        assert [result.index for result in pipeline.results(timeout=10)] == [2]
+        assert pipeline._free.qsize() == 2
+        # all slots are free again, further frames are accepted
+        pipeline.submit(np.zeros((4, 3), dtype=np.float32))
+        assert len(list(pipeline.results(timeout=10))) == 1
+
+
+def test_pipeline_close_unlinks_the_shared_memory():
+    pipeline = WfsPipeline(slots=2, workers=1, spots=(4, 3)).start()
+    name = pipeline._shm.name
+    pipeline.close()
+    assert not pipeline.running
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=name)
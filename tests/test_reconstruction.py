@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from pywfs.zernike import ZernikeFit, noll_to_nm, nm_to_noll, mode_count, driver_to_nm, driver_to_noll, driver_coefficients_to_noll
+from pywfs.zonal import ZonalReconstructor
+from conftest import ZERNIKE
+
+
+def test_noll_indices():
+    assert [noll_to_nm(j) for j in range(1, 7)] == [(0, 0), (1, 1), (1, -1), (2, 0), (2, -2), (2, 2)]
+    assert mode_count(4) == 15
+
+
+def test_driver_indices():
+    assert [driver_to_nm(j) for j in range(1, 7)] == [(0, 0), (1, -1), (1, 1), (2, -2), (2, 0), (2, 2)]
+    assert [nm_to_noll(*noll_to_nm(j)) for j in range(1, 67)] == list(range(1, 67))
+    assert sorted(driver_to_noll(j) for j in range(1, 67)) == list(range(1, 67))
+    assert driver_to_noll(4) == 5 and driver_to_noll(5) == 4
+
+
+def test_zernike_lsf_matches_the_host_fit(configured, measure):
+    wavefront = measure(configured)
+    coefficients, orders_um, roc_mm = configured.zernike_lsf(zernike_orders=3)
+    # the driver's Z5 is the defocus
+    assert coefficients[4] == pytest.approx(ZERNIKE[4], abs=1e-3)
+    fit = ZernikeFit.from_sdk(configured, order=3)
+    np.testing.assert_allclose(driver_coefficients_to_noll(coefficients)[1:], fit.fit(wavefront)[1:], atol=1e-4)
+
+
+def test_zernike_fit_recovers_the_coefficients(configured, measure):
+    fit = ZernikeFit.from_sdk(configured, order=3)
+    coefficients = fit.fit(measure(configured))
+    expected = np.array([ZERNIKE.get(j, 0.0) for j in fit.modes])
+    np.testing.assert_allclose(coefficients[1:], expected[1:], atol=1e-3)
+
+
+def test_zernike_fit_of_a_stack(configured):
+    fit = ZernikeFit.from_sdk(configured, order=2)
+    coefficients = np.random.default_rng(1).normal(size=(3, len(fit.modes)))
+    np.testing.assert_allclose(fit.fit(fit.evaluate(coefficients)), coefficients, atol=1e-9)
+
+
+def test_zonal_reconstruction_matches_the_wavefront(configured):
+    configured.take_spot_field_image()
+    configured.calc_spot()
+    # the tilt is part of the measured wavefront
+    configured.calc_deviations(cancel_spot_wavefront_tilt=False)
+    wavefront = configured.calc_wavefront()
+    reconstructor = ZonalReconstructor.from_sdk(configured)
+    deviation_x, deviation_y = configured.get_spot_deviations()
+    reconstructed = reconstructor.reconstruct(deviation_x, deviation_y)
+    mask = reconstructor.mask & np.isfinite(wavefront)
+    expected = wavefront[mask] - wavefront[mask].mean()
+    error = reconstructed[mask] - reconstructed[mask].mean() - expected
+    assert np.sqrt(np.mean(error ** 2)) < 0.05 * expected.std()
+
+
+def test_zonal_reconstruction_of_a_stack(configured, measure):
+    measure(configured)
+    reconstructor = ZonalReconstructor.from_sdk(configured)
+    deviations = np.array(configured.get_spot_deviations())
+    single = reconstructor.reconstruct(*deviations)
+    stack = reconstructor.reconstruct(np.stack([deviations[0]] * 2), np.stack([deviations[1]] * 2))
+    np.testing.assert_allclose(stack[1], single)
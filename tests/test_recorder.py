@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from pywfs.sdk import WfsError
+from pywfs.recorder import WfsRecorder, WfsRecording
+
+
+def test_round_trip(camera, tmp_path):
+    filename = str(tmp_path / "run.wfs")
+    sdk = camera.sdk
+    wavefronts = []
+    with WfsRecorder.from_sdk(filename, sdk, slopes=True, chunk_size=4) as recorder:
+        for i in range(10):
+            wavefronts.append(camera.acquire_wavefront().copy())
+            recorder.append(wavefronts[-1], slopes=sdk.get_spot_deviations(), status=sdk.get_status(), timestamp=float(i))
+    recording = WfsRecording(filename)
+    assert len(recording) == 10
+    np.testing.assert_array_equal(recording.wavefront, np.array(wavefronts))
+    np.testing.assert_array_equal(recording.timestamp, np.arange(10))
+    assert recording.slopes.shape == (10, 2) + wavefronts[0].shape
+    assert recording.metadata["spots"] == [40, 40]
+
+
+def test_append_continues_a_recording(tmp_path):
+    filename = str(tmp_path / "run.wfs")
+    wavefront = np.arange(12, dtype=np.float32).reshape(3, 4)
+    for run in range(2):
+        with WfsRecorder(filename, [3, 4], append=True) as recorder:
+            for i in range(3):
+                recorder.append(wavefront + run, timestamp=run)
+    recording = WfsRecording(filename)
+    assert len(recording) == 6
+    np.testing.assert_array_equal(recording.wavefront[3], wavefront + 1)
+
+
+def test_invalid_file(tmp_path):
+    filename = tmp_path / "invalid.wfs"
+    filename.write_bytes(b"\0" * 64)
+    with pytest.raises(WfsError):
+        WfsRecording(str(filename))
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from pywfs.sdk import WfsError
+from pywfs.rolling import WfsStatistics
+
+
+def frames(count=30, seed=1):
+    rng = np.random.default_rng(seed)
+    wavefronts = rng.normal(0.5, 0.1, size=(count, 6, 5)).astype(np.float32)
+    wavefronts[:, 0] = np.nan
+    # a lenslet missing in some frames
+    wavefronts[1::3, 2, 2] = np.nan
+    return wavefronts
+
+
+def test_running_statistics_match_numpy():
+    wavefronts = frames()
+    statistics = WfsStatistics(window=8, alpha=0.5)
+    for wavefront in wavefronts:
+        statistics.update(wavefront)
+    np.testing.assert_allclose(statistics.mean[1:], np.nanmean(wavefronts[:, 1:], axis=0), rtol=1e-5)
+    np.testing.assert_allclose(statistics.variance[1:], np.nanvar(wavefronts[:, 1:], axis=0, ddof=1), rtol=1e-4)
+    assert np.isnan(statistics.mean[0]).all()
+    assert statistics.count == 30 and len(statistics) == 8
+
+
+def test_window_and_ema():
+    wavefronts = frames()
+    statistics = WfsStatistics(window=8, alpha=0.5)
+    for index, wavefront in enumerate(wavefronts):
+        pv, rms = statistics.update(wavefront, timestamp=index)
+    finite = wavefronts[-1][np.isfinite(wavefronts[-1])]
+    assert pv == pytest.approx(np.ptp(finite)) and rms == pytest.approx(finite.std())
+    np.testing.assert_array_equal(statistics.timestamps, np.arange(22, 30))
+    ema = wavefronts[0, 1, 0]
+    for wavefront in wavefronts[1:]:
+        ema += 0.5 * (wavefront[1, 0] - ema)
+    assert statistics.ema[1, 0] == pytest.approx(ema, rel=1e-5)
+    summary = statistics.summary()
+    assert summary["frames"] == 30
+    assert summary["stability"] == pytest.approx(0.1, rel=0.2)
+
+
+def test_statistics_from_the_camera(camera):
+    statistics = camera.set_statistics(window=4)
+    for i in range(3):
+        camera.acquire_wavefront()
+    camera.acquire_burst(3)
+    assert statistics.count == 6
+    assert camera.set_statistics(0) is None
+
+
+def test_statistics_shape_mismatch():
+    statistics = WfsStatistics()
+    statistics.update(np.zeros((3, 3)))
+    with pytest.raises(WfsError):
+        statistics.update(np.zeros((4, 4)))
+
+
+def test_statistics_arguments():
+    with pytest.raises(WfsError):
+        WfsStatistics(window=0)
+    with pytest.raises(WfsError):
+        WfsStatistics(alpha=0)
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from pywfs.sdk import WfsError, WfsLib, WfsStatus, WFS_STATUS
+from pywfs.calibration import CalibrationCache
+from pywfs.wfs import WfsCamera
+from conftest import CONFIGURATION
+
+
+def test_calc_wavefront_reuses_the_ring(configured, measure):
+    configured.set_wavefront_ring(3)
+    wavefronts = [measure(configured) for i in range(4)]
+    buffers = [wavefront.ctypes.data for wavefront in wavefronts]
+    assert buffers[0] == buffers[3]
+    assert len(set(buffers[:3])) == 3
+    assert wavefronts[0].shape == (configured.spots[0].value, configured.spots[1].value)
+    assert wavefronts[0].flags.c_contiguous
+
+
+def test_calc_wavefront_into_out(configured, measure):
+    expected = measure(configured).copy()
+    out = np.empty_like(expected)
+    configured.calc_wavefront(out=out)
+    np.testing.assert_array_equal(out, expected)
+    view = configured.calc_wavefront(contiguous=False)
+    assert not view.flags.owndata
+    np.testing.assert_array_equal(view, expected)
+
+
+def test_rearm_highspeed_before_calc_spot(configured, dll):
+    configured.set_highspeed_mode(check_interval=1)
+    configured.rearm_highspeed_mode(auto_exposure=False)
+    assert configured.highspeed_rearms == 1
+    assert dll.sensors[0].stage == "spots"
+
+
+def test_poll_highspeed_keeps_a_locked_exposure(sdk, dll):
+    dll.sensors[0].faults = {"MIS": 1.0}
+    camera = WfsCamera(sdk, dict(CONFIGURATION, highspeed_mode={"check_interval": 1}))
+    camera.configure()
+    camera.lock_exposure()
+    calls = []
+    take_image = sdk.take_spot_field_image_auto_expos
+    sdk.take_spot_field_image_auto_expos = lambda: calls.append(1) or take_image()
+    for i in range(3):
+        camera.acquire_wavefront()
+    assert sdk.highspeed_rearms == 3
+    assert not calls
+
+
+def test_spotfield_image_validates_out(configured):
+    configured.take_spot_field_image()
+    columns, rows = configured.get_image_size()
+    image = configured.get_spotfield_image(out=np.empty((rows, columns), dtype=np.uint8))
+    assert image.shape == (rows, columns)
+    for out in (np.empty(10, dtype=np.uint8), np.empty((rows, columns), dtype=np.float32), np.empty((columns, rows), dtype=np.uint8).T):
+        with pytest.raises(WfsError):
+            configured.get_spotfield_image(out=out)
+
+
+def test_image_size_requires_a_resolution(sdk):
+    with pytest.raises(WfsError):
+        sdk.get_image_size()
+    with pytest.raises(WfsError):
+        sdk.get_spotfield_image()
+    sdk.set_resolution(cam_resol_index=2)
+    assert sdk.get_image_size() == [1024, 1024]
+
+
+def test_reference_positions_of_a_user_plane_are_not_cached(dll, tmp_path, measure):
+    sdk = WfsLib(dll, calibration=CalibrationCache(str(tmp_path / "calibration.json"))).open(list_index=0)
+    sdk.set_mla(mla_index=0)
+    sdk.set_resolution(cam_resol_index=2)
+    sdk.set_pupil()
+    measure(sdk)
+    reference = sdk.get_spot_reference_positions(cached=True)
+    assert sdk.calibration.get(sdk._calibration_key("reference")) is not None
+    np.testing.assert_array_equal(sdk.get_spot_reference_positions(cached=True), reference)
+    sdk.set_reference_plane(internal=False)
+    assert sdk._calibration_key("reference") is None
+    sdk.close()
+
+
+def test_status_behaves_like_the_former_dict():
+    status = WfsStatus(WfsStatus.PTH | WfsStatus.HAL)
+    assert "PTH" in status and "XYZ" not in status
+    assert WfsStatus.PTH in status and WfsStatus.PTL not in status
+    assert list(status) == list(WFS_STATUS)
+    assert len(status) == len(WFS_STATUS)
+    assert dict(status) == {key: key in ("PTH", "HAL") for key in WFS_STATUS}
+    assert status["HAL"] and not status["PTL"]
+    assert not WfsStatus(0)
@@ -0,0 +1,70 @@
+import time
+
+import numpy as np
+import pytest
+
+from pywfs.sdk import WfsError, WfsLib
+from pywfs.simulator import SimulatedWfsDll, SimulatedSensor
+from pywfs.zernike import zernike
+
+
+def test_enumeration_and_sessions():
+    dll = SimulatedWfsDll(sensors=2)
+    lib = WfsLib(dll)
+    assert lib.device_count() == 2
+    sdk = lib.open(list_index=1)
+    assert sdk.serial == "M00000001"
+    assert dll.sensors[1].in_use and not dll.sensors[0].in_use
+    with pytest.raises(WfsError):
+        WfsLib(dll).open(list_index=1)
+    sdk.close()
+    assert not dll.sensors[1].in_use
+
+
+def test_unconfigured_and_unknown_calls_fail(sdk):
+    with pytest.raises(WfsError):
+        sdk.take_spot_field_image()
+    with pytest.raises(WfsError):
+        WfsLib.result(sdk._dll.WFS_GetLineView(sdk._handle))
+
+
+def test_wavefront_is_the_zernike_model(configured, measure, dll):
+    # the driver returns Y, X ordered arrays, calc_wavefront transposes them
+    wavefront = measure(configured).T
+    sensor = dll.sensors[0]
+    xx, yy, pupil, _ = sensor.grid()
+    rho = np.hypot(xx / (sensor.pupil_diameter[0] / 2), yy / (sensor.pupil_diameter[1] / 2))
+    theta = np.arctan2(yy, xx)
+    expected = sum(coefficient * zernike(j, rho, theta) for j, coefficient in sensor.zernike.items())
+    np.testing.assert_allclose(wavefront[pupil], expected[pupil], atol=1e-5)
+    assert np.isnan(wavefront[~pupil]).all()
+
+
+def test_faults_raise_status_bits():
+    sdk = WfsLib(SimulatedWfsDll(faults={"PTH": 1.0})).open()
+    sdk.set_resolution(cam_resol_index=2)
+    sdk.take_spot_field_image()
+    status = sdk.get_status()
+    assert status["PTH"] and not status["PTL"]
+    sdk.close()
+
+
+def test_latency_per_function():
+    dll = SimulatedWfsDll(latency={"WFS_TakeSpotfieldImage": 0.02})
+    sdk = WfsLib(dll).open()
+    sdk.set_resolution(cam_resol_index=2)
+    start = time.perf_counter()
+    sdk.take_spot_field_image()
+    assert time.perf_counter() - start >= 0.02
+    sdk.close()
+
+
+def test_armed_sensor_fires_after_the_trigger_delay():
+    sensor = SimulatedSensor(trigger_delay=0.01)
+    sensor.configure(2)
+    sensor.arm()
+    sensor.poll_trigger()
+    assert sensor.armed is not None and sensor.stage is None
+    time.sleep(0.01)
+    sensor.poll_trigger()
+    assert sensor.armed is None and sensor.stage == "image"
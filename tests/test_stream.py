@@ -0,0 +1,95 @@
+import time
+
+import numpy as np
+import pytest
+
+from pywfs.sdk import WfsError, WfsLib
+from pywfs.simulator import SimulatedWfsDll
+from pywfs.wfs import WfsCamera
+from conftest import CONFIGURATION
+
+
+@pytest.fixture
+def camera():
+    # the latency releases the GIL like the dll, the pure python simulator would starve the consumer otherwise
+    sdk = WfsLib(SimulatedWfsDll(latency={"WFS_TakeSpotfieldImage": 1e-3}, seed=1)).open()
+    camera = WfsCamera(sdk, CONFIGURATION)
+    camera.configure()
+    yield camera
+    sdk.close()
+
+
+def consume(stream, count, delay=0.005):
+    # a consumer slower than the simulated sensor
+    indices = []
+    for frame in stream:
+        indices.append(frame.index)
+        time.sleep(delay)
+        if len(indices) == count:
+            break
+    return indices
+
+
+def check_counters(stream):
+    counters = stream.counters
+    assert counters["acquired"] == counters["delivered"] + counters["dropped"] + counters["depth"]
+    assert counters["max_depth"] <= stream.queue_size
+
+
+def test_block_delivers_every_frame(camera):
+    with camera.stream(queue_size=2, policy="block") as stream:
+        indices = consume(stream, 10)
+        assert stream.dropped == 0
+    assert indices == list(range(10))
+    assert stream.max_depth == 2
+    check_counters(stream)
+
+
+def stall(stream):
+    # the consumer takes one frame and stalls while the sensor keeps acquiring
+    iterator = iter(stream)
+    first = next(iterator).index
+    time.sleep(0.1)
+    return [first, next(iterator).index, next(iterator).index]
+
+
+def test_drop_oldest_delivers_the_latest_frames(camera):
+    with camera.stream(queue_size=2, policy="drop_oldest") as stream:
+        indices = stall(stream)
+    # the queue holds the two newest frames after the stall
+    assert indices[1] > indices[0] + 2 and indices[2] == indices[1] + 1
+    assert stream.dropped > 0
+    check_counters(stream)
+
+
+def test_drop_newest_keeps_the_queued_frames(camera):
+    with camera.stream(queue_size=2, policy="drop_newest") as stream:
+        indices = stall(stream)
+    # the frames queued before the stall are kept, the ones acquired during the stall are dropped
+    assert indices[:2] == [0, 1]
+    assert stream.dropped > 0
+    check_counters(stream)
+
+
+def test_frames_match_the_camera(camera):
+    expected = camera.acquire_wavefront().copy()
+    with camera.stream(queue_size=1) as stream:
+        frame = next(iter(stream))
+        np.testing.assert_array_equal(frame.wavefront, expected)
+    assert not stream.running
+
+
+def test_acquisition_errors_reach_the_consumer(camera):
+    def fail(*args, **kwargs):
+        raise WfsError("acquisition failed")
+    camera.acquire_wavefront = fail
+    with camera.stream() as stream:
+        with pytest.raises(WfsError):
+            next(iter(stream))
+
+
+def test_invalid_arguments(camera):
+    with pytest.raises(WfsError):
+        camera.stream(policy="latest")
+    with pytest.raises(WfsError):
+        camera.stream(queue_size=0)
@@ -0,0 +1,35 @@
+from pywfs.sdk import WfsLib
+from pywfs.simulator import SimulatedWfsDll
+from pywfs.timing import WfsTimings, NULL_STAGE, untimed
+from pywfs.wfs import WfsCamera
+from conftest import CONFIGURATION
+
+
+def camera(timings):
+    camera = WfsCamera(WfsLib(SimulatedWfsDll(seed=1), timings=timings).open(), CONFIGURATION)
+    camera.configure()
+    return camera
+
+
+def test_acquisition_stages():
+    timings = WfsTimings()
+    acquisition = camera(timings)
+    for i in range(3):
+        acquisition.acquire_wavefront()
+    acquisition.acquire_burst(4)
+    snapshot = timings.snapshot()
+    stages = snapshot["stages"]
+    assert {name: summary["count"] for name, summary in stages.items()} == {
+        "acquire_wavefront": 3, "take_image": 3, "calc_spot": 3, "calc_deviations": 3, "calc_wavefront": 3, "acquire_burst": 1
+    }
+    assert snapshot["calls"]["WFS_CalcWavefront"]["count"] == 7
+    assert 0 < stages["acquire_wavefront"]["driver"] <= stages["acquire_wavefront"]["total"]
+
+
+def test_disabled_timings():
+    timings = WfsTimings(enabled=False)
+    acquisition = camera(timings)
+    acquisition.acquire_wavefront()
+    acquisition.acquire_burst(2)
+    assert timings.snapshot()["stages"] == {}
+    assert timings.stage("acquire_wavefront") is NULL_STAGE and untimed("acquire_wavefront") is NULL_STAGE